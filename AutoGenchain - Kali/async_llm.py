@@ -0,0 +1,75 @@
+"""
+Asynchrone LLM-Aufrufe für die AutoGen-Agenten
+"""
+
+import asyncio
+import contextvars
+import functools
+from typing import Any, Callable, List, Optional, Tuple, Union
+
+import autogen
+
+
+class AsyncLLMReply:
+    """
+    Führt in asynchronen Chats die LLM-Antworten der Agenten über deren OpenAIWrapper aus
+
+    AutoGen führt a_generate_oai_reply in einem Thread-Pool aus, ohne den Kontext
+    des Tasks mitzunehmen: Die "llm"-Spans hängen dann an keiner Runde und keiner
+    Analyse und fehlen im UsageLedger. Hier läuft generate_oai_reply mit einer
+    Kopie des Kontexts im Thread-Pool. Die Anfrage geht weiter über den Client des
+    Agenten, also mit AutoGen-Cache und Ausweichen auf die weiteren Einträge der
+    config_list. Ein abgebrochener Task wartet nicht mehr auf die Antwort; die
+    Anfrage selbst läuft im Thread zu Ende.
+    """
+
+    async def run(self, func: Callable[..., Any], **kwargs) -> Any:
+        """
+        Führt eine synchrone Funktion mit dem aktuellen Kontext im Thread-Pool aus
+
+        Args:
+            func: Die Funktion
+            **kwargs: Argumente der Funktion
+
+        Returns:
+            Das Ergebnis der Funktion
+        """
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(context.run, func, **kwargs)
+        )
+
+    def attach(self, agent: autogen.ConversableAgent):
+        """
+        Registriert die asynchrone Antwort für einen Agenten mit LLM
+
+        Args:
+            agent: Der Agent
+        """
+        position = next(
+            i for i, entry in enumerate(agent._reply_func_list)
+            if entry["reply_func"] is autogen.ConversableAgent.a_generate_oai_reply
+        )
+        agent.register_reply([autogen.Agent, None], self.a_generate_reply,
+                             position=position, ignore_async_in_sync_chat=True)
+
+    def attach_selector(self, manager: autogen.GroupChatManager):
+        """
+        Lässt den Manager den nächsten Sprecher mit dem aktuellen Kontext auswählen
+
+        Args:
+            manager: Der Gruppenchat-Manager (mit gesetztem client)
+        """
+        async def a_generate_oai_reply(messages=None, sender=None, config=None):
+            return await self.run(manager.generate_oai_reply, messages=messages, sender=sender, config=config)
+
+        # GroupChat.a_select_speaker ruft diese Methode des Managers direkt auf
+        manager.a_generate_oai_reply = a_generate_oai_reply
+
+    async def a_generate_reply(self,
+                               recipient: autogen.ConversableAgent,
+                               messages: Optional[List[dict]] = None,
+                               sender: Optional[autogen.Agent] = None,
+                               config: Optional[Any] = None) -> Tuple[bool, Union[str, dict, None]]:
+        """Antwortfunktion für AutoGen (siehe ConversableAgent.register_reply)"""
+        return await self.run(recipient.generate_oai_reply, messages=messages, sender=sender)
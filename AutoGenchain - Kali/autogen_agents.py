@@ -3,46 +3,207 @@ AutoGen-Agenten für spezifische Bug-Bounty-Aufgaben
 """
 
 import os
+import json
+import asyncio
 import autogen
-from typing import Dict, List, Any, Optional
+from typing import Annotated, Callable, Dict, List, Any, Optional
 from dotenv import load_dotenv
 
+from async_llm import AsyncLLMReply
+from progress_monitor import ProgressMonitor
+from termination import TerminationDetector
+from tracing import TracedGroupChat, instrument_client, tracer
+from usage import UsageLedger
+
 # Lade Umgebungsvariablen
 load_dotenv()
 
+# Standardpfad der Agentenkonfiguration
+AGENT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config", "agent_config.json")
+
+
+def load_agent_config(config_path: str = AGENT_CONFIG_PATH, section: str = "autogen_agents") -> Dict[str, Any]:
+    """
+    Lädt einen Abschnitt der Agentenkonfiguration
+    
+    Args:
+        config_path: Pfad zur agent_config.json
+        section: Name des Abschnitts (z.B. "autogen_agents" oder "hybrid_integration")
+        
+    Returns:
+        Der Abschnitt oder ein leeres Wörterbuch, falls die Datei fehlt
+    """
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            return json.load(f).get(section, {})
+    except Exception as e:
+        print(f"Fehler beim Laden der Agentenkonfiguration: {e}")
+        return {}
+
+
 class BugBountyAgents:
     """Manager für AutoGen-Agenten für Bug-Bounty-Aufgaben"""
     
     def __init__(self,
-                temperature: float = 0.7,
-                model: str = "gpt-3.5-turbo"):
+                temperature: Optional[float] = None,
+                model: Optional[str] = None,
+                routing_profile: Optional[str] = None,
+                config_path: str = AGENT_CONFIG_PATH,
+                cache_seed: Optional[int] = 41,
+                max_tokens: Optional[int] = None,
+                max_cost: Optional[float] = None,
+                knowledge: Optional[Any] = None):
         """
         Initialisiert die Bug-Bounty-Agenten
         
+        Modell und Temperatur werden pro Rolle aus der Agentenkonfiguration gelesen:
+        Das Routing-Profil legt das Modell jeder Rolle fest (auch für den Manager, der
+        nur den nächsten Sprecher auswählt), sonst gilt "default_model".
+        
         Args:
-            temperature: Temperatur für die Agenten-LLMs
-            model: Name des LLM-Modells
+            temperature: Temperatur für alle Agenten-LLMs (überschreibt die Konfiguration)
+            model: Name des LLM-Modells für alle Agenten (überschreibt die Konfiguration)
+            routing_profile: Name des Routing-Profils aus der Konfiguration
+            config_path: Pfad zur agent_config.json
+            cache_seed: Seed des AutoGen-Antwortcaches (None deaktiviert den Cache)
+            max_tokens: Tokenbudget pro Zusammenarbeit (überschreibt "budget" der Konfiguration)
+            max_cost: Kostenbudget in USD pro Zusammenarbeit (überschreibt "budget" der Konfiguration)
+            knowledge: KnowledgeService, dessen Kategorien die Spezialisten durchsuchen können
+                (siehe "knowledge_partitions" in der Konfiguration)
         """
         self.temperature = temperature
+        self.knowledge = knowledge
         self.model = model
+        self.cache_seed = cache_seed
+        self.agent_config = load_agent_config(config_path)
+        self.routing_profile = routing_profile or self.agent_config.get("routing_profile", "uniform")
+        profiles = self.agent_config.get("routing_profiles", {})
+        if self.routing_profile not in profiles and self.routing_profile != "uniform":
+            print(f"Unbekanntes Routing-Profil '{self.routing_profile}', verwende 'uniform'")
+            self.routing_profile = "uniform"
+        self.model_routing = profiles.get(self.routing_profile, {})
         
-        # Konfiguration für alle Agenten
-        self.config_list = [
-            {
-                "model": model,
-                "api_key": os.getenv("OPENAI_API_KEY"),
-            }
-        ]
+        # Preise und Budget für die Abrechnung pro Agent und Runde
+        budget = self.agent_config.get("budget", {})
+        self.max_tokens = max_tokens if max_tokens is not None else budget.get("max_tokens")
+        self.max_cost = max_cost if max_cost is not None else budget.get("max_cost")
+        self.prices = self.agent_config.get("prices")
+        
+        # Konfiguration für Agenten ohne eigene Rolle
+        self.config_list = self._config_list(model or self.agent_config.get("default_model", "gpt-3.5-turbo"))
+        
+        # Der LLM-Client des Gruppenchat-Managers wird einmal erstellt und von allen Sitzungen geteilt
+        self.manager_llm_config = self._llm_config("manager")
+        self.manager_client = autogen.OpenAIWrapper(**self.manager_llm_config)
+        instrument_client(self.manager_client, "GroupChatManager")
+        
+        # LLM-Aufrufe für a_start_collaboration, mit Span-Kontext im Thread-Pool
+        self.async_llm = AsyncLLMReply()
+        
+        # Mit add_agent_to_chat hinzugefügte Agenten, die auch neue Sitzungen erhalten
+        self.custom_agents = []
         
         # Initialisiere alle Agenten
         self.reconnaissance_agent = self._create_reconnaissance_agent()
         self.vulnerability_scanner_agent = self._create_vulnerability_scanner_agent()
         self.exploit_planner_agent = self._create_exploit_planner_agent()
         self.team_lead_agent = self._create_team_lead_agent()
+        # Vor instrument_client: register_for_llm erstellt den Client des Agenten neu
+        self.knowledge_tools = self._register_knowledge_tools()
+        for agent in [self.reconnaissance_agent, self.vulnerability_scanner_agent,
+                      self.exploit_planner_agent, self.team_lead_agent]:
+            self.async_llm.attach(agent)
+            instrument_client(agent.client, agent.name)
         
         # Gruppenchat für die Agenten
         self.group_chat = self._setup_group_chat()
     
+    def _config_list(self, model: str) -> List[Dict[str, Any]]:
+        """Erstellt die AutoGen-Konfigurationsliste für ein Modell"""
+        return [
+            {
+                "model": model,
+                "api_key": os.getenv("OPENAI_API_KEY"),
+            }
+        ]
+    
+    def _llm_config(self, role: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Erstellt die LLM-Konfiguration für eine Rolle aus der Agentenkonfiguration
+        
+        Args:
+            role: Rolle aus der Konfiguration (z.B. "planner" oder "manager"); None für Standardwerte
+            
+        Returns:
+            Die llm_config für den Agenten
+        """
+        role_config = self.agent_config.get("manager", {}) if role == "manager" \
+            else self.agent_config.get("agents", {}).get(role, {})
+        model = (self.model
+                 or self.model_routing.get(role)
+                 or role_config.get("model")
+                 or self.agent_config.get("default_model", "gpt-3.5-turbo"))
+        temperature = self.temperature if self.temperature is not None \
+            else role_config.get("temperature", self.agent_config.get("temperature", 0.7))
+        return {"config_list": self._config_list(model), "temperature": temperature, "cache_seed": self.cache_seed}
+    
+    def describe_routing(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Gibt Modell und Temperatur jedes Agenten und des Managers zurück
+        
+        Returns:
+            Ein Wörterbuch mit Agentenname und dessen Modell und Temperatur
+        """
+        agents = [self.team_lead_agent, self.reconnaissance_agent,
+                  self.vulnerability_scanner_agent, self.exploit_planner_agent] + self.custom_agents
+        routing = {
+            agent.name: {"model": agent.llm_config["config_list"][0]["model"],
+                         "temperature": agent.llm_config.get("temperature")}
+            for agent in agents
+        }
+        routing["GroupChatManager"] = {"model": self.manager_llm_config["config_list"][0]["model"],
+                                       "temperature": self.manager_llm_config.get("temperature")}
+        return routing
+    
+    def _knowledge_search(self, category: str) -> Callable[..., str]:
+        """Erstellt eine Suchfunktion, die nur die Chunks einer Kategorie durchsucht"""
+        def search(query: Annotated[str, "Die Suchanfrage"]) -> str:
+            results = self.knowledge.search(query, k=4, category=category)
+            if not results:
+                return "Keine Treffer."
+            return "\n\n".join(f"[{doc.metadata.get('section_path') or doc.metadata.get('source', '')}]\n{doc.page_content}"
+                                 for doc in results)
+        return search
+    
+    def _register_knowledge_tools(self) -> Dict[str, Callable[..., str]]:
+        """
+        Bietet jedem Spezialisten die Suche in seiner Kategorie der Wissensdatenbank an
+        
+        Die Zuordnung steht unter "knowledge_partitions" (Agentenname -> Kategorie).
+        Die Spezialisten schlagen die Funktionen nur vor, ausgeführt werden sie vom
+        UserProxy jeder Sitzung (siehe _setup_group_chat).
+        
+        Returns:
+            Die Funktionen nach Namen
+        """
+        tools: Dict[str, Callable[..., str]] = {}
+        if self.knowledge is None or not self.knowledge.available:
+            return tools
+        agents = {agent.name: agent for agent in [self.reconnaissance_agent, self.vulnerability_scanner_agent,
+                                                   self.exploit_planner_agent]}
+        for agent_name, category in self.agent_config.get("knowledge_partitions", {}).items():
+            if agent_name not in agents:
+                continue
+            if category not in self.knowledge.categories:
+                print(f"Keine Dokumente der Kategorie '{category}' für {agent_name}")
+                continue
+            name = f"search_{category}_knowledge"
+            tools[name] = agents[agent_name].register_for_llm(
+                name=name,
+                description=f"Durchsucht die Wissensdatenbank nach Dokumenten der Kategorie '{category}'"
+            )(self._knowledge_search(category))
+        return tools
+    
     def _create_reconnaissance_agent(self):
         """Erstellt den Aufklärungsagenten"""
         reconnaissance_agent = autogen.AssistantAgent(
@@ -57,7 +218,7 @@ class BugBountyAgents:
             Deine Antworten sollten detaillierte Strategien zur Informationssammlung und Werkzeuge wie nmap, dig, whois, theHarvester, Shodan usw. umfassen.
             Stelle konkrete Befehle und deren erwartete Ausgabe bereit, wenn möglich.
             """,
-            llm_config={"config_list": self.config_list, "temperature": self.temperature}
+            llm_config=self._llm_config("security_expert")
         )
         return reconnaissance_agent
     
@@ -74,7 +235,7 @@ class BugBountyAgents:
             
             Liefere genaue Anweisungen zur Überprüfung und Validierung von Schwachstellen und erkläre die potenziellen Auswirkungen und Risiken.
             """,
-            llm_config={"config_list": self.config_list, "temperature": self.temperature}
+            llm_config=self._llm_config("defender")
         )
         return vulnerability_scanner_agent
     
@@ -93,7 +254,7 @@ class BugBountyAgents:
             für das Verständnis der Schwachstelle. Der Zweck ist die Demonstration der Schwachstelle für die Behebung,
             nicht die tatsächliche Ausnutzung für schädliche Zwecke.
             """,
-            llm_config={"config_list": self.config_list, "temperature": self.temperature}
+            llm_config=self._llm_config("attacker")
         )
         return exploit_planner_agent
     
@@ -111,61 +272,164 @@ class BugBountyAgents:
             Du sollst klare Anweisungen geben, den Fortschritt überwachen und sicherstellen, dass alle
             Bug-Bounty-Aktivitäten ethisch und innerhalb der festgelegten Grenzen durchgeführt werden.
             """,
-            llm_config={"config_list": self.config_list, "temperature": self.temperature}
+            llm_config=self._llm_config("planner")
         )
         return team_lead_agent
     
-    def _setup_group_chat(self):
-        """Richtet einen Gruppenchat für die Zusammenarbeit der Agenten ein"""
+    def create_usage_ledger(self, with_budget: bool = True) -> UsageLedger:
+        """
+        Erstellt ein Hauptbuch für Tokens, Kosten und Latenz mit den Preisen der Konfiguration
+        
+        Args:
+            with_budget: Ob das Budget der Agenten gelten soll
+            
+        Returns:
+            Das UsageLedger
+        """
+        if not with_budget:
+            return UsageLedger(self.prices)
+        return UsageLedger(self.prices, max_tokens=self.max_tokens, max_cost=self.max_cost)
+    
+    def _setup_group_chat(self,
+                          human_input_mode: str = "TERMINATE",
+                          on_message: Optional[Callable[[Dict[str, Any]], None]] = None,
+                          usage: Optional[UsageLedger] = None):
+        """
+        Richtet einen Gruppenchat für die Zusammenarbeit der Agenten ein
+        
+        Die Agenten selbst werden nur einmal erstellt. Jeder Aufruf liefert einen eigenen
+        GroupChat, Manager und Proxy-Agenten mit eigenem Nachrichtenzustand.
+        
+        Args:
+            human_input_mode: Eingabemodus des Proxy-Agenten ("NEVER" ohne Terminal)
+            on_message: Callback, das mit jeder neuen Nachricht im Gruppenchat aufgerufen wird
+            usage: Hauptbuch der Sitzung (sonst wird ein neues erstellt)
+        """
         # Erstelle einen menschlichen Proxy-Agenten für die Interaktion
+        user_proxy_termination = TerminationDetector()
         user_proxy = autogen.UserProxyAgent(
             name="UserProxy",
-            human_input_mode="TERMINATE",
+            human_input_mode=human_input_mode,
             max_consecutive_auto_reply=10,
-            is_termination_msg=lambda x: x.get("content", "").rstrip().endswith("TERMINATE"),
+            # Beendet auch bei Abschlussformulierungen und sich wiederholenden Antworten
+            is_termination_msg=user_proxy_termination,
             code_execution_config={"work_dir": "agent_workspace"}
         )
+        # Führt die Wissenssuchen der Spezialisten aus
+        user_proxy.register_function(function_map=self.knowledge_tools)
         
         # Erstelle einen Gruppenchat mit allen Agenten
-        group_chat = autogen.GroupChat(
+        # Erfasst Runden und Sprecherauswahl als Spans
+        group_chat = TracedGroupChat(
             agents=[
                 user_proxy, 
                 self.team_lead_agent,
                 self.reconnaissance_agent,
                 self.vulnerability_scanner_agent,
                 self.exploit_planner_agent
-            ],
+            ] + self.custom_agents,
             messages=[],
             max_round=50
         )
         
+        # Verhindert, dass sich die Agenten bis max_round gegenseitig wiederholen
+        progress_monitor = ProgressMonitor(action="redirect")
+        
+        # Rechnet die LLM-Aufrufe der Sitzung ab und beendet den Chat bei erreichtem Budget
+        usage = usage or self.create_usage_ledger()
+        
         # Erstelle einen Manager für den Gruppenchat
+        # Der Manager sieht jede Nachricht und beendet den Chat, statt bis max_round weiterzulaufen
+        manager_termination = TerminationDetector()
         manager = autogen.GroupChatManager(
             groupchat=group_chat,
-            llm_config={"config_list": self.config_list, "temperature": self.temperature}
+            llm_config=False,
+            is_termination_msg=lambda message: (manager_termination(message)
+                                                or progress_monitor.is_termination_msg(message)
+                                                or usage.is_termination_msg(message))
         )
+        manager.llm_config = self.manager_llm_config
+        manager.client = self.manager_client
+        self.async_llm.attach_selector(manager)
+        progress_monitor.attach(group_chat, manager)
+        
+        if on_message:
+            self._notify_on_append(group_chat, manager, on_message)
         
         return {
             "group_chat": group_chat,
             "manager": manager,
-            "user_proxy": user_proxy
+            "user_proxy": user_proxy,
+            "progress_monitor": progress_monitor,
+            "usage": usage,
+            "termination_detectors": {
+                "manager": manager_termination,
+                "user_proxy": user_proxy_termination
+            }
         }
     
-    def start_collaboration(self, task: str) -> List[Dict[str, Any]]:
+    def _notify_on_append(self, group_chat, manager, on_message: Callable[[Dict[str, Any]], None]):
+        """Ruft on_message für jede Nachricht auf, die der Gruppenchat aufnimmt"""
+        # Der Manager arbeitet mit einer Kopie des GroupChat aus seiner Antwortliste
+        configs = [group_chat] + [
+            entry["config"] for entry in manager._reply_func_list
+            if entry["init_config"] is group_chat and entry["config"] is not group_chat
+        ]
+        for config in configs:
+            def _append(message, speaker, append=config.append):
+                append(message, speaker)
+                on_message(dict(message, name=speaker.name))
+            config.append = _append
+    
+    def create_session(self,
+                       human_input_mode: str = "TERMINATE",
+                       on_message: Optional[Callable[[Dict[str, Any]], None]] = None,
+                       usage: Optional[UsageLedger] = None) -> Dict[str, Any]:
+        """
+        Erstellt eine isolierte Sitzung für eine Aufgabe
+        
+        Args:
+            human_input_mode: Eingabemodus des Proxy-Agenten ("NEVER" ohne Terminal)
+            on_message: Callback, das mit jeder neuen Nachricht im Gruppenchat aufgerufen wird
+            usage: Hauptbuch für Tokens, Kosten und Budget (sonst wird ein neues erstellt)
+        
+        Returns:
+            Ein Wörterbuch mit GroupChat, Manager, Proxy-Agent, Überwachung und Hauptbuch der Sitzung
+        """
+        return self._setup_group_chat(human_input_mode, on_message, usage)
+    
+    def close_session(self, session: Dict[str, Any]):
+        """
+        Entfernt den Gesprächszustand einer Sitzung aus den geteilten Agenten
+        
+        Args:
+            session: Die mit create_session erstellte Sitzung
+        """
+        manager = session["manager"]
+        for agent in session["group_chat"].agents:
+            for state in (agent._oai_messages, agent._consecutive_auto_reply_counter,
+                          agent._max_consecutive_auto_reply_dict, agent.reply_at_receive):
+                state.pop(manager, None)
+    
+    def start_collaboration(self, task: str, usage: Optional[UsageLedger] = None) -> List[Dict[str, Any]]:
         """
         Startet eine Zusammenarbeit zwischen den Agenten für eine bestimmte Aufgabe
         
         Args:
             task: Die Aufgabe, an der die Agenten arbeiten sollen
+            usage: Hauptbuch für Tokens, Kosten und Budget (sonst in self.group_chat["usage"])
             
         Returns:
             Die Nachrichten aus dem Gruppenchat
         """
-        try:
-            # Starte die Zusammenarbeit mit der Aufgabe
-            self.group_chat["user_proxy"].initiate_chat(
-                self.group_chat["manager"],
-                message=f"""
+        # Jede Zusammenarbeit beginnt mit einem leeren Gruppenchat
+        self.close_session(self.group_chat)
+        self.group_chat = self.create_session(usage=usage)
+        return self.run_session(self.group_chat, task)
+    
+    def _collaboration_message(self, task: str) -> str:
+        """Erstellt die Startnachricht einer Zusammenarbeit"""
+        return f"""
                 Wir arbeiten an einem Bug-Bounty-Projekt mit folgender Aufgabe:
                 
                 {task}
@@ -175,14 +439,115 @@ class BugBountyAgents:
                 
                 Nach der Diskussion fasst der TeamLeadAgent die Ergebnisse zusammen und erstellt einen Aktionsplan.
                 """
-            )
+    
+    def _reset_session(self, session: Dict[str, Any]):
+        """Setzt die Überwachung einer Sitzung vor einer Zusammenarbeit zurück"""
+        for detector in session["termination_detectors"].values():
+            detector.reset()
+        session["progress_monitor"].reset()
+    
+    def _report_session(self, session: Dict[str, Any]):
+        """Gibt aus, warum und wann der Gruppenchat einer Sitzung beendet wurde"""
+        for event in session["termination_detectors"]["manager"].events:
+            print(f"Gruppenchat nach Nachricht {event['message']} beendet: {event['reason']}")
+        for event in session["progress_monitor"].events:
+            print(f"Fortschrittsmonitor: {event['action']} nach Runde {event['round']} "
+                  f"({event['speaker']}, Neuheit {event['novelty']:.2f})")
+        if session["usage"].budget_exceeded:
+            print(f"Gruppenchat wegen Budget beendet: {session['usage'].budget_exceeded}")
+    
+    def run_session(self, session: Dict[str, Any], task: str) -> List[Dict[str, Any]]:
+        """
+        Führt eine Zusammenarbeit in der angegebenen Sitzung aus
+        
+        Args:
+            session: Die mit create_session erstellte Sitzung
+            task: Die Aufgabe, an der die Agenten arbeiten sollen
+            
+        Returns:
+            Die Nachrichten aus dem Gruppenchat der Sitzung
+        """
+        try:
+            self._reset_session(session)
+            
+            # Starte die Zusammenarbeit mit der Aufgabe
+            with tracer.span("collaboration") as span, session["usage"].track(span):
+                try:
+                    session["user_proxy"].initiate_chat(
+                        session["manager"],
+                        message=self._collaboration_message(task)
+                    )
+                finally:
+                    session["group_chat"].close_round()
+            self._report_session(session)
+            
+            # Gib die Chat-Nachrichten zurück
+            return session["group_chat"].messages
+        except Exception as e:
+            print(f"Fehler beim Starten der Zusammenarbeit: {e}")
+            return []
+    
+    async def a_run_session(self, session: Dict[str, Any], task: str) -> List[Dict[str, Any]]:
+        """
+        Führt eine Zusammenarbeit in der angegebenen Sitzung asynchron aus
+        
+        Args:
+            session: Die mit create_session erstellte Sitzung
+            task: Die Aufgabe, an der die Agenten arbeiten sollen
+            
+        Returns:
+            Die Nachrichten aus dem Gruppenchat der Sitzung
+        """
+        try:
+            self._reset_session(session)
+            
+            # Starte die Zusammenarbeit mit der Aufgabe
+            with tracer.span("collaboration") as span, session["usage"].track(span):
+                try:
+                    await session["user_proxy"].a_initiate_chat(
+                        session["manager"],
+                        message=self._collaboration_message(task)
+                    )
+                finally:
+                    session["group_chat"].close_round()
+            self._report_session(session)
             
             # Gib die Chat-Nachrichten zurück
-            return self.group_chat["group_chat"].messages
+            return session["group_chat"].messages
         except Exception as e:
             print(f"Fehler beim Starten der Zusammenarbeit: {e}")
             return []
     
+    async def a_start_collaboration(self,
+                                    task: str,
+                                    timeout: Optional[float] = None,
+                                    on_message: Optional[Callable[[Dict[str, Any]], None]] = None,
+                                    usage: Optional[UsageLedger] = None) -> List[Dict[str, Any]]:
+        """
+        Startet eine Zusammenarbeit asynchron in einer eigenen Sitzung
+        
+        Bei Überschreiten des Zeitlimits oder Abbruch des Tasks endet die Zusammenarbeit
+        sofort; bereits gestellte LLM-Anfragen laufen im Thread-Pool zu Ende. Mehrere
+        Aufrufe können gleichzeitig laufen.
+        
+        Args:
+            task: Die Aufgabe, an der die Agenten arbeiten sollen
+            timeout: Zeitlimit in Sekunden (None für kein Limit)
+            on_message: Callback, das mit jeder neuen Nachricht im Gruppenchat aufgerufen wird
+            usage: Hauptbuch für Tokens, Kosten und Budget der Zusammenarbeit
+            
+        Returns:
+            Die Nachrichten aus dem Gruppenchat
+            
+        Raises:
+            asyncio.TimeoutError: Wenn das Zeitlimit überschritten wurde
+        """
+        session = self.create_session(human_input_mode="NEVER", on_message=on_message, usage=usage)
+        try:
+            return await asyncio.wait_for(self.a_run_session(session, task), timeout)
+        finally:
+            self.close_session(session)
+    
     def add_agent_to_chat(self, name: str, system_message: str) -> bool:
         """
         Fügt einen benutzerdefinierten Agenten zum Gruppenchat hinzu
@@ -199,10 +564,14 @@ class BugBountyAgents:
             new_agent = autogen.AssistantAgent(
                 name=name,
                 system_message=system_message,
-                llm_config={"config_list": self.config_list, "temperature": self.temperature}
+                llm_config=self._llm_config()
             )
             
-            # Füge den Agenten zum Gruppenchat hinzu
+            self.async_llm.attach(new_agent)
+            instrument_client(new_agent.client, new_agent.name)
+            
+            # Füge den Agenten zum aktuellen Gruppenchat und zu allen neuen Sitzungen hinzu
+            self.custom_agents.append(new_agent)
             self.group_chat["group_chat"].agents.append(new_agent)
             
             return True
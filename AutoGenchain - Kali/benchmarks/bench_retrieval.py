@@ -0,0 +1,382 @@
+"""
+Benchmark: Qualität und Latenz der Suche in der Wissensdatenbank
+
+Teilt die Dokumente aus bugbounty-agents/knowledge_base/ und knowledge_base/ mit
+jeder Chunking-Konfiguration, baut damit jeden Retriever auf und beantwortet die
+gelabelten Anfragen aus retrieval_queries.json. Gemessen werden Recall@k (Anteil
+der erwarteten Quelldateien unter den Quellen der ersten k Chunks), Trefferquote@k,
+MRR (Kehrwert des Rangs des ersten Chunks aus einer erwarteten Datei), p50/p95 der
+Suchlatenz inklusive Embedding der Anfrage sowie die Aufbauzeit des Index.
+
+Läuft vollständig offline: die Embeddings werden lokal per Feature-Hashing berechnet
+(src/utils/embeddings.py) oder, falls installiert und im Cache vorhanden, mit
+sentence-transformers (--embeddings st:all-MiniLM-L6-v2). Retriever sind eine
+Brute-Force-Suche mit NumPy, BM25 und Chroma (falls chromadb installiert ist).
+
+Aufruf:
+    python benchmarks/bench_retrieval.py
+    python benchmarks/bench_retrieval.py --chunking 1000:200 500:50 --backends numpy bm25 \\
+        --output results/retrieval.json --history results/retrieval_history.jsonl
+"""
+
+import argparse
+import glob
+import json
+import math
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+PROJECT_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, PROJECT_ROOT)
+
+from prompt_builder import count_tokens, tokenizer_available
+from src.utils.chunking import StructureChunker
+from src.utils.embeddings import HashingEmbeddings
+
+DEFAULT_CORPUS = [
+    os.path.join(PROJECT_ROOT, "bugbounty-agents", "knowledge_base"),
+    os.path.join(PROJECT_ROOT, "knowledge_base"),
+]
+DEFAULT_QUERIES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "retrieval_queries.json")
+
+# Chunking-Konfigurationen: "Zeichen:Überlappung" für den RecursiveCharacterTextSplitter
+# (1000:200 war die frühere Einstellung) und "structure:Tokens" für den StructureChunker
+DEFAULT_CHUNKING = ["1000:200", "500:50", "1500:150", "800:0", "structure:300", "structure:200"]
+
+_WORD = re.compile(r"\w+")
+
+
+def load_corpus(paths: List[str]) -> List[Dict[str, str]]:
+    """
+    Lädt alle .txt-Dateien der Wissensdatenbanken
+
+    Args:
+        paths: Verzeichnisse der Wissensdatenbanken
+
+    Returns:
+        Liste von {"source": Dateiname, "text": Inhalt}
+    """
+    documents = []
+    for path in paths:
+        for file_path in sorted(glob.glob(os.path.join(path, "**", "*.txt"), recursive=True)):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                documents.append({"source": os.path.basename(file_path), "text": f.read()})
+    return documents
+
+
+def make_chunker(config: str) -> Callable[[str], List[str]]:
+    """
+    Erstellt die Chunking-Funktion einer Konfiguration
+
+    Args:
+        config: "Zeichen:Überlappung" für den RecursiveCharacterTextSplitter oder
+            "structure:Tokens[:Überlappung]" für den StructureChunker
+
+    Returns:
+        Funktion Text -> Chunks
+    """
+    if config.startswith("structure:"):
+        values = [int(value) for value in config.split(":")[1:]]
+        return StructureChunker(max_tokens=values[0], overlap_tokens=values[1] if len(values) > 1 else 0).split_text
+
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    size, overlap = (int(value) for value in config.split(":"))
+    return RecursiveCharacterTextSplitter(chunk_size=size, chunk_overlap=overlap).split_text
+
+
+def make_embeddings(name: str):
+    """
+    Erstellt die lokalen Embeddings
+
+    Args:
+        name: "hashing" oder "st:<Modell>" für sentence-transformers
+
+    Returns:
+        Objekt mit fit(texts) und embed(texts) -> L2-normierte float32-Matrix
+    """
+    if name == "hashing":
+        return HashingEmbeddings()
+    if name.startswith("st:"):
+        # Nur aus dem lokalen Cache laden, nie herunterladen
+        os.environ.setdefault("HF_HUB_OFFLINE", "1")
+        from sentence_transformers import SentenceTransformer
+
+        class SentenceTransformerEmbeddings:
+            def __init__(self, model_name: str):
+                self.model = SentenceTransformer(model_name)
+
+            def fit(self, texts):
+                return self
+
+            def embed(self, texts):
+                return self.model.encode(list(texts), normalize_embeddings=True,
+                                         convert_to_numpy=True).astype(np.float32)
+
+        return SentenceTransformerEmbeddings(name[3:])
+    raise ValueError(f"Unbekannte Embeddings: {name}")
+
+
+class NumpyRetriever:
+    """Brute-Force-Suche per Skalarprodukt über der Embedding-Matrix"""
+
+    def __init__(self, embeddings, chunks: List[str]):
+        self.embeddings = embeddings
+        self.matrix = embeddings.embed(chunks)
+
+    def search(self, query: str, k: int) -> List[int]:
+        scores = self.matrix @ self.embeddings.embed([query])[0]
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top])].tolist()
+
+
+class BM25Retriever:
+    """BM25 über ganzen Wörtern mit invertiertem Index (ohne Embeddings)"""
+
+    def __init__(self, embeddings, chunks: List[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        lengths = []
+        for index, chunk in enumerate(chunks):
+            words = _WORD.findall(chunk.lower())
+            lengths.append(len(words))
+            for word, count in Counter(words).items():
+                self.postings.setdefault(word, []).append((index, count))
+        self.lengths = np.array(lengths, dtype=np.float32)
+        self.average_length = float(self.lengths.mean()) if lengths else 0.0
+        self.count = len(chunks)
+
+    def search(self, query: str, k: int) -> List[int]:
+        scores = np.zeros(self.count, dtype=np.float32)
+        norm = self.k1 * (1 - self.b + self.b * self.lengths / max(self.average_length, 1e-9))
+        for word in set(_WORD.findall(query.lower())):
+            postings = self.postings.get(word)
+            if not postings:
+                continue
+            idf = math.log(1 + (self.count - len(postings) + 0.5) / (len(postings) + 0.5))
+            indices = np.fromiter((index for index, _ in postings), dtype=np.int64, count=len(postings))
+            counts = np.fromiter((count for _, count in postings), dtype=np.float32, count=len(postings))
+            scores[indices] += idf * counts * (self.k1 + 1) / (counts + norm[indices])
+        k = min(k, self.count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        return [index for index in top[np.argsort(-scores[top])].tolist() if scores[index] > 0]
+
+
+class ChromaRetriever:
+    """HNSW-Suche in einer flüchtigen Chroma-Collection mit den lokalen Embeddings"""
+
+    _collections = 0
+
+    def __init__(self, embeddings, chunks: List[str]):
+        import chromadb
+
+        ChromaRetriever._collections += 1
+        self.embeddings = embeddings
+        self.collection = chromadb.EphemeralClient().create_collection(
+            f"bench-{os.getpid()}-{ChromaRetriever._collections}", metadata={"hnsw:space": "cosine"})
+        matrix = embeddings.embed(chunks)
+        for start in range(0, len(chunks), 1000):
+            self.collection.add(ids=[str(i) for i in range(start, min(start + 1000, len(chunks)))],
+                                embeddings=matrix[start:start + 1000].tolist(),
+                                documents=chunks[start:start + 1000])
+
+    def search(self, query: str, k: int) -> List[int]:
+        result = self.collection.query(query_embeddings=[self.embeddings.embed([query])[0].tolist()],
+                                       n_results=k, include=[])
+        return [int(i) for i in result["ids"][0]]
+
+
+BACKENDS = {"numpy": NumpyRetriever, "bm25": BM25Retriever, "chroma": ChromaRetriever}
+
+
+def evaluate(retriever, sources: List[str], queries: List[Dict[str, Any]], ks: List[int],
+             repeat: int) -> Dict[str, Any]:
+    """
+    Beantwortet alle Anfragen und berechnet die Kennzahlen
+
+    Args:
+        retriever: Der Retriever
+        sources: Quelldatei pro Chunk
+        queries: Die gelabelten Anfragen
+        ks: Werte von k für Recall und Trefferquote
+        repeat: Wiederholungen pro Anfrage für die Latenz
+
+    Returns:
+        Recall@k, Trefferquote@k, MRR und Latenzen in Millisekunden
+    """
+    max_k = max(ks)
+    recall = {k: 0.0 for k in ks}
+    hits = {k: 0 for k in ks}
+    reciprocal_ranks = 0.0
+    latencies = []
+    for query in queries:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            ranked = retriever.search(query["query"], max_k)
+            latencies.append((time.perf_counter() - start) * 1000)
+        expected = set(query["expected"])
+        retrieved = [sources[index] for index in ranked]
+        for k in ks:
+            found = expected & set(retrieved[:k])
+            recall[k] += len(found) / len(expected)
+            hits[k] += bool(found)
+        rank = next((position for position, source in enumerate(retrieved, 1) if source in expected), None)
+        reciprocal_ranks += 1 / rank if rank else 0.0
+    return {
+        "recall": {f"@{k}": round(recall[k] / len(queries), 4) for k in ks},
+        "hit_rate": {f"@{k}": round(hits[k] / len(queries), 4) for k in ks},
+        "mrr": round(reciprocal_ranks / len(queries), 4),
+        "latency_ms": {
+            "p50": round(float(np.percentile(latencies, 50)), 3),
+            "p95": round(float(np.percentile(latencies, 95)), 3),
+            "mean": round(float(np.mean(latencies)), 3),
+        },
+    }
+
+
+def run_config(documents: List[Dict[str, str]], chunking: str, backends: List[str], embeddings_name: str,
+               queries: List[Dict[str, Any]], ks: List[int], repeat: int) -> List[Dict[str, Any]]:
+    """
+    Misst alle Retriever mit einer Chunking-Konfiguration
+
+    Args:
+        documents: Die geladenen Dokumente
+        chunking: Die Chunking-Konfiguration
+        backends: Namen der Retriever
+        embeddings_name: Die lokalen Embeddings
+        queries: Die gelabelten Anfragen
+        ks: Werte von k
+        repeat: Wiederholungen pro Anfrage
+
+    Returns:
+        Ein Ergebnis pro Retriever
+    """
+    start = time.perf_counter()
+    chunker = make_chunker(chunking)
+    chunks, sources = [], []
+    for document in documents:
+        for chunk in chunker(document["text"]):
+            chunks.append(chunk)
+            sources.append(document["source"])
+    chunk_seconds = time.perf_counter() - start
+    embedding_tokens = sum(count_tokens(chunk) for chunk in chunks)
+    print(f"Chunking {chunking}: {len(chunks)} Chunks, {embedding_tokens} Tokens in {chunk_seconds * 1000:.1f} ms")
+
+    results = []
+    for backend in backends:
+        try:
+            start = time.perf_counter()
+            # BM25 arbeitet auf den Wörtern und braucht keine Embeddings
+            embeddings = make_embeddings(embeddings_name).fit(chunks) if backend != "bm25" else None
+            retriever = BACKENDS[backend](embeddings, chunks)
+            build_seconds = time.perf_counter() - start
+        except ImportError as e:
+            print(f"  {backend}: übersprungen ({e})")
+            continue
+        result = {
+            "chunking": chunking,
+            "backend": backend,
+            "embeddings": embeddings_name if backend != "bm25" else None,
+            "chunks": len(chunks),
+            "chunk_chars": sum(len(chunk) for chunk in chunks),
+            "embedding_tokens": embedding_tokens,
+            "chunk_seconds": round(chunk_seconds, 4),
+            "build_seconds": round(build_seconds, 4),
+        }
+        result.update(evaluate(retriever, sources, queries, ks, repeat))
+        results.append(result)
+    return results
+
+
+def git_commit() -> str:
+    """Gibt den aktuellen Commit zurück (leer außerhalb eines Git-Repositorys)"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip()
+    except Exception:
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Qualität und Latenz der Suche in der Wissensdatenbank")
+    parser.add_argument("--corpus", nargs="*", default=DEFAULT_CORPUS, help="Verzeichnisse der Wissensdatenbanken")
+    parser.add_argument("--queries", type=str, default=DEFAULT_QUERIES, help="Gelabelte Anfragen (JSON)")
+    parser.add_argument("--chunking", nargs="*", default=DEFAULT_CHUNKING, help="Konfigurationen Zeichen:Überlappung")
+    parser.add_argument("--backends", nargs="*", default=list(BACKENDS), choices=list(BACKENDS),
+                        help="Zu vergleichende Retriever")
+    parser.add_argument("--embeddings", type=str, default="hashing", help="hashing oder st:<Modell>")
+    parser.add_argument("--k", type=int, nargs="*", default=[1, 3, 5], help="Werte von k für Recall@k")
+    parser.add_argument("--repeat", type=int, default=5, help="Wiederholungen pro Anfrage für die Latenz")
+    parser.add_argument("--output", type=str, help="Pfad für die Ergebnisse (JSON)")
+    parser.add_argument("--history", type=str, help="JSONL-Datei, an die jeder Lauf angehängt wird")
+    args = parser.parse_args()
+
+    documents = load_corpus(args.corpus)
+    with open(args.queries, 'r', encoding='utf-8') as f:
+        queries = json.load(f)
+    known = {document["source"] for document in documents}
+    missing = {source for query in queries for source in query["expected"]} - known
+    if missing:
+        print(f"Warnung: erwartete Quellen fehlen im Korpus: {', '.join(sorted(missing))}")
+
+    results = []
+    for chunking in args.chunking:
+        results.extend(run_config(documents, chunking, args.backends, args.embeddings, queries, args.k, args.repeat))
+
+    recall_k = f"@{max(args.k)}"
+    if not tokenizer_available():
+        print("\nHinweis: tiktoken nicht verfügbar, die Tokens sind geschätzt (vier Zeichen pro Token)")
+    print(f"\n{'Chunking':<14} {'Retriever':<9} {'Chunks':>7} {'Tokens':>7} {'Aufbau s':>9} "
+          + " ".join(f"{'R@' + str(k):>6}" for k in args.k) + f" {'MRR':>6} {'p50 ms':>8} {'p95 ms':>8}")
+    for r in results:
+        print(f"{r['chunking']:<14} {r['backend']:<9} {r['chunks']:>7} {r['embedding_tokens']:>7} {r['build_seconds']:>9.3f} "
+              + " ".join(f"{r['recall'][f'@{k}']:>6.3f}" for k in args.k)
+              + f" {r['mrr']:>6.3f} {r['latency_ms']['p50']:>8.3f} {r['latency_ms']['p95']:>8.3f}")
+    best = max(results, key=lambda r: (r["recall"][recall_k], r["mrr"]), default=None)
+    if best:
+        print(f"Beste Konfiguration nach Recall{recall_k}: {best['chunking']} mit {best['backend']}")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "embeddings": args.embeddings,
+            "tokenizer": "tiktoken" if tokenizer_available() else "estimate",
+            "documents": len(documents),
+            "corpus_bytes": sum(len(document["text"].encode("utf-8")) for document in documents),
+            "queries": len(queries),
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    if args.output:
+        output_dir = os.path.dirname(args.output)
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Ergebnisse wurden gespeichert unter: {args.output}")
+    if args.history:
+        history_dir = os.path.dirname(args.history)
+        if history_dir and not os.path.exists(history_dir):
+            os.makedirs(history_dir)
+        with open(args.history, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(report, ensure_ascii=False) + "\n")
+        print(f"Lauf wurde angehängt an: {args.history}")
+
+
+if __name__ == "__main__":
+    main()
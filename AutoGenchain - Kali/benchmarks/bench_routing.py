@@ -0,0 +1,112 @@
+"""
+Benchmark: Kosten und Latenz einer Zusammenarbeit pro Routing-Profil
+
+Führt dieselben Aufgaben mit jedem Routing-Profil aus config/agent_config.json
+gegen den lokalen Testserver (mock_llm.py) aus und vergleicht pro Zusammenarbeit
+die Laufzeit und die Kosten, getrennt nach Sprecherauswahl des Managers und
+Antworten der Agenten.
+
+Aufruf:
+    python benchmarks/bench_routing.py --runs 3 --time-scale 0.2
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from mock_llm import MockLLMServer
+
+TASKS = [
+    "Erstelle einen Plan für die passive Aufklärung von example.com",
+    "Bewerte die Angriffsfläche einer öffentlichen REST-API mit OAuth-Anmeldung",
+    "Plane die Überprüfung eines Login-Formulars auf SQL-Injection und Brute-Force-Schutz",
+]
+
+
+def run_profile(profile: str, server: MockLLMServer, runs: int) -> Dict[str, Any]:
+    """
+    Führt alle Aufgaben mit einem Routing-Profil aus
+
+    Args:
+        profile: Name des Routing-Profils
+        server: Der laufende Testserver
+        runs: Anzahl der Aufgaben
+
+    Returns:
+        Ein Wörterbuch mit Routing, Laufzeiten und Kosten pro Zusammenarbeit
+    """
+    from autogen_agents import BugBountyAgents
+
+    team = BugBountyAgents(routing_profile=profile, cache_seed=None)
+    server.reset_stats()
+    seconds: List[float] = []
+    rounds: List[int] = []
+    for i in range(runs):
+        session = team.create_session()
+        session["user_proxy"].human_input_mode = "NEVER"
+        start = time.perf_counter()
+        messages = team.run_session(session, TASKS[i % len(TASKS)])
+        seconds.append(time.perf_counter() - start)
+        rounds.append(len(messages))
+        team.close_session(session)
+
+    stats = list(server.stats.values())
+    routing_cost = sum(s["cost"] for s in stats if s["kind"] == "routing")
+    reply_cost = sum(s["cost"] for s in stats if s["kind"] == "reply")
+    return {
+        "profile": profile,
+        "routing": team.describe_routing(),
+        "collaborations": runs,
+        "avg_messages": sum(rounds) / runs,
+        "avg_seconds": sum(seconds) / runs,
+        "avg_cost": (routing_cost + reply_cost) / runs,
+        "avg_routing_cost": routing_cost / runs,
+        "avg_reply_cost": reply_cost / runs,
+        "avg_routing_seconds": sum(s["seconds"] for s in stats if s["kind"] == "routing") / runs,
+        "models": stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kosten und Latenz pro Routing-Profil")
+    parser.add_argument("--profiles", nargs="*", help="Zu vergleichende Profile (Standard: alle)")
+    parser.add_argument("--runs", type=int, default=3, help="Zusammenarbeiten pro Profil")
+    parser.add_argument("--time-scale", type=float, default=0.2, help="Faktor für die simulierten Latenzen")
+    parser.add_argument("--output", type=str, help="Pfad für die Ergebnisse (JSON)")
+    args = parser.parse_args()
+
+    server = MockLLMServer(time_scale=args.time_scale).start()
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+    from autogen_agents import load_agent_config
+    profiles = args.profiles or list(load_agent_config().get("routing_profiles", {"uniform": {}}))
+
+    results = []
+    try:
+        for profile in profiles:
+            results.append(run_profile(profile, server, args.runs))
+    finally:
+        server.stop()
+
+    print(f"\n{'Profil':<10} {'Manager':<14} {'Nachr.':>7} {'Sekunden':>9} {'Auswahl s':>10} "
+          f"{'USD/Zus.':>10} {'Auswahl':>10} {'Agenten':>10}")
+    for r in results:
+        print(f"{r['profile']:<10} {r['routing']['GroupChatManager']['model']:<14} {r['avg_messages']:>7.1f} "
+              f"{r['avg_seconds']:>9.2f} {r['avg_routing_seconds']:>10.2f} {r['avg_cost']:>10.5f} "
+              f"{r['avg_routing_cost']:>10.5f} {r['avg_reply_cost']:>10.5f}")
+    print(f"(Latenzen mit Faktor {args.time_scale} simuliert)")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"Ergebnisse wurden gespeichert unter: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Benchmark: eingesparte Runden durch die lokale Erkennung des Gesprächsendes
+
+Spielt synthetische, von Hand geschriebene Gespräche (die Nachrichten, die der
+prüfende Agent erhält) durch einen frischen TerminationDetector. Sie sind
+Gesprächen nachempfunden, in denen das Modell nie TERMINATE sagt und die deshalb
+bis max_consecutive_auto_reply bzw. max_round laufen. "done" ist die Nachricht,
+nach der die Aufgabe tatsächlich erledigt war; ein Ende davor ist verfrüht.
+
+Aufruf:
+    python benchmarks/bench_termination.py
+    python benchmarks/bench_termination.py --output termination.json
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from termination import TerminationDetector
+
+
+def tool_call(name: str, arguments: str, call_id: str = "call_1") -> Dict[str, Any]:
+    """Eine Nachricht, die nur einen Tool-Aufruf vorschlägt"""
+    return {"content": None, "tool_calls": [{"id": call_id, "function": {"name": name, "arguments": arguments}}]}
+
+
+CONVERSATIONS: List[Dict[str, Any]] = [
+    {
+        "name": "Aufklärung, Antwort wiederholt",
+        "done": 2,
+        "messages": [tool_call("search_recon_knowledge", '{"query": "subdomain enumeration"}')]
+        + [{"content": "Für example.com wurden 12 Subdomains gefunden, darunter api, dev und staging."}] * 9,
+    },
+    {
+        "name": "TeamLead, Fazit mit Rückfrage",
+        "done": 3,
+        "messages": [
+            tool_call("search_vulnerability_knowledge", '{"query": "OAuth misconfiguration"}'),
+            {"content": "Die API prüft den redirect_uri-Parameter nicht streng; das ist der wichtigste Befund."},
+            {"content": "Zusammenfassung: Aufklärung abgeschlossen, redirect_uri-Prüfung als Hauptrisiko, "
+                        "danach Rate-Limits des Token-Endpunkts testen.\nGibt es noch weitere Fragen?"},
+        ]
+        + [{"content": "Gern, viel Erfolg beim Test!"}] * 7,
+    },
+    {
+        "name": "Schwachstellensuche, Tool-Schleife",
+        "done": 2,
+        "messages": [tool_call("search_vulnerability_knowledge", '{"query": "CVE-2024-3094"}')]
+        + [{"content": "Dazu gibt es keinen Treffer, ich suche noch einmal."}]
+        + [tool_call("search_vulnerability_knowledge", '{"query": "CVE-2024-3094"}')] * 8,
+    },
+    {
+        "name": "Exploit-Planung, leere Antworten",
+        "done": 2,
+        "messages": [
+            tool_call("search_exploit_knowledge", '{"query": "SQL injection login"}'),
+            {"content": "Für das Login-Formular zuerst zeitbasierte Blind-SQLi mit sqlmap --technique=T prüfen."},
+        ]
+        + [{"content": ""}] * 8,
+    },
+    {
+        "name": "Aktionsplan, fast gleiche Fassungen",
+        "done": 2,
+        "messages": [
+            {"content": "Aktionsplan: passive Aufklärung, dann Portscan der gefundenen Hosts, "
+                        "anschließend gezielte Tests der API-Endpunkte auf Autorisierungsfehler."},
+            {"content": "Aktionsplan: erst passive Aufklärung, dann ein Portscan der gefundenen Hosts, "
+                        "anschließend gezielte Tests der API-Endpunkte auf Autorisierungsfehler."},
+        ]
+        + [{"content": "Aktionsplan: erst passive Aufklärung, dann ein Portscan der gefundenen Hosts, "
+                       "danach gezielte Tests der API-Endpunkte auf Autorisierungsfehler."}] * 6,
+    },
+    {
+        "name": "Rückfrage mitten in der Diskussion",
+        "done": 4,
+        "messages": [
+            {"content": "Der Scope umfasst *.example.com. Gibt es noch weitere Fragen zum Scope, "
+                        "bevor ich mit der Aufklärung beginne?"},
+            {"content": "Verstanden, keine Tests gegen Drittanbieter. Ich beginne mit der passiven Aufklärung."},
+            tool_call("search_recon_knowledge", '{"query": "passive recon"}'),
+            {"content": "Fazit: 12 Subdomains, api.example.com mit veralteter nginx-Version als erstes Ziel.\n"
+                        "Gibt es noch etwas, das ich prüfen soll?"},
+        ]
+        + [{"content": "Alles klar, ich warte auf die Freigabe."}] * 6,
+    },
+    {
+        "name": "regelkonform, mit TERMINATE",
+        "done": 3,
+        "messages": [
+            tool_call("search_recon_knowledge", '{"query": "dns records"}'),
+            {"content": "Die DNS-Einträge zeigen einen vergessenen Staging-Server."},
+            {"content": "TERMINATE"},
+        ],
+    },
+]
+
+
+def replay(conversation: Dict[str, Any]) -> Tuple[int, str]:
+    """
+    Spielt ein Gespräch durch einen frischen Detektor
+
+    Returns:
+        (Nachricht, nach der beendet wurde, Detektor oder "-")
+    """
+    detector = TerminationDetector()
+    for i, message in enumerate(conversation["messages"], start=1):
+        # Jede empfangene Nachricht ist ein neues Wörterbuch, wie im laufenden Chat
+        if detector(dict(message)):
+            return i, detector.events[-1]["detector"]
+    return len(conversation["messages"]), "-"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Eingesparte Runden durch die lokale Erkennung des Gesprächsendes")
+    parser.add_argument("--output", type=str, help="Pfad für die Ergebnisse (JSON)")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'Gespräch':<38} {'lief':>5} {'Ende':>5} {'gespart':>8}  Detektor")
+    for conversation in CONVERSATIONS:
+        ran = len(conversation["messages"])
+        stop, detector = replay(conversation)
+        premature = stop < conversation["done"]
+        results.append({"name": conversation["name"], "ran": ran, "stopped": stop,
+                        "done": conversation["done"], "detector": detector, "premature": premature})
+        flag = "  (verfrüht!)" if premature else ""
+        print(f"{conversation['name']:<38} {ran:>5} {stop:>5} {ran - stop:>8}  {detector}{flag}")
+    total = sum(r["ran"] for r in results)
+    used = sum(r["stopped"] for r in results)
+    print(f"Runden: {used} von {total} ({1 - used / total:.0%} gespart)")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"Ergebnisse wurden gespeichert unter: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
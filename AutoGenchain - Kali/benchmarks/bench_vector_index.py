@@ -0,0 +1,293 @@
+"""
+Benchmark: Speicher, Aufbauzeit und Suchlatenz des kompakten Vektorindex gegenüber Chroma
+
+Erzeugt synthetische, um Cluster gestreute Embeddings (Standard: 384 Dimensionen wie
+all-MiniLM-L6-v2) für jede Korpusgröße und baut damit jeden Index auf. Aufbau und
+Suche laufen jeweils in einem eigenen Prozess, so wie ein Worker einen vorhandenen
+Index öffnet. Gemessen werden:
+
+- Aufbauzeit und Spitzen-RSS des Aufbaus
+- Öffnungszeit, RSS nach den Anfragen und davon anonymer (privater) Speicher; die
+  Seiten eines Memmap zählen zum RSS, sind aber dateibasiert, werden über den
+  Page-Cache zwischen Prozessen geteilt und können vom System verdrängt werden
+- p50/p95 der Suchlatenz und Recall@k gegenüber der exakten Suche in float32
+- Größe des Index auf der Festplatte
+
+Indizes: "int8" (Brute-Force über int8), "int8-ivf" und "float16-ivf" (IVF mit √n
+Listen) jeweils mit exaktem Re-Ranking, sowie "chroma" (HNSW, persistent), falls
+chromadb installiert ist. Chroma wird nur bis --chroma-max Vektoren gemessen, da es
+alle Vektoren als float32 im Speicher hält.
+
+Aufruf:
+    python benchmarks/bench_vector_index.py
+    python benchmarks/bench_vector_index.py --sizes 10000 100000 1000000 --indexes int8-ivf chroma \\
+        --output results/vector_index.json --history results/vector_index_history.jsonl
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict
+
+import numpy as np
+
+PROJECT_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, PROJECT_ROOT)
+
+from src.utils.vector_index import CompactVectorIndex, normalize
+
+INDEXES = {
+    "int8": {"dtype": "int8", "nlist": 0},
+    "int8-ivf": {"dtype": "int8", "nlist": None},
+    "float16-ivf": {"dtype": "float16", "nlist": None},
+    "chroma": {},
+}
+
+DEFAULT_SIZES = [10000, 100000, 1000000]
+
+
+def memory() -> Dict[str, float]:
+    """
+    Speicher des aktuellen Prozesses in MiB
+
+    Returns:
+        rss, anonymous (privater Heap ohne Datei-Seiten) und peak_rss
+    """
+    values = {"peak_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+    try:
+        with open("/proc/self/smaps_rollup", "r") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in ("Rss", "Anonymous"):
+                    values[key.lower()] = int(rest.split()[0]) / 1024
+    except OSError:
+        pass
+    return values
+
+
+def make_dataset(workdir: str, size: int, dimensions: int, queries: int, k: int, seed: int = 0) -> Dict[str, str]:
+    """
+    Erzeugt Embeddings, Anfragen und die exakten Ergebnisse (werden im Arbeitsverzeichnis zwischengespeichert)
+
+    Args:
+        workdir: Arbeitsverzeichnis
+        size: Anzahl der Vektoren
+        dimensions: Dimension der Vektoren
+        queries: Anzahl der Anfragen
+        k: Anzahl der exakten Ergebnisse pro Anfrage
+        seed: Startwert des Zufallsgenerators
+
+    Returns:
+        Pfade der Dateien "vectors", "queries" und "truth"
+    """
+    prefix = os.path.join(workdir, f"data-{size}-{dimensions}-{seed}")
+    paths = {name: f"{prefix}-{name}.npy" for name in ("vectors", "queries", "truth")}
+    if all(os.path.exists(path) for path in paths.values()):
+        return paths
+
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(100, size // 500), dimensions)).astype(np.float32)
+    vectors = np.lib.format.open_memmap(paths["vectors"], mode="w+", dtype=np.float32, shape=(size, dimensions))
+    for start in range(0, size, 65536):
+        count = min(65536, size - start)
+        noise = rng.normal(scale=0.6, size=(count, dimensions)).astype(np.float32)
+        vectors[start:start + count] = centers[rng.integers(0, len(centers), count)] + noise
+    vectors.flush()
+
+    # Anfragen in der Nähe vorhandener Vektoren
+    query_vectors = normalize(vectors[np.sort(rng.choice(size, queries, replace=False))])
+    query_vectors = normalize(query_vectors + rng.normal(scale=0.05, size=query_vectors.shape).astype(np.float32))
+    scores, rows = [], []
+    for start in range(0, size, 65536):
+        block = normalize(vectors[start:start + 65536]) @ query_vectors.T
+        best = np.argpartition(-block, min(k, len(block)) - 1, axis=0)[:k]
+        scores.append(np.take_along_axis(block, best, axis=0))
+        rows.append(best + start)
+    scores, rows = np.concatenate(scores), np.concatenate(rows)
+    order = np.argsort(-scores, axis=0)[:k]
+    np.save(paths["queries"], query_vectors)
+    np.save(paths["truth"], np.take_along_axis(rows, order, axis=0).T)
+    del vectors
+    return paths
+
+
+def build(index: str, vectors_path: str, index_path: str) -> Dict[str, Any]:
+    """Baut einen Index auf (läuft im eigenen Prozess)"""
+    vectors = np.load(vectors_path, mmap_mode="r")
+    start = time.perf_counter()
+    if index == "chroma":
+        import chromadb
+
+        client = chromadb.PersistentClient(path=index_path)
+        collection = client.create_collection("bench", metadata={"hnsw:space": "cosine"})
+        for offset in range(0, len(vectors), 5000):
+            block = normalize(vectors[offset:offset + 5000])
+            collection.add(ids=[str(row) for row in range(offset, offset + len(block))], embeddings=block.tolist())
+    else:
+        CompactVectorIndex.build(index_path, vectors, **INDEXES[index])
+    seconds = time.perf_counter() - start
+    disk = sum(os.path.getsize(os.path.join(directory, name))
+               for directory, _, files in os.walk(index_path) for name in files)
+    return {"build_seconds": round(seconds, 3), "build_peak_rss_mb": round(memory()["peak_rss"], 1),
+            "disk_mb": round(disk / 2**20, 1)}
+
+
+def search(index: str, paths: Dict[str, str], index_path: str, k: int, repeat: int) -> Dict[str, Any]:
+    """Öffnet einen Index wie ein Worker und beantwortet die Anfragen (läuft im eigenen Prozess)"""
+    queries = np.load(paths["queries"])
+    truth = np.load(paths["truth"])
+    before = memory()
+    start = time.perf_counter()
+    if index == "chroma":
+        import chromadb
+
+        collection = chromadb.PersistentClient(path=index_path).get_collection("bench")
+
+        def run(query):
+            result = collection.query(query_embeddings=[query.tolist()], n_results=k)
+            return [int(row) for row in result["ids"][0]]
+    else:
+        compact = CompactVectorIndex(index_path)
+
+        def run(query):
+            return compact.search(query, k=k)[0].tolist()
+    # Der erste Zugriff lädt den Index (Chroma) bzw. die ersten Seiten (Memmap)
+    found = [run(query) for query in queries]
+    open_seconds = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(repeat):
+        for query in queries:
+            query_start = time.perf_counter()
+            run(query)
+            latencies.append((time.perf_counter() - query_start) * 1000)
+    recall = np.mean([len(set(rows) & set(expected.tolist())) / k for rows, expected in zip(found, truth)])
+    after = memory()
+    return {
+        "open_seconds": round(open_seconds, 3),
+        "recall": round(float(recall), 4),
+        "latency_ms": {"p50": round(float(np.percentile(latencies, 50)), 3),
+                       "p95": round(float(np.percentile(latencies, 95)), 3),
+                       "mean": round(float(np.mean(latencies)), 3)},
+        "rss_mb": round(after.get("rss", after["peak_rss"]) - before.get("rss", 0), 1),
+        "anonymous_mb": round(after.get("anonymous", 0) - before.get("anonymous", 0), 1),
+    }
+
+
+def run_worker(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Startet build() oder search() in einem neuen Python-Prozess"""
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", json.dumps(task)],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "Worker fehlgeschlagen")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def git_commit() -> str:
+    """Gibt den aktuellen Commit zurück (leer außerhalb eines Git-Repositorys)"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip()
+    except Exception:
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Speicher und Latenz des kompakten Vektorindex gegenüber Chroma")
+    parser.add_argument("--sizes", type=int, nargs="*", default=DEFAULT_SIZES, help="Anzahl der Vektoren")
+    parser.add_argument("--dimensions", type=int, default=384, help="Dimension der Embeddings")
+    parser.add_argument("--indexes", nargs="*", default=list(INDEXES), choices=list(INDEXES),
+                        help="Zu vergleichende Indizes")
+    parser.add_argument("--chroma-max", type=int, default=100000, help="Größte Korpusgröße für Chroma")
+    parser.add_argument("--queries", type=int, default=50, help="Anzahl der Anfragen")
+    parser.add_argument("--k", type=int, default=10, help="Anzahl der Ergebnisse pro Anfrage")
+    parser.add_argument("--repeat", type=int, default=3, help="Wiederholungen pro Anfrage für die Latenz")
+    parser.add_argument("--workdir", type=str, help="Verzeichnis für Daten und Indizes (Standard: temporär)")
+    parser.add_argument("--output", type=str, help="Pfad für die Ergebnisse (JSON)")
+    parser.add_argument("--history", type=str, help="JSONL-Datei, an die jeder Lauf angehängt wird")
+    parser.add_argument("--worker", type=str, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        task = json.loads(args.worker)
+        if task["action"] == "build":
+            result = build(task["index"], task["paths"]["vectors"], task["index_path"])
+        else:
+            result = search(task["index"], task["paths"], task["index_path"], task["k"], task["repeat"])
+        print(json.dumps(result))
+        return
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="bench_vector_index-")
+    os.makedirs(workdir, exist_ok=True)
+    results = []
+    for size in args.sizes:
+        print(f"Erzeuge {size} Vektoren mit {args.dimensions} Dimensionen ...")
+        paths = make_dataset(workdir, size, args.dimensions, args.queries, args.k)
+        for index in args.indexes:
+            if index == "chroma" and size > args.chroma_max:
+                print(f"  {index}: übersprungen (--chroma-max {args.chroma_max})")
+                continue
+            index_path = os.path.join(workdir, f"{index}-{size}")
+            shutil.rmtree(index_path, ignore_errors=True)
+            task = {"index": index, "paths": paths, "index_path": index_path, "k": args.k, "repeat": args.repeat}
+            try:
+                result = {"index": index, "size": size,
+                          **run_worker({**task, "action": "build"}),
+                          **run_worker({**task, "action": "search"})}
+            except RuntimeError as e:
+                print(f"  {index}: Fehler: {e}")
+                continue
+            finally:
+                shutil.rmtree(index_path, ignore_errors=True)
+            print(f"  {index}: Aufbau {result['build_seconds']:.1f} s, p50 {result['latency_ms']['p50']:.2f} ms, "
+                  f"RSS {result['rss_mb']:.0f} MiB")
+            results.append(result)
+    if not args.workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"\n{'Index':<12} {'Vektoren':>9} {'Aufbau s':>9} {'Peak MiB':>9} {'Platte MiB':>10} {'Öffnen s':>9} "
+          f"{'RSS MiB':>8} {'Anon MiB':>9} {'p50 ms':>8} {'p95 ms':>8} {'R@' + str(args.k):>6}")
+    for r in results:
+        print(f"{r['index']:<12} {r['size']:>9} {r['build_seconds']:>9.2f} {r['build_peak_rss_mb']:>9.0f} "
+              f"{r['disk_mb']:>10.1f} {r['open_seconds']:>9.2f} {r['rss_mb']:>8.1f} {r['anonymous_mb']:>9.1f} "
+              f"{r['latency_ms']['p50']:>8.2f} {r['latency_ms']['p95']:>8.2f} {r['recall']:>6.3f}")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "dimensions": args.dimensions,
+            "queries": args.queries,
+            "k": args.k,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    if args.output:
+        output_dir = os.path.dirname(args.output)
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Ergebnisse wurden gespeichert unter: {args.output}")
+    if args.history:
+        history_dir = os.path.dirname(args.history)
+        if history_dir and not os.path.exists(history_dir):
+            os.makedirs(history_dir)
+        with open(args.history, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(report, ensure_ascii=False) + "\n")
+        print(f"Lauf wurde angehängt an: {args.history}")
+
+
+if __name__ == "__main__":
+    main()
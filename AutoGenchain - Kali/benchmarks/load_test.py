@@ -0,0 +1,155 @@
+"""
+Lasttest für den HTTP-Dienst (main.py serve) gegen den lokalen Testserver
+
+Startet ohne --url den Testserver (mock_llm.py) und den Dienst im selben Prozess,
+sendet dann `--requests` Analyse-Anfragen mit `--concurrency` gleichzeitigen
+Verbindungen und misst Zeit bis zum ersten Ereignis, Gesamtdauer, Durchsatz und
+die Anzahl der wegen voller Warteschlange abgelehnten Anfragen (503).
+
+Aufruf:
+    python benchmarks/load_test.py --requests 100 --concurrency 40 --workers 8 --queue-size 16
+    python benchmarks/load_test.py --url http://127.0.0.1:8080 --requests 50
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from mock_llm import MockLLMServer
+
+
+async def analyze(url: str, task: str, fetch_knowledge: bool, timeout: float) -> Dict[str, Any]:
+    """
+    Sendet eine Analyse-Anfrage und liest den NDJSON-Stream
+
+    Args:
+        url: Basis-URL des Dienstes
+        task: Die Aufgabe
+        fetch_knowledge: Ob Wissen aus der Wissensdatenbank abgerufen werden soll
+        timeout: Zeitlimit der Anfrage in Sekunden
+
+    Returns:
+        Ein Wörterbuch mit Status, Zeiten und Anzahl der Ereignisse
+    """
+    parts = urlsplit(url)
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection(parts.hostname, parts.port)
+    body = json.dumps({"task": task, "fetch_knowledge": fetch_knowledge, "timeout": timeout}).encode("utf-8")
+    writer.write(
+        f"POST /analyze HTTP/1.1\r\nHost: {parts.netloc}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    while (await reader.readline()) not in (b"\r\n", b""):
+        pass
+    result = {"status": status, "first_event": None, "events": 0, "messages": 0, "outcome": None}
+    if status == 200:
+        # Chunked: Größenzeile, NDJSON-Zeile, Leerzeile
+        while True:
+            size = int((await reader.readline()).strip() or b"0", 16)
+            if size == 0:
+                break
+            event = json.loads(await reader.readexactly(size))
+            await reader.readline()
+            if result["first_event"] is None:
+                result["first_event"] = time.perf_counter() - start
+            result["events"] += 1
+            result["messages"] += event["event"] == "message"
+            if event["event"] in ("result", "error"):
+                result["outcome"] = event["event"]
+    writer.close()
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Perzentil einer Liste von Werten"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+async def run_load(args) -> List[Dict[str, Any]]:
+    limit = asyncio.Semaphore(args.concurrency)
+
+    async def one(i: int):
+        async with limit:
+            return await analyze(args.url, f"Lasttest-Aufgabe {i}: Aufklärung von shop{i}.example.com",
+                                 args.fetch_knowledge, args.timeout)
+
+    return await asyncio.gather(*[one(i) for i in range(args.requests)])
+
+
+async def main_async(args):
+    server = None
+    if not args.url:
+        from integration import HybridAgentManager
+        from server import AgentServer
+
+        # Ein vorgewärmter Manager für alle Anfragen, wie bei main.py serve
+        # (ohne Antwortcache: jede Anfrage soll den Testserver erreichen und nichts unter .cache/ schreiben)
+        server = AgentServer(HybridAgentManager(cache_seed=None), port=0, workers=args.workers, queue_size=args.queue_size)
+        await server.start()
+        args.url = f"http://127.0.0.1:{server.port}"
+
+    start = time.perf_counter()
+    results = await run_load(args)
+    total = time.perf_counter() - start
+    if server:
+        await server.stop()
+
+    ok = [r for r in results if r["status"] == 200 and r["outcome"] == "result"]
+    rejected = [r for r in results if r["status"] == 503]
+    failed = len(results) - len(ok) - len(rejected)
+    seconds = [r["seconds"] for r in ok]
+    first = [r["first_event"] for r in ok if r["first_event"] is not None]
+
+    print(f"\n{len(results)} Anfragen, {args.concurrency} gleichzeitig, {total:.1f}s gesamt")
+    print(f"  erfolgreich: {len(ok)}, abgelehnt (503): {len(rejected)}, fehlgeschlagen: {failed}")
+    print(f"  Durchsatz: {len(ok) / total:.2f} Analysen/s")
+    print(f"  Dauer p50/p95/max: {percentile(seconds, 50):.2f}s / {percentile(seconds, 95):.2f}s / "
+          f"{max(seconds, default=0):.2f}s")
+    print(f"  erstes Ereignis p50/p95: {percentile(first, 50) * 1000:.0f}ms / {percentile(first, 95) * 1000:.0f}ms")
+    if ok:
+        print(f"  gestreamte Nachrichten pro Analyse: {sum(r['messages'] for r in ok) / len(ok):.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lasttest für den Bug-Bounty-HTTP-Dienst")
+    parser.add_argument("--url", type=str, help="URL eines laufenden Dienstes (sonst im Prozess gestartet)")
+    parser.add_argument("--requests", type=int, default=50, help="Anzahl der Anfragen")
+    parser.add_argument("--concurrency", type=int, default=20, help="Gleichzeitige Verbindungen")
+    parser.add_argument("--workers", type=int, default=8, help="Worker des im Prozess gestarteten Dienstes")
+    parser.add_argument("--queue-size", type=int, default=32, help="Warteschlange des im Prozess gestarteten Dienstes")
+    parser.add_argument("--timeout", type=float, default=120, help="Zeitlimit pro Anfrage in Sekunden")
+    parser.add_argument("--fetch-knowledge", action="store_true", help="Wissen aus der Wissensdatenbank abrufen")
+    parser.add_argument("--time-scale", type=float, default=0.2, help="Faktor für die simulierten Latenzen")
+    args = parser.parse_args()
+
+    mock = None
+    if not args.url:
+        mock = MockLLMServer(time_scale=args.time_scale).start()
+        # OPENAI_BASE_URL für AutoGen und AsyncOpenAI, OPENAI_API_BASE für Langchain
+        os.environ["OPENAI_BASE_URL"] = mock.base_url
+        os.environ["OPENAI_API_BASE"] = mock.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "sk-loadtest")
+
+    try:
+        asyncio.run(main_async(args))
+    finally:
+        if mock:
+            mock.stop()
+
+
+if __name__ == "__main__":
+    main()
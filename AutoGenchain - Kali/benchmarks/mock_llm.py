@@ -0,0 +1,251 @@
+"""
+Lokaler OpenAI-kompatibler Testserver für Benchmarks der Agenten
+
+Beantwortet /v1/chat/completions mit künstlicher, modellabhängiger Latenz und
+zählt Tokens und Kosten pro Modell. /v1/embeddings liefert deterministische
+Vektoren aus gehashten Wörtern. Anfragen zur Sprecherauswahl des
+Gruppenchat-Managers werden getrennt von den Antworten der Agenten erfasst.
+Die Agenten nutzen den Server über die Umgebungsvariable OPENAI_BASE_URL.
+"""
+
+import ast
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+# Latenz (Sekunden bis zum ersten Token, Sekunden pro Ausgabetoken) und
+# Preis in USD pro 1000 Tokens (Eingabe, Ausgabe) je Modell
+MODEL_PROFILES = {
+    "gpt-4o-mini": {"latency": (0.25, 0.006), "price": (0.00015, 0.0006)},
+    "gpt-4o": {"latency": (0.45, 0.012), "price": (0.0025, 0.01)},
+    "gpt-3.5-turbo": {"latency": (0.3, 0.008), "price": (0.0005, 0.0015)},
+    "gpt-4": {"latency": (0.8, 0.03), "price": (0.03, 0.06)},
+}
+
+# Bausteine für unterschiedliche Antworten der simulierten Agenten
+_REPLIES = [
+    "Die Subdomains ermitteln wir passiv über Zertifikatstransparenz-Logs und DNS-Verläufe.",
+    "Offene Ports und Dienstversionen gleichen wir mit bekannten CVEs aus der NVD ab.",
+    "Für die Anmeldung prüfen wir Sperrmechanismen, Passwortrichtlinien und Sitzungscookies.",
+    "Eingabefelder testen wir mit harmlosen Sonderzeichen auf fehlende Validierung.",
+    "Die gefundenen Header zeigen, ob HSTS, CSP und X-Frame-Options gesetzt sind.",
+    "Jeder Befund bekommt eine CVSS-Bewertung und einen Vorschlag zur Behebung.",
+    "Technologie-Fingerprints aus Wappalyzer und HTTP-Antworten grenzen die Angriffsfläche ein.",
+    "API-Endpunkte dokumentieren wir aus der OpenAPI-Beschreibung und aus JavaScript-Dateien.",
+    "Autorisierungsfehler suchen wir, indem wir Objekt-IDs zwischen zwei Testkonten tauschen.",
+    "Der Scope des Programms schließt Denial-of-Service und Social Engineering ausdrücklich aus.",
+    "Für den Bericht sammeln wir Screenshots, Anfragen und Antworten jedes reproduzierbaren Schritts.",
+    "Rate-Limits der Schnittstelle messen wir vorsichtig mit wenigen Anfragen pro Minute.",
+    "Fehlermeldungen des Servers verraten oft Frameworks, Pfade oder Datenbanktypen.",
+]
+
+_SELECT_SPEAKER = re.compile(r"select the next role from (\[.*?\]) to play", re.S)
+
+
+def count_tokens(text: str) -> int:
+    """Grobe Tokenschätzung (etwa vier Zeichen pro Token)"""
+    return max(1, len(text) // 4)
+
+
+class MockLLMServer:
+    """OpenAI-kompatibler Server mit simulierten Modellen"""
+
+    def __init__(self,
+                host: str = "127.0.0.1",
+                port: int = 0,
+                time_scale: float = 1.0,
+                finish_after: int = 8,
+                exclude_speakers: Tuple[str, ...] = ("UserProxy",)):
+        """
+        Initialisiert den Server
+
+        Args:
+            host: Adresse des Servers
+            port: Port des Servers (0 wählt einen freien Port)
+            time_scale: Faktor für alle simulierten Latenzen
+            finish_after: Anzahl der Nachrichten, nach der Agenten mit TERMINATE abschließen
+            exclude_speakers: Agenten, die bei der Sprecherauswahl nie gewählt werden
+        """
+        self.time_scale = time_scale
+        self.finish_after = finish_after
+        self.exclude_speakers = exclude_speakers
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, Any]] = {}
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """Basis-URL für OPENAI_BASE_URL"""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockLLMServer":
+        """Startet den Server in einem Hintergrund-Thread"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Beendet den Server"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def reset_stats(self):
+        """Setzt die Zähler zurück"""
+        with self._lock:
+            self.stats.clear()
+
+    def complete(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Erzeugt eine Chat-Completion für eine Anfrage
+
+        Args:
+            request: Die Anfrage im Format der OpenAI-API
+
+        Returns:
+            Die Antwort im Format der OpenAI-API
+        """
+        model = request.get("model", "gpt-3.5-turbo")
+        profile = MODEL_PROFILES.get(model, MODEL_PROFILES["gpt-3.5-turbo"])
+        messages = request.get("messages", [])
+        prompt = "\n".join(str(m.get("content") or "") for m in messages)
+
+        match = _SELECT_SPEAKER.search(str(messages[-1].get("content") or "")) if messages else None
+        if match:
+            kind = "routing"
+            names = [n for n in ast.literal_eval(match.group(1)) if n not in self.exclude_speakers]
+            content = names[len(messages) % len(names)] if names else ""
+        else:
+            kind = "reply"
+            turn = sum(1 for m in messages if m.get("role") != "system")
+            if turn >= self.finish_after:
+                content = "Zusammenfassung: Der Aktionsplan ist vollständig. TERMINATE"
+            else:
+                first, second = (_REPLIES[(turn * 5 + len(prompt)) % len(_REPLIES)],
+                                 _REPLIES[(turn * 7 + 3) % len(_REPLIES)])
+                content = f"{first} {second}"
+
+        prompt_tokens, completion_tokens = count_tokens(prompt), count_tokens(content)
+        first_token, per_token = profile["latency"]
+        seconds = (first_token + per_token * completion_tokens) * self.time_scale
+        time.sleep(seconds)
+        cost = (profile["price"][0] * prompt_tokens + profile["price"][1] * completion_tokens) / 1000
+
+        with self._lock:
+            entry = self.stats.setdefault(f"{kind}:{model}", {
+                "kind": kind, "model": model, "calls": 0, "prompt_tokens": 0,
+                "completion_tokens": 0, "cost": 0.0, "seconds": 0.0
+            })
+            entry["calls"] += 1
+            entry["prompt_tokens"] += prompt_tokens
+            entry["completion_tokens"] += completion_tokens
+            entry["cost"] += cost
+            entry["seconds"] += seconds
+
+        return {
+            "id": f"chatcmpl-mock-{time.time_ns()}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }
+
+    def embed(self, request: Dict[str, Any], dim: int = 256) -> Dict[str, Any]:
+        """
+        Erzeugt Embeddings für eine Anfrage
+
+        Args:
+            request: Die Anfrage im Format der OpenAI-API
+            dim: Anzahl der Dimensionen
+
+        Returns:
+            Die Antwort im Format der OpenAI-API
+        """
+        inputs = request.get("input", [])
+        inputs = [inputs] if isinstance(inputs, str) else inputs
+        data = []
+        for index, text in enumerate(inputs):
+            vector = [0.0] * dim
+            for word in re.findall(r"\w+", str(text).lower()):
+                vector[int(hashlib.md5(word.encode()).hexdigest()[:8], 16) % dim] += 1.0
+            norm = sum(v * v for v in vector) ** 0.5 or 1.0
+            data.append({"object": "embedding", "index": index, "embedding": [v / norm for v in vector]})
+        tokens = sum(count_tokens(str(text)) for text in inputs)
+        with self._lock:
+            entry = self.stats.setdefault("embedding", {
+                "kind": "embedding", "model": request.get("model"), "calls": 0, "prompt_tokens": 0,
+                "completion_tokens": 0, "cost": 0.0, "seconds": 0.0
+            })
+            entry["calls"] += 1
+            entry["prompt_tokens"] += tokens
+        return {"object": "list", "data": data, "model": request.get("model"),
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens}}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if self.path.endswith("/chat/completions"):
+                    self._send(200, server.complete(request))
+                elif self.path.endswith("/embeddings"):
+                    self._send(200, server.embed(request))
+                else:
+                    self._send(404, {"error": {"message": f"Unbekannter Pfad: {self.path}"}})
+
+            def do_GET(self):
+                if self.path.endswith("/stats"):
+                    with server._lock:
+                        self._send(200, dict(server.stats))
+                else:
+                    self._send(404, {"error": {"message": f"Unbekannter Pfad: {self.path}"}})
+
+            def _send(self, status: int, body: Dict[str, Any]):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                try:
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    # Der Client hat die Anfrage abgebrochen
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="OpenAI-kompatibler Testserver mit simulierten Modellen")
+    parser.add_argument("--port", type=int, default=8089, help="Port des Servers (Standard: 8089)")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Faktor für alle Latenzen")
+    args = parser.parse_args()
+
+    mock = MockLLMServer(port=args.port, time_scale=args.time_scale)
+    print(f"Testserver läuft unter {mock.base_url} (OPENAI_BASE_URL)")
+    try:
+        mock.httpd.serve_forever()
+    except KeyboardInterrupt:
+        mock.stop()
@@ -0,0 +1,7 @@
+"""
+Gemeinsame pytest-Konfiguration für die Kali-Anwendung
+"""
+
+# test_knowledge_base.py ist ein Skript für einen manuellen Test gegen die OpenAI-API
+# (benötigt OPENAI_API_KEY) und keine pytest-Testdatei
+collect_ignore = ["test_knowledge_base.py"]
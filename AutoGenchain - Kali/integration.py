@@ -2,14 +2,15 @@
 Integration zwischen Langchain und AutoGen Agenten für Bug-Bounty-Planung
 """
 
-import os
-import json
-from typing import Dict, List, Any, Optional
+import asyncio
+from typing import Callable, Dict, List, Any, Optional
 from dotenv import load_dotenv
 
 # Importiere unsere benutzerdefinierten Module
-from langchain_agent import PenetrationTestAgent
-from autogen_agents import BugBountyAgents
+from src.agents.langchain_agent import PenetrationTestAgent
+from autogen_agents import BugBountyAgents, load_agent_config
+from prompt_builder import DEFAULT_PROMPT_BUDGETS, PromptBuilder
+from tracing import traced, tracer
 
 # Lade Umgebungsvariablen
 load_dotenv()
@@ -20,18 +21,30 @@ class HybridAgentManager:
     def __init__(self,
                 knowledge_base_path: str = "./bugbounty-agents/knowledge_base",
                 langchain_model: str = "gpt-3.5-turbo",
-                autogen_model: str = "gpt-3.5-turbo",
+                autogen_model: Optional[str] = None,
                 langchain_temperature: float = 0.2,
-                autogen_temperature: float = 0.7):
+                autogen_temperature: Optional[float] = None,
+                routing_profile: Optional[str] = None,
+                max_tokens: Optional[int] = None,
+                max_cost: Optional[float] = None,
+                langchain_agent_mode: str = "functions",
+                vector_backend: str = "chroma",
+                cache_seed: Optional[int] = 41):
         """
         Initialisiert den Hybrid-Agent-Manager
         
         Args:
             knowledge_base_path: Pfad zur Wissensdatenbank
             langchain_model: Name des für Langchain zu verwendenden LLM-Modells
-            autogen_model: Name des für AutoGen zu verwendenden LLM-Modells
+            autogen_model: Name des LLM-Modells für alle AutoGen-Agenten (sonst aus der Agentenkonfiguration)
             langchain_temperature: Temperatur für den Langchain-Agenten
-            autogen_temperature: Temperatur für die AutoGen-Agenten
+            autogen_temperature: Temperatur für alle AutoGen-Agenten (sonst aus der Agentenkonfiguration)
+            routing_profile: Routing-Profil der AutoGen-Agenten aus der Agentenkonfiguration
+            max_tokens: Tokenbudget pro Analyse; bei Erreichen endet der Gruppenchat
+            max_cost: Kostenbudget in USD pro Analyse; bei Erreichen endet der Gruppenchat
+            langchain_agent_mode: "functions" (strukturierte Tool-Aufrufe) oder "react" (Textformat)
+            vector_backend: Vektorindex der Wissensdatenbank: "chroma" oder "compact" (Memmap)
+            cache_seed: Seed des AutoGen-Antwortcaches (None deaktiviert den Cache)
         """
         self.knowledge_base_path = knowledge_base_path
         
@@ -39,14 +52,28 @@ class HybridAgentManager:
         self.langchain_agent = PenetrationTestAgent(
             knowledge_base_path=knowledge_base_path,
             model_name=langchain_model,
-            temperature=langchain_temperature
+            temperature=langchain_temperature,
+            agent_mode=langchain_agent_mode,
+            vector_backend=vector_backend
         )
         
+        # Gemeinsamer Wissensdienst des Prozesses (derselbe Index wie im Langchain-Agenten)
+        self.knowledge = self.langchain_agent.knowledge
+        
         # Initialisiere die AutoGen-Agenten
         self.autogen_agents = BugBountyAgents(
             temperature=autogen_temperature,
-            model=autogen_model
+            model=autogen_model,
+            routing_profile=routing_profile,
+            max_tokens=max_tokens,
+            max_cost=max_cost,
+            cache_seed=cache_seed,
+            knowledge=self.knowledge
         )
+        
+        # Zielgrößen der Prompts zwischen den Stufen (Tokens, begrenzt durch das Kontextfenster)
+        self.prompt_budgets = {**DEFAULT_PROMPT_BUDGETS,
+                               **load_agent_config(section="hybrid_integration").get("prompt_budgets", {})}
     
     def add_knowledge_to_base(self, content: str, filename: str) -> bool:
         """
@@ -61,6 +88,102 @@ class HybridAgentManager:
         """
         return self.langchain_agent.add_document_to_knowledge_base(content, filename)
     
+    def _knowledge_query(self, task: str) -> str:
+        """Erstellt die Anfrage an die Wissensdatenbank für eine Aufgabe"""
+        return f"Sammle relevante Informationen für die folgende Bug-Bounty-Aufgabe: {task}"
+    
+    def _prompt_builder(self, stage: str, model: str) -> PromptBuilder:
+        """Erstellt einen PromptBuilder mit dem Budget einer Stufe"""
+        return PromptBuilder(model=model, budget=self.prompt_budgets.get(stage))
+    
+    def _enhance_task(self, task: str, insights: Optional[str]) -> str:
+        """Erweitert die Aufgabe um das abgerufene Wissen"""
+        if not insights:
+            return task
+        # Die erweiterte Aufgabe steht in jedem Prompt des Gruppenchats
+        builder = self._prompt_builder("enhanced_task", self.autogen_agents.config_list[0]["model"])
+        builder.add("task", task, priority=100, strategy="keep")
+        builder.add("insights", insights, priority=10, strategy="summarize", min_tokens=100)
+        return builder.render("""
+            {task}
+            
+            Relevante Informationen aus der Wissensdatenbank:
+            {insights}
+            """, name="enhanced_task")
+    
+    def _final_plan(self, autogen_messages: List[Dict[str, Any]]) -> Optional[str]:
+        """Extrahiert den endgültigen Plan vom TeamLeadAgent"""
+        for msg in reversed(autogen_messages):
+            if msg.get("name") == "TeamLeadAgent":
+                return msg.get("content")
+        return None
+    
+    def _summary_query(self, results: Dict[str, Any]) -> str:
+        """Erstellt die Anfrage für die kombinierte Strategie"""
+        builder = self._prompt_builder("summary_query", self.langchain_agent.model_name)
+        builder.add("task", results["task"], priority=100, strategy="head", min_tokens=200)
+        builder.add("plan", results["autogen_plan"], priority=50, strategy="summarize", min_tokens=200)
+        builder.add("insights", results["langchain_insights"], priority=20, strategy="summarize", min_tokens=100)
+        return builder.render("""
+            Basierend auf dem abgerufenen Wissen und dem entwickelten Plan, erstelle eine zusammenfassende
+            Strategie für die folgende Bug-Bounty-Aufgabe:
+            
+            Aufgabe: {task}
+            
+            Abgerufenes Wissen:
+            {insights}
+            
+            Entwickelter Plan vom AutoGen-Team:
+            {plan}
+            
+            Fasse die Schlüsselkomponenten zu einer umfassenden Bug-Bounty-Strategie zusammen.
+            """, name="summary_query")
+    
+    def _refinement_query(self, task: str, combined_strategy: str) -> str:
+        """Erstellt die Anfrage zur Verfeinerung der Aufgabe für die nächste Iteration"""
+        builder = self._prompt_builder("refinement_query", self.langchain_agent.model_name)
+        builder.add("task", task, priority=100, strategy="head", min_tokens=200)
+        builder.add("strategy", combined_strategy, priority=50, strategy="summarize", min_tokens=200)
+        return builder.render("""
+                Basierend auf den bisherigen Ergebnissen, identifiziere Bereiche, die weiter untersucht werden sollten,
+                und formuliere eine verfeinerte Aufgabe für die nächste Iteration:
+                
+                Ursprüngliche Aufgabe: {task}
+                
+                Kombinierte Strategie aus der aktuellen Iteration:
+                {strategy}
+                
+                Formuliere eine spezifischere und fokussiertere Aufgabe für die nächste Iteration.
+                """, name="refinement_query")
+    
+    def _final_summary_query(self, task: str, results: Dict[str, Any], max_iterations: int) -> str:
+        """Erstellt die Anfrage für die Gesamtzusammenfassung aller Iterationen"""
+        builder = self._prompt_builder("final_summary_query", self.langchain_agent.model_name)
+        builder.add("task", task, priority=1000, strategy="head", min_tokens=200)
+        # Spätere Iterationen bauen auf den früheren auf und erhalten zuerst Budget
+        numbers = []
+        for iter in results["iterations"]:
+            if iter["result"]["combined_strategy"]:
+                numbers.append(iter["iteration"])
+                builder.add(f"iteration_{iter['iteration']}", iter["result"]["combined_strategy"],
+                            priority=iter["iteration"], strategy="summarize", min_tokens=100)
+        iterations = "\n".join(f"""
+        Iteration {number}:
+        {{iteration_{number}}}
+        """ for number in numbers)
+        return builder.render(f"""
+        Analysiere die Ergebnisse aller {max_iterations} Iterationen und erstelle eine umfassende
+        Zusammenfassung der Bug-Bounty-Strategie:
+        
+        Ursprüngliche Aufgabe: {{task}}
+        
+        Iterationen:
+        {iterations}
+        
+        Erstelle eine strukturierte und umfassende Bug-Bounty-Strategie auf Basis aller Iterationen.
+        """, name="final_summary_query")
+    
+    @traced("analyze")
     def analyze_bug_bounty_task(self, task: str, fetch_knowledge: bool = True) -> Dict[str, Any]:
         """
         Analysiert eine Bug-Bounty-Aufgabe mithilfe des Langchain-Agenten und der AutoGen-Agenten
@@ -70,7 +193,7 @@ class HybridAgentManager:
             fetch_knowledge: Ob zuerst relevantes Wissen über den Langchain-Agenten abgerufen werden soll
             
         Returns:
-            Ein Wörterbuch mit den Ergebnissen der Analyse
+            Ein Wörterbuch mit den Ergebnissen der Analyse und dem Verbrauch unter "usage"
         """
         results = {
             "task": task,
@@ -79,56 +202,101 @@ class HybridAgentManager:
             "combined_strategy": None
         }
         
-        # Schritt 1: Verwende den Langchain-Agenten, um Wissen aus der Wissensdatenbank abzurufen
-        if fetch_knowledge:
-            knowledge_query = f"Sammle relevante Informationen für die folgende Bug-Bounty-Aufgabe: {task}"
-            langchain_response = self.langchain_agent.run(knowledge_query)
-            results["langchain_insights"] = langchain_response
-        
-        # Schritt 2: Erweitere die Aufgabe mit dem abgerufenen Wissen
-        enhanced_task = task
-        if fetch_knowledge and results["langchain_insights"]:
-            enhanced_task = f"""
-            {task}
+        # Tokens, Kosten und Latenz aller LLM-Aufrufe der Analyse; das Budget gilt auch für Langchain
+        usage = self.autogen_agents.create_usage_ledger()
+        with usage.track(tracer.current()):
+            # Schritt 1: Verwende den Langchain-Agenten, um Wissen aus der Wissensdatenbank abzurufen
+            if fetch_knowledge:
+                with tracer.span("knowledge"):
+                    results["langchain_insights"] = self.langchain_agent.run(self._knowledge_query(task))
             
-            Relevante Informationen aus der Wissensdatenbank:
-            {results["langchain_insights"]}
-            """
-        
-        # Schritt 3: Starte die Zusammenarbeit der AutoGen-Agenten mit der erweiterten Aufgabe
-        autogen_messages = self.autogen_agents.start_collaboration(enhanced_task)
+            # Schritt 2: Erweitere die Aufgabe mit dem abgerufenen Wissen
+            enhanced_task = self._enhance_task(task, results["langchain_insights"])
+            
+            # Schritt 3: Starte die Zusammenarbeit der AutoGen-Agenten mit der erweiterten Aufgabe
+            autogen_messages = self.autogen_agents.start_collaboration(enhanced_task, usage=usage)
+            results["autogen_plan"] = self._final_plan(autogen_messages)
+            
+            # Schritt 4: Zusammenfassung der kombinierten Strategie durch den Langchain-Agenten
+            if results["langchain_insights"] and results["autogen_plan"]:
+                with tracer.span("summary"):
+                    results["combined_strategy"] = self.langchain_agent.run(self._summary_query(results))
+        results["usage"] = usage.summary()
         
-        # Extrahiere den endgültigen Plan vom TeamLeadAgent
-        final_plan = None
-        for msg in reversed(autogen_messages):
-            if msg.get("name") == "TeamLeadAgent":
-                final_plan = msg.get("content")
-                break
+        return results
+    
+    async def a_analyze_bug_bounty_task(self,
+                                        task: str,
+                                        fetch_knowledge: bool = True,
+                                        timeout: Optional[float] = None,
+                                        on_event: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Analysiert eine Bug-Bounty-Aufgabe asynchron (siehe analyze_bug_bounty_task)
         
-        results["autogen_plan"] = final_plan
+        Das Zeitlimit gilt für die gesamte Analyse. Bei Überschreitung oder Abbruch des
+        Tasks werden die laufenden LLM-Aufrufe von Langchain abgebrochen; bereits
+        gestellte Anfragen der AutoGen-Agenten laufen im Thread-Pool zu Ende.
+        Jede Analyse hat einen eigenen Konversationsspeicher des Langchain-Agenten,
+        sodass gleichzeitige Analysen einander nicht sehen.
         
-        # Schritt 4: Zusammenfassung der kombinierten Strategie durch den Langchain-Agenten
-        if results["langchain_insights"] and results["autogen_plan"]:
-            summary_query = f"""
-            Basierend auf dem abgerufenen Wissen und dem entwickelten Plan, erstelle eine zusammenfassende
-            Strategie für die folgende Bug-Bounty-Aufgabe:
+        Args:
+            task: Die zu analysierende Bug-Bounty-Aufgabe
+            fetch_knowledge: Ob zuerst relevantes Wissen über den Langchain-Agenten abgerufen werden soll
+            timeout: Zeitlimit in Sekunden (None für kein Limit)
+            on_event: Callback für Fortschrittsereignisse (Schritte und Nachrichten des Gruppenchats)
             
-            Aufgabe: {task}
+        Returns:
+            Ein Wörterbuch mit den Ergebnissen der Analyse
             
-            Abgerufenes Wissen:
-            {results["langchain_insights"]}
+        Raises:
+            asyncio.TimeoutError: Wenn das Zeitlimit überschritten wurde
+        """
+        return await asyncio.wait_for(self._a_analyze_bug_bounty_task(task, fetch_knowledge, on_event), timeout)
+    
+    @traced("analyze")
+    async def _a_analyze_bug_bounty_task(self,
+                                         task: str,
+                                         fetch_knowledge: bool,
+                                         on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+                                         memory=None) -> Dict[str, Any]:
+        emit = on_event or (lambda event: None)
+        memory = memory or self.langchain_agent.new_memory()
+        results = {
+            "task": task,
+            "langchain_insights": None,
+            "autogen_plan": None,
+            "combined_strategy": None
+        }
+        
+        usage = self.autogen_agents.create_usage_ledger()
+        with usage.track(tracer.current()):
+            if fetch_knowledge:
+                emit({"event": "step", "step": "knowledge"})
+                with tracer.span("knowledge"):
+                    results["langchain_insights"] = await self.langchain_agent.arun(self._knowledge_query(task),
+                                                                                    memory=memory)
             
-            Entwickelter Plan vom AutoGen-Team:
-            {results["autogen_plan"]}
+            enhanced_task = self._enhance_task(task, results["langchain_insights"])
             
-            Fasse die Schlüsselkomponenten zu einer umfassenden Bug-Bounty-Strategie zusammen.
-            """
+            emit({"event": "step", "step": "collaboration"})
+            autogen_messages = await self.autogen_agents.a_start_collaboration(
+                enhanced_task,
+                on_message=lambda message: emit({"event": "message", "name": message.get("name"),
+                                                 "content": message.get("content")}),
+                usage=usage
+            )
+            results["autogen_plan"] = self._final_plan(autogen_messages)
             
-            combined_strategy = self.langchain_agent.run(summary_query)
-            results["combined_strategy"] = combined_strategy
+            if results["langchain_insights"] and results["autogen_plan"]:
+                emit({"event": "step", "step": "summary"})
+                with tracer.span("summary"):
+                    results["combined_strategy"] = await self.langchain_agent.arun(self._summary_query(results),
+                                                                                   memory=memory)
+        results["usage"] = usage.summary()
         
         return results
     
+    @traced("refine")
     def iterative_refinement(self, task: str, max_iterations: int = 3) -> Dict[str, Any]:
         """
         Führt einen iterativen Verfeinerungsprozess für eine Bug-Bounty-Aufgabe durch
@@ -138,60 +306,112 @@ class HybridAgentManager:
             max_iterations: Maximale Anzahl an Iterationen
             
         Returns:
-            Ein Wörterbuch mit den Ergebnissen der iterativen Verfeinerung
+            Ein Wörterbuch mit den Ergebnissen der iterativen Verfeinerung und dem Verbrauch unter "usage"
         """
         results = {
             "task": task,
             "iterations": []
         }
         
-        current_task = task
-        
-        for i in range(max_iterations):
-            print(f"Iteration {i+1}/{max_iterations}...")
+        # Verbrauch über alle Iterationen; das Budget gilt pro Analyse
+        usage = self.autogen_agents.create_usage_ledger(with_budget=False)
+        with usage.track(tracer.current()):
+            current_task = task
             
-            # Analysiere die aktuelle Aufgabe
-            iteration_result = self.analyze_bug_bounty_task(current_task)
+            for i in range(max_iterations):
+                print(f"Iteration {i+1}/{max_iterations}...")
             
-            # Füge die Iterationsergebnisse hinzu
-            results["iterations"].append({
-                "iteration": i+1,
-                "task": current_task,
-                "result": iteration_result
-            })
+                # Analysiere die aktuelle Aufgabe
+                iteration_result = self.analyze_bug_bounty_task(current_task)
             
-            # Verwende den Langchain-Agenten, um die Aufgabe für die nächste Iteration zu verfeinern
-            if i < max_iterations - 1 and iteration_result["combined_strategy"]:
-                refinement_query = f"""
-                Basierend auf den bisherigen Ergebnissen, identifiziere Bereiche, die weiter untersucht werden sollten,
-                und formuliere eine verfeinerte Aufgabe für die nächste Iteration:
-                
-                Ursprüngliche Aufgabe: {task}
-                
-                Kombinierte Strategie aus der aktuellen Iteration:
-                {iteration_result["combined_strategy"]}
-                
-                Formuliere eine spezifischere und fokussiertere Aufgabe für die nächste Iteration.
-                """
-                
-                refined_task = self.langchain_agent.run(refinement_query)
-                current_task = refined_task
-        
-        # Füge eine Gesamtzusammenfassung hinzu
-        final_summary_query = f"""
-        Analysiere die Ergebnisse aller {max_iterations} Iterationen und erstelle eine umfassende
-        Zusammenfassung der Bug-Bounty-Strategie:
-        
-        Ursprüngliche Aufgabe: {task}
+                # Füge die Iterationsergebnisse hinzu
+                results["iterations"].append({
+                    "iteration": i+1,
+                    "task": current_task,
+                    "result": iteration_result
+                })
+            
+                # Verwende den Langchain-Agenten, um die Aufgabe für die nächste Iteration zu verfeinern
+                if i < max_iterations - 1 and iteration_result["combined_strategy"]:
+                    with tracer.span("refinement"):
+                        current_task = self.langchain_agent.run(
+                            self._refinement_query(task, iteration_result["combined_strategy"])
+                        )
+            
+            # Füge eine Gesamtzusammenfassung hinzu
+            with tracer.span("final_summary"):
+                results["final_strategy"] = self.langchain_agent.run(
+                    self._final_summary_query(task, results, max_iterations)
+                )
+        results["usage"] = usage.summary()
         
-        Iterationen:
-        {json.dumps([iter["result"]["combined_strategy"] for iter in results["iterations"] if iter["result"]["combined_strategy"]], indent=2)}
+        return results
+    
+    async def a_iterative_refinement(self,
+                                     task: str,
+                                     max_iterations: int = 3,
+                                     timeout: Optional[float] = None,
+                                     on_event: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Führt die iterative Verfeinerung asynchron durch (siehe iterative_refinement)
         
-        Erstelle eine strukturierte und umfassende Bug-Bounty-Strategie auf Basis aller Iterationen.
+        Args:
+            task: Die zu verfeinernde Bug-Bounty-Aufgabe
+            max_iterations: Maximale Anzahl an Iterationen
+            timeout: Zeitlimit in Sekunden für alle Iterationen (None für kein Limit)
+            on_event: Callback für Fortschrittsereignisse (Iterationen, Schritte und Nachrichten)
+            
+        Returns:
+            Ein Wörterbuch mit den Ergebnissen der iterativen Verfeinerung
+            
+        Raises:
+            asyncio.TimeoutError: Wenn das Zeitlimit überschritten wurde
         """
+        return await asyncio.wait_for(self._a_iterative_refinement(task, max_iterations, on_event), timeout)
+    
+    @traced("refine")
+    async def _a_iterative_refinement(self,
+                                      task: str,
+                                      max_iterations: int,
+                                      on_event: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        emit = on_event or (lambda event: None)
+        results = {
+            "task": task,
+            "iterations": []
+        }
         
-        final_summary = self.langchain_agent.run(final_summary_query)
-        results["final_strategy"] = final_summary
+        # Ein Konversationsspeicher für alle Iterationen dieser Verfeinerung
+        memory = self.langchain_agent.new_memory()
+        usage = self.autogen_agents.create_usage_ledger(with_budget=False)
+        with usage.track(tracer.current()):
+            current_task = task
+            
+            for i in range(max_iterations):
+                print(f"Iteration {i+1}/{max_iterations}...")
+                emit({"event": "iteration", "iteration": i+1, "task": current_task})
+            
+                iteration_result = await self._a_analyze_bug_bounty_task(current_task, True, on_event, memory)
+            
+                results["iterations"].append({
+                    "iteration": i+1,
+                    "task": current_task,
+                    "result": iteration_result
+                })
+            
+                if i < max_iterations - 1 and iteration_result["combined_strategy"]:
+                    with tracer.span("refinement"):
+                        current_task = await self.langchain_agent.arun(
+                            self._refinement_query(task, iteration_result["combined_strategy"]),
+                            memory=memory
+                        )
+            
+            emit({"event": "step", "step": "final_summary"})
+            with tracer.span("final_summary"):
+                results["final_strategy"] = await self.langchain_agent.arun(
+                    self._final_summary_query(task, results, max_iterations),
+                    memory=memory
+                )
+        results["usage"] = usage.summary()
         
         return results
 
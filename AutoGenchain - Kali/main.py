@@ -4,12 +4,16 @@ Hauptskript für das Bug-Bounty-Hybrid-Agentensystem mit Langchain und AutoGen
 
 import os
 import argparse
+import asyncio
 import json
 from typing import Dict, Any, Optional
 from dotenv import load_dotenv
 
 # Importiere unsere benutzerdefinierten Module
 from integration import HybridAgentManager
+from server import AgentServer
+from tracing import tracer
+from usage import print_usage
 
 # Lade Umgebungsvariablen
 load_dotenv()
@@ -18,6 +22,18 @@ def setup_argument_parser():
     """Richtet den Argument-Parser für die Kommandozeile ein"""
     parser = argparse.ArgumentParser(description="Bug-Bounty-Hybrid-Agentensystem mit Langchain und AutoGen")
     
+    parser.add_argument("--routing-profile", type=str,
+                        help="Routing-Profil für Modelle der AutoGen-Agenten (siehe config/agent_config.json)")
+    parser.add_argument("--agent-mode", choices=["functions", "react"], default="functions",
+                        help="Tool-Aufrufe des Langchain-Agenten: strukturiert (functions) oder als ReAct-Text")
+    parser.add_argument("--vector-backend", choices=["chroma", "compact"], default="chroma",
+                        help="Vektorindex der Wissensdatenbank: Chroma im Prozess oder kompakter int8-Index "
+                             "auf der Festplatte, den sich Worker-Prozesse teilen")
+    parser.add_argument("--max-tokens", type=int,
+                        help="Tokenbudget pro Analyse; bei Erreichen endet der Gruppenchat")
+    parser.add_argument("--max-cost", type=float,
+                        help="Kostenbudget in USD pro Analyse; bei Erreichen endet der Gruppenchat")
+    
     # Hauptbefehle
     subparsers = parser.add_subparsers(dest="command", help="Befehl, der ausgeführt werden soll")
     
@@ -26,12 +42,14 @@ def setup_argument_parser():
     analyze_parser.add_argument("--task", type=str, required=True, help="Die zu analysierende Bug-Bounty-Aufgabe")
     analyze_parser.add_argument("--output", type=str, help="Pfad für die Ausgabedatei (JSON)")
     analyze_parser.add_argument("--no-knowledge", action="store_true", help="Kein Wissen aus der Wissensdatenbank abrufen")
+    analyze_parser.add_argument("--timeout", type=float, help="Zeitlimit in Sekunden; bricht laufende LLM-Aufrufe ab")
     
     # Befehl: refine
     refine_parser = subparsers.add_parser("refine", help="Führe eine iterative Verfeinerung einer Bug-Bounty-Aufgabe durch")
     refine_parser.add_argument("--task", type=str, required=True, help="Die zu verfeinernde Bug-Bounty-Aufgabe")
     refine_parser.add_argument("--iterations", type=int, default=3, help="Anzahl der Iterationen (Standard: 3)")
     refine_parser.add_argument("--output", type=str, help="Pfad für die Ausgabedatei (JSON)")
+    refine_parser.add_argument("--timeout", type=float, help="Zeitlimit in Sekunden für alle Iterationen")
     
     # Befehl: add-knowledge
     add_knowledge_parser = subparsers.add_parser("add-knowledge", help="Füge Wissen zur Wissensdatenbank hinzu")
@@ -42,6 +60,22 @@ def setup_argument_parser():
     # Befehl: interactive
     subparsers.add_parser("interactive", help="Starte den interaktiven Modus")
     
+    # Befehl: profile
+    profile_parser = subparsers.add_parser("profile", help="Analysiere eine Aufgabe und zeige, wo Zeit und Tokens anfallen")
+    profile_parser.add_argument("--task", type=str, required=True, help="Die zu analysierende Bug-Bounty-Aufgabe")
+    profile_parser.add_argument("--no-knowledge", action="store_true", help="Kein Wissen aus der Wissensdatenbank abrufen")
+    profile_parser.add_argument("--trace-file", type=str, default="./results/trace.json",
+                                help="Pfad für die Trace-Datei (Standard: ./results/trace.json)")
+    
+    # Befehl: serve
+    serve_parser = subparsers.add_parser("serve", help="Starte den lokalen HTTP-Dienst")
+    serve_parser.add_argument("--host", type=str, default="127.0.0.1", help="Adresse des Dienstes (Standard: 127.0.0.1)")
+    serve_parser.add_argument("--port", type=int, default=8080, help="Port des Dienstes (Standard: 8080)")
+    serve_parser.add_argument("--workers", type=int, default=4, help="Gleichzeitig bearbeitete Anfragen (Standard: 4)")
+    serve_parser.add_argument("--queue-size", type=int, default=32,
+                              help="Maximale Anzahl wartender Anfragen, danach 503 (Standard: 32)")
+    serve_parser.add_argument("--timeout", type=float, help="Standard-Zeitlimit pro Anfrage in Sekunden")
+    
     return parser
 
 def save_results(results: Dict[str, Any], output_path: Optional[str] = None) -> str:
@@ -128,17 +162,25 @@ def print_results(results: Dict[str, Any]) -> None:
             print("="*80)
             print(results["final_strategy"])
     
+    if results.get("usage"):
+        print("-"*80)
+        print("VERBRAUCH PRO AGENT UND RUNDE")
+        print("-"*80)
+        print_usage(results["usage"])
+    
     print("\n" + "="*80 + "\n")
 
-def interactive_mode() -> None:
-    """Startet den interaktiven Modus für das Bug-Bounty-System"""
+def interactive_mode(manager: HybridAgentManager) -> None:
+    """
+    Startet den interaktiven Modus für das Bug-Bounty-System
+    
+    Args:
+        manager: Der mit den Kommandozeilenoptionen erstellte Hybrid-Agent-Manager
+    """
     print("\n" + "="*80)
     print("BUG-BOUNTY-HYBRID-AGENTENSYSTEM - INTERAKTIVER MODUS")
     print("="*80 + "\n")
     
-    # Initialisiere den Hybrid-Agent-Manager
-    manager = HybridAgentManager()
-    
     print("Willkommen zum Bug-Bounty-Hybrid-Agentensystem!")
     print("Dieses System kombiniert Langchain- und AutoGen-Agenten für Bug-Bounty-Planung.")
     print("Geben Sie 'exit' oder 'quit' ein, um den interaktiven Modus zu beenden.\n")
@@ -245,11 +287,24 @@ def main():
         return
     
     # Initialisiere den Hybrid-Agent-Manager
-    manager = HybridAgentManager()
+    manager = HybridAgentManager(routing_profile=args.routing_profile,
+                                 max_tokens=args.max_tokens,
+                                 max_cost=args.max_cost,
+                                 langchain_agent_mode=args.agent_mode,
+                                 vector_backend=args.vector_backend)
     
     if args.command == "analyze":
         fetch_knowledge = not args.no_knowledge
-        results = manager.analyze_bug_bounty_task(args.task, fetch_knowledge=fetch_knowledge)
+        if args.timeout:
+            try:
+                results = asyncio.run(manager.a_analyze_bug_bounty_task(
+                    args.task, fetch_knowledge=fetch_knowledge, timeout=args.timeout
+                ))
+            except asyncio.TimeoutError:
+                print(f"Zeitlimit von {args.timeout} Sekunden überschritten, Analyse abgebrochen.")
+                return
+        else:
+            results = manager.analyze_bug_bounty_task(args.task, fetch_knowledge=fetch_knowledge)
         
         print_results(results)
         
@@ -257,7 +312,16 @@ def main():
             save_results(results, args.output)
     
     elif args.command == "refine":
-        results = manager.iterative_refinement(args.task, max_iterations=args.iterations)
+        if args.timeout:
+            try:
+                results = asyncio.run(manager.a_iterative_refinement(
+                    args.task, max_iterations=args.iterations, timeout=args.timeout
+                ))
+            except asyncio.TimeoutError:
+                print(f"Zeitlimit von {args.timeout} Sekunden überschritten, Verfeinerung abgebrochen.")
+                return
+        else:
+            results = manager.iterative_refinement(args.task, max_iterations=args.iterations)
         
         print_results(results)
         
@@ -286,7 +350,37 @@ def main():
             print("Fehler beim Hinzufügen des Wissens.")
     
     elif args.command == "interactive":
-        interactive_mode()
+        interactive_mode(manager)
+    
+    elif args.command == "profile":
+        with tracer.span("profile") as root:
+            manager.analyze_bug_bounty_task(args.task, fetch_knowledge=not args.no_knowledge)
+        tracer.print_flame(root)
+        
+        stats = manager.langchain_agent.parser_stats.report()
+        print(f"\nLangchain-Agent ({args.agent_mode}): {stats['structured_calls']} strukturierte Tool-Aufrufe, "
+              f"{stats['parsed']} geparste Ausgaben, {stats['retries_avoided']} vermiedene Wiederholungen, "
+              f"{stats['early_actions']} früh erkannte Aktionen ({stats['early_seconds']:.2f}s vor Ende)")
+        manager.knowledge.print_memory_report()
+        
+        trace_dir = os.path.dirname(args.trace_file)
+        if trace_dir and not os.path.exists(trace_dir):
+            os.makedirs(trace_dir)
+        print(f"\nTrace wurde gespeichert unter: {tracer.export_json(args.trace_file, root)}")
+    
+    elif args.command == "serve":
+        server = AgentServer(
+            manager,
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            queue_size=args.queue_size,
+            default_timeout=args.timeout
+        )
+        try:
+            asyncio.run(server.serve_forever())
+        except KeyboardInterrupt:
+            print("Dienst beendet.")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,206 @@
+"""
+Fortschrittsüberwachung für den Gruppenchat der Bug-Bounty-Agenten
+"""
+
+import re
+import zlib
+from typing import Any, Callable, Dict, List, Optional
+
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+class MinHash:
+    """MinHash-Signaturen über Wort-Shingles zur Schätzung der Jaccard-Ähnlichkeit"""
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 3, seed: int = 1):
+        """
+        Initialisiert die Hash-Permutationen
+
+        Args:
+            num_perm: Anzahl der Permutationen (Länge der Signatur)
+            shingle_size: Anzahl der Wörter pro Shingle
+            seed: Startwert für die Permutationen
+        """
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self._perms = [
+            (zlib.crc32(f"a{seed}:{i}".encode()) | 1, zlib.crc32(f"b{seed}:{i}".encode()))
+            for i in range(num_perm)
+        ]
+
+    def signature(self, text: str) -> List[int]:
+        """Berechnet die MinHash-Signatur eines Textes"""
+        words = re.findall(r"\w+", text.lower())
+        k = min(self.shingle_size, len(words))
+        hashes = [
+            zlib.crc32(" ".join(words[i:i + k]).encode())
+            for i in range(len(words) - k + 1)
+        ]
+        if not hashes:
+            return [_MERSENNE_PRIME] * self.num_perm
+        return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in self._perms]
+
+    @staticmethod
+    def similarity(a: List[int], b: List[int]) -> float:
+        """Geschätzte Jaccard-Ähnlichkeit zweier Signaturen"""
+        return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+class ProgressMonitor:
+    """
+    Misst pro Runde die Neuheit jeder Nachricht gegenüber den letzten Nachrichten
+
+    Bleibt die Neuheit für `patience` Nachrichten unter `threshold`, wird der Chat
+    beendet ("stop") oder einmalig umgelenkt ("redirect"): Der Manager bittet um neue
+    Erkenntnisse und der am längsten stille Agent spricht als Nächstes.
+    """
+
+    def __init__(self,
+                threshold: float = 0.35,
+                patience: int = 2,
+                window: int = 6,
+                action: str = "stop",
+                max_redirects: int = 1,
+                on_event: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """
+        Initialisiert den Monitor
+
+        Args:
+            threshold: Neuheit, unter der eine Nachricht als Wiederholung gilt
+            patience: Anzahl aufeinanderfolgender Wiederholungen bis zum Eingreifen
+            window: Anzahl der letzten Nachrichten, mit denen verglichen wird
+            action: "stop" oder "redirect"
+            max_redirects: Maximale Anzahl an Umlenkungen, danach wird beendet
+            on_event: Callback, das bei jedem Eingreifen mit dem Ereignis aufgerufen wird
+        """
+        if action not in ("stop", "redirect"):
+            raise ValueError(f"Unbekannte Aktion: {action}")
+        self.threshold = threshold
+        self.patience = patience
+        self.window = window
+        self.action = action
+        self.max_redirects = max_redirects
+        self.on_event = on_event
+        self.minhash = MinHash()
+        self.rounds: List[Dict[str, Any]] = []
+        self.events: List[Dict[str, Any]] = []
+        self.reset()
+
+    def reset(self):
+        """Setzt den Monitor für einen neuen Chat zurück"""
+        self.rounds.clear()
+        self.events.clear()
+        self._signatures: List[List[int]] = []
+        self._low_streak = 0
+        self._redirects = 0
+        self._stop = False
+        self._redirect_pending = False
+
+    def observe(self, message: Dict, speaker_name: str) -> float:
+        """
+        Erfasst eine neue Nachricht
+
+        Args:
+            message: Die Nachricht
+            speaker_name: Name des sprechenden Agenten
+
+        Returns:
+            Die Neuheit der Nachricht (1.0 = nichts Ähnliches im Fenster)
+        """
+        # Funktionsaufrufe haben keinen Text: die Argumente zählen als Inhalt
+        calls = " ".join(call["function"]["name"] + " " + call["function"].get("arguments", "")
+                         for call in message.get("tool_calls") or [])
+        signature = self.minhash.signature(((message.get("content") or "") + " " + calls).strip())
+        novelty = 1.0 - max((MinHash.similarity(signature, s) for s in self._signatures), default=0.0)
+        self._signatures = (self._signatures + [signature])[-self.window:]
+        self.rounds.append({"round": len(self.rounds) + 1, "speaker": speaker_name, "novelty": novelty})
+
+        self._low_streak = self._low_streak + 1 if novelty < self.threshold else 0
+        if self._low_streak >= self.patience:
+            self._low_streak = 0
+            redirect = self.action == "redirect" and self._redirects < self.max_redirects
+            if redirect:
+                self._redirects += 1
+                self._redirect_pending = True
+            else:
+                self._stop = True
+            event = {
+                "round": len(self.rounds),
+                "speaker": speaker_name,
+                "novelty": novelty,
+                "action": "redirect" if redirect else "stop"
+            }
+            self.events.append(event)
+            if self.on_event:
+                self.on_event(event)
+        return novelty
+
+    def attach(self, group_chat, manager):
+        """
+        Hängt den Monitor an einen Gruppenchat und dessen Manager
+
+        Beenden kann der Monitor den Chat nur über is_termination_msg des Managers.
+        Einmal pro Gruppenchat aufrufen: Jeder weitere Aufruf legt eine weitere Hülle um
+        append und die Sprecherauswahl, jede Nachricht würde dann mehrfach erfasst.
+
+        Args:
+            group_chat: Der autogen.GroupChat
+            manager: Der zugehörige autogen.GroupChatManager
+        """
+        # Der Manager arbeitet mit einer Kopie des GroupChat aus seiner Antwortliste
+        configs = [group_chat] + [
+            entry["config"] for entry in manager._reply_func_list
+            if entry["init_config"] is group_chat and entry["config"] is not group_chat
+        ]
+        for config in configs:
+            self._patch(config, manager)
+
+    def is_termination_msg(self, message: Dict) -> bool:
+        """
+        Beendet den Chat, sobald der Monitor nicht mehr umlenkt
+
+        Als (Teil der) is_termination_msg des GroupChatManager übergeben: Der
+        Manager prüft jede Nachricht, nachdem der Gruppenchat sie aufgenommen hat.
+        """
+        return self._stop
+
+    def _patch(self, group_chat, manager):
+        append = group_chat.append
+        select_speaker = group_chat.select_speaker
+        a_select_speaker = group_chat.a_select_speaker
+
+        def _append(message, speaker):
+            append(message, speaker)
+            self.observe(message, speaker.name)
+
+        def _redirected(last_speaker):
+            self._redirect_pending = False
+            note = {
+                "role": "user",
+                "name": manager.name,
+                "content": "Die letzten Nachrichten wiederholen Bekanntes. "
+                           "Bringt neue Erkenntnisse ein oder fasst die Ergebnisse zusammen."
+            }
+            group_chat.messages.append(note)
+            for agent in group_chat.agents:
+                manager.send(note, agent, request_reply=False, silent=True)
+            # Der am längsten stille Agent spricht als Nächstes
+            spoken = [m.get("name") for m in group_chat.messages]
+            return min(
+                (a for a in group_chat.agents if a is not last_speaker),
+                key=lambda a: max((i for i, name in enumerate(spoken) if name == a.name), default=-1)
+            )
+
+        def _select_speaker(last_speaker, selector):
+            if self._redirect_pending:
+                return _redirected(last_speaker)
+            return select_speaker(last_speaker, selector)
+
+        async def _a_select_speaker(last_speaker, selector):
+            if self._redirect_pending:
+                return _redirected(last_speaker)
+            return await a_select_speaker(last_speaker, selector)
+
+        group_chat.append = _append
+        group_chat.select_speaker = _select_speaker
+        group_chat.a_select_speaker = _a_select_speaker
@@ -0,0 +1,281 @@
+"""
+Zusammenstellung von Prompts mit Tokenbudget pro Modell
+"""
+
+import re
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+# Kontextfenster der Modelle in Tokens
+MODEL_CONTEXT_TOKENS = {
+    "gpt-4o-mini": 128000,
+    "gpt-4o": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 16385,
+}
+
+# Zielgrößen der Stufen-Prompts des HybridAgentManager in Tokens
+DEFAULT_PROMPT_BUDGETS = {
+    "enhanced_task": 1500,
+    "summary_query": 3000,
+    "refinement_query": 2000,
+    "final_summary_query": 4000,
+}
+
+# Markierung für gekürzte Abschnitte
+TRUNCATION_MARK = " […]"
+
+_encodings: Dict[str, Any] = {}
+_encodings_lock = threading.Lock()
+
+
+def _encoding(model: str):
+    """Gibt die tiktoken-Kodierung eines Modells zurück (None, falls nicht verfügbar)"""
+    with _encodings_lock:
+        if model not in _encodings:
+            try:
+                import tiktoken
+                try:
+                    _encodings[model] = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    _encodings[model] = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                # Ohne tiktoken oder ohne heruntergeladene Kodierung wird geschätzt
+                print(f"Tokenizer für {model} nicht verfügbar ({type(e).__name__}), verwende Schätzung")
+                _encodings[model] = None
+        return _encodings[model]
+
+
+def tokenizer_available(model: str = "gpt-3.5-turbo") -> bool:
+    """Ob count_tokens den Tokenizer des Modells verwendet (sonst eine Schätzung)"""
+    return _encoding(model) is not None
+
+
+def count_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
+    """
+    Zählt die Tokens eines Textes
+
+    Args:
+        text: Der Text
+        model: Das Modell, dessen Tokenizer verwendet wird
+
+    Returns:
+        Die Anzahl der Tokens (ohne Tokenizer etwa vier Zeichen pro Token)
+    """
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int, model: str = "gpt-3.5-turbo", keep: str = "head") -> str:
+    """
+    Kürzt einen Text auf eine Anzahl von Tokens
+
+    Args:
+        text: Der Text
+        max_tokens: Maximale Anzahl der Tokens
+        model: Das Modell, dessen Tokenizer verwendet wird
+        keep: "head" behält den Anfang, "tail" das Ende, "middle" Anfang und Ende
+
+    Returns:
+        Der gekürzte Text mit Markierung, oder der unveränderte Text, wenn er passt
+    """
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    mark = TRUNCATION_MARK + " " if keep == "middle" else TRUNCATION_MARK
+    max_tokens = max(0, max_tokens - count_tokens(mark, model))
+    encoding = _encoding(model)
+    if encoding is None:
+        tokens, decode = text, lambda part: part
+        max_tokens *= 4
+    else:
+        tokens, decode = encoding.encode(text, disallowed_special=()), encoding.decode
+    if keep == "tail":
+        return TRUNCATION_MARK.lstrip() + decode(tokens[len(tokens) - max_tokens:])
+    if keep == "middle":
+        head = max_tokens // 2
+        return decode(tokens[:head]) + mark + decode(tokens[len(tokens) - (max_tokens - head):])
+    return decode(tokens[:max_tokens]) + TRUNCATION_MARK
+
+
+def split_tokens(text: str, max_tokens: int, model: str = "gpt-3.5-turbo") -> List[str]:
+    """
+    Teilt einen Text ohne Rücksicht auf Wortgrenzen in Fenster von höchstens max_tokens Tokens
+
+    Args:
+        text: Der Text
+        max_tokens: Maximale Anzahl der Tokens pro Fenster (mindestens 1)
+        model: Das Modell, dessen Tokenizer verwendet wird
+
+    Returns:
+        Die Fenster in ihrer Reihenfolge
+    """
+    max_tokens = max(1, max_tokens)
+    encoding = _encoding(model)
+    if encoding is None:
+        # Die Schätzung zählt vier Zeichen pro Token
+        return [text[start:start + 4 * max_tokens] for start in range(0, len(text), 4 * max_tokens)]
+    tokens = encoding.encode(text, disallowed_special=())
+    return [encoding.decode(tokens[start:start + max_tokens]) for start in range(0, len(tokens), max_tokens)]
+
+
+def extractive_summary(text: str, max_tokens: int, model: str = "gpt-3.5-turbo") -> str:
+    """
+    Fasst einen Text ohne LLM zusammen, indem die wichtigsten Sätze behalten werden
+
+    Sätze werden nach der Häufigkeit ihrer Wörter im gesamten Text bewertet und in
+    ursprünglicher Reihenfolge ausgegeben, bis das Budget erreicht ist. Überschriften
+    und Aufzählungspunkte zählen dabei als eigene Sätze.
+
+    Args:
+        text: Der Text
+        max_tokens: Maximale Anzahl der Tokens
+        model: Das Modell, dessen Tokenizer verwendet wird
+
+    Returns:
+        Die Zusammenfassung
+    """
+    sentences = [s.strip() for line in text.splitlines()
+                 for s in re.split(r"(?<=[.!?])\s+", line) if s.strip()]
+    words = [re.findall(r"\w{4,}", s.lower()) for s in sentences]
+    frequency = Counter(w for sentence in words for w in set(sentence))
+    scores = [sum(frequency[w] for w in set(ws)) / (len(ws) + 5) for ws in words]
+
+    chosen, used = set(), 0
+    for index in sorted(range(len(sentences)), key=lambda i: -scores[i]):
+        tokens = count_tokens(sentences[index], model) + 1
+        if used + tokens <= max_tokens:
+            chosen.add(index)
+            used += tokens
+    if not chosen:
+        return truncate_tokens(text, max_tokens, model)
+    return "\n".join(sentences[i] for i in sorted(chosen))
+
+
+class PromptBuilder:
+    """
+    Setzt einen Prompt aus priorisierten Abschnitten innerhalb eines Tokenbudgets zusammen
+
+    Der feste Text der Vorlage und Abschnitte mit der Strategie "keep" werden immer
+    übernommen. Die übrigen Abschnitte erhalten das restliche Budget nach absteigender
+    Priorität; jedem noch folgenden Abschnitt bleibt dabei sein `min_tokens` reserviert.
+    Passt ein Abschnitt nicht, wird er je nach Strategie gekürzt ("head", "tail",
+    "middle") oder zusammengefasst ("summarize"); bleibt weniger als `min_tokens`
+    übrig, entfällt er. Die Tokens pro Abschnitt vor und nach der Anpassung werden
+    ausgegeben und stehen danach in `report`.
+    """
+
+    def __init__(self,
+                model: str = "gpt-3.5-turbo",
+                budget: Optional[int] = None,
+                reserve_output: int = 1000,
+                summarizer: Optional[Callable[[str, int], str]] = None,
+                verbose: bool = True):
+        """
+        Initialisiert den Builder
+
+        Args:
+            model: Das Modell, das den Prompt erhält
+            budget: Zielgröße des Prompts in Tokens (None für das Kontextfenster des Modells)
+            reserve_output: Tokens, die im Kontextfenster für die Antwort frei bleiben
+            summarizer: Funktion (Text, max. Tokens) -> Zusammenfassung für die Strategie "summarize"
+            verbose: Ob die Tokens pro Abschnitt ausgegeben werden
+        """
+        self.model = model
+        context = next((tokens for name, tokens in sorted(MODEL_CONTEXT_TOKENS.items(), key=lambda item: -len(item[0]))
+                        if model.startswith(name)), 4096)
+        self.budget = min(budget or context, context - reserve_output)
+        self.summarizer = summarizer or (lambda text, max_tokens: extractive_summary(text, max_tokens, self.model))
+        self.verbose = verbose
+        self.sections: List[Dict[str, Any]] = []
+        self.report: List[Dict[str, Any]] = []
+
+    def add(self,
+            name: str,
+            text: Optional[str],
+            priority: int = 0,
+            strategy: str = "head",
+            min_tokens: int = 50) -> "PromptBuilder":
+        """
+        Fügt einen Abschnitt hinzu
+
+        Args:
+            name: Name des Platzhalters in der Vorlage
+            text: Inhalt des Abschnitts
+            priority: Höhere Priorität erhält zuerst Budget
+            strategy: "keep", "head", "tail", "middle" oder "summarize"
+            min_tokens: Mindestgröße, unter der der Abschnitt entfällt
+
+        Returns:
+            Der Builder (für verkettete Aufrufe)
+        """
+        if strategy not in ("keep", "head", "tail", "middle", "summarize"):
+            raise ValueError(f"Unbekannte Strategie: {strategy}")
+        self.sections.append({"name": name, "text": text or "", "priority": priority,
+                              "strategy": strategy, "min_tokens": min_tokens})
+        return self
+
+    def fit(self, available: int) -> Dict[str, str]:
+        """
+        Passt die Abschnitte an ein Budget an
+
+        Args:
+            available: Tokens für alle Abschnitte zusammen
+
+        Returns:
+            Der angepasste Text pro Abschnitt
+        """
+        fitted: Dict[str, str] = {}
+        self.report = []
+        sizes = {section["name"]: count_tokens(section["text"], self.model) for section in self.sections}
+
+        for section in self.sections:
+            if section["strategy"] == "keep":
+                fitted[section["name"]] = section["text"]
+                available -= sizes[section["name"]]
+
+        flexible = sorted((s for s in self.sections if s["strategy"] != "keep"), key=lambda s: -s["priority"])
+        for index, section in enumerate(flexible):
+            name, text = section["name"], section["text"]
+            reserved = sum(min(s["min_tokens"], sizes[s["name"]]) for s in flexible[index + 1:])
+            limit = max(available - reserved, 0)
+            if sizes[name] <= limit:
+                fitted[name] = text
+            elif limit < section["min_tokens"]:
+                fitted[name] = ""
+            elif section["strategy"] == "summarize":
+                fitted[name] = truncate_tokens(self.summarizer(text, limit), limit, self.model)
+            else:
+                fitted[name] = truncate_tokens(text, limit, self.model, keep=section["strategy"])
+            available -= count_tokens(fitted[name], self.model)
+
+        for section in self.sections:
+            name = section["name"]
+            self.report.append({"section": name, "before": sizes[name],
+                                "after": count_tokens(fitted[name], self.model)})
+        return fitted
+
+    def render(self, template: str, name: str = "prompt") -> str:
+        """
+        Füllt die Vorlage mit den an das Budget angepassten Abschnitten
+
+        Args:
+            template: Vorlage mit Platzhaltern {name} für die Abschnitte
+            name: Name des Prompts für die Ausgabe
+
+        Returns:
+            Der fertige Prompt
+        """
+        fixed = count_tokens(template.format(**{section["name"]: "" for section in self.sections}), self.model)
+        fitted = self.fit(self.budget - fixed)
+        prompt = template.format(**fitted)
+        if self.verbose:
+            sections = ", ".join(f"{entry['section']} {entry['before']}→{entry['after']}" for entry in self.report)
+            print(f"Prompt {name} ({self.model}, Budget {self.budget}): Vorlage {fixed}, {sections}, "
+                  f"gesamt {count_tokens(prompt, self.model)} Tokens")
+        return prompt
@@ -0,0 +1,186 @@
+"""
+Zeilenweiser ReAct-Parser für Streaming-Ausgaben des Langchain-Agenten
+"""
+
+import threading
+from typing import Any, Dict, List, Optional
+
+# Schlüsselwörter des ReAct-Formats (kleingeschrieben, ohne Doppelpunkt)
+_KEYS = ("action input", "action", "final answer", "thought", "observation")
+
+# Zeichen, mit denen Modelle die Schlüsselwörter gern einrahmen (Markdown)
+_DECORATION = "*#>-_` \t"
+
+
+def _split_key(line: str):
+    """Gibt (Schlüssel, Wert, exakt) einer Zeile zurück oder (None, Zeile, False)"""
+    stripped = line.strip(_DECORATION)
+    key, sep, value = stripped.partition(":")
+    key = key.strip(_DECORATION).lower()
+    if not sep or key not in _KEYS:
+        return None, line, False
+    exact = line.startswith(f"{key.title()}: ") or line.startswith(f"{key.capitalize()}: ")
+    return key, value.strip(_DECORATION), exact
+
+
+class ReActScanner:
+    """
+    Liest eine ReAct-Ausgabe Zeile für Zeile, auch während sie gestreamt wird
+
+    Jedes Zeichen wird genau einmal betrachtet; es gibt keine regulären Ausdrücke
+    mit Backtracking. Erkannt werden "Action:", "Action Input:" und "Final Answer:"
+    auch mit Markdown-Hervorhebungen, abweichender Groß-/Kleinschreibung oder
+    Leerzeichen vor dem Doppelpunkt. Die Eingabe einer Aktion ist, wie im
+    ReAct-Format üblich, eine Zeile; sobald sie mit einem Zeilenumbruch endet, ist
+    `action_ready` gesetzt, noch bevor das Modell die Ausgabe beendet.
+    """
+
+    def __init__(self, tool_names: Optional[List[str]] = None):
+        """
+        Initialisiert den Scanner
+
+        Args:
+            tool_names: Namen der verfügbaren Tools (für die Zuordnung abweichender Schreibweisen)
+        """
+        self.tool_names = {name.lower(): name for name in (tool_names or [])}
+        self.text_parts: List[str] = []
+        self._partial = ""
+        self._section: Optional[str] = None
+        self.action: Optional[str] = None
+        self.action_input: List[str] = []
+        self.final_answer: List[str] = []
+        self.action_first = False
+        self.action_ready = False
+        self.exact = True
+
+    def feed(self, chunk: str) -> "ReActScanner":
+        """
+        Verarbeitet ein Stück der Ausgabe (z.B. ein gestreamtes Token)
+
+        Args:
+            chunk: Das Textstück
+
+        Returns:
+            Der Scanner (für verkettete Aufrufe)
+        """
+        self.text_parts.append(chunk)
+        start = 0
+        newline = chunk.find("\n")
+        while newline != -1:
+            self._line(self._partial + chunk[start:newline])
+            self._partial = ""
+            start = newline + 1
+            newline = chunk.find("\n", start)
+        self._partial += chunk[start:]
+        return self
+
+    def finish(self) -> "ReActScanner":
+        """Verarbeitet die letzte, nicht abgeschlossene Zeile"""
+        if self._partial:
+            self._line(self._partial)
+            self._partial = ""
+        if self.action is not None and self._section == "action input":
+            self.action_ready = True
+        return self
+
+    @property
+    def text(self) -> str:
+        """Die gesamte bisher gelesene Ausgabe"""
+        return "".join(self.text_parts)
+
+    def tool(self) -> Optional[str]:
+        """Gibt den Namen des Tools in der Schreibweise der verfügbaren Tools zurück"""
+        if self.action is None:
+            return None
+        name = self.action.strip().strip(_DECORATION + "\"'").lower()
+        for suffix in (" tool", "()"):
+            if name.endswith(suffix):
+                name = name[:-len(suffix)].strip()
+        return self.tool_names.get(name, self.action.strip())
+
+    def tool_input(self) -> str:
+        """Gibt die Eingabe der Aktion zurück (ohne umschließende Anführungszeichen)"""
+        value = "\n".join(self.action_input).strip()
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+            value = value[1:-1]
+        return value
+
+    def answer(self) -> str:
+        """Gibt die finale Antwort zurück (ohne Markierung die gesamte Ausgabe)"""
+        return "\n".join(self.final_answer).strip() if self.final_answer else self.text.strip()
+
+    def _line(self, line: str):
+        key, value, exact = _split_key(line)
+        if key is None:
+            # Fortsetzung des aktuellen Abschnitts
+            if self._section == "action input" and not self.action_ready:
+                # Steht die Eingabe erst in der Zeile nach "Action Input:"
+                self.action_input.append(line)
+                self.action_ready = bool(line.strip())
+            elif self._section == "final answer":
+                self.final_answer.append(line)
+            return
+
+        if self.action_ready or (self.action is not None and key == "action"):
+            # Nach der ersten vollständigen Aktion folgt nur noch Halluziniertes
+            if self._section == "action input":
+                self.action_ready = True
+            self._section = None
+            return
+
+        if self._section == "action input" and key != "action input":
+            self.action_ready = True
+            self._section = None
+            return
+
+        self._section = key
+        if key == "action":
+            self.action = value
+            self.action_first = not self.final_answer
+            self.exact = self.exact and exact
+        elif key == "action input" and self.action is not None:
+            self.action_input.append(value)
+            self.exact = self.exact and exact
+            self.action_ready = bool(value)
+        elif key == "final answer":
+            self.final_answer.append(value)
+
+
+class ParserStats:
+    """
+    Zählt geparste Ausgaben und vermiedene Wiederholungen von LLM-Aufrufen
+
+    `repaired` zählt Ausgaben, die der frühere reguläre Ausdruck
+    (`Action: (.*?)\\nAction Input: (.*)`) nicht oder mit falschem Tool erkannt hätte.
+    Jede davon hätte einen weiteren LLM-Aufruf gekostet (Fehlermeldung an das
+    Modell oder "ist kein gültiges Tool") oder eine unvollständige Antwort
+    ergeben. Im Function-Calling-Modus liefert das Modell strukturierte
+    Tool-Aufrufe; dort wird nichts geparst.
+    """
+
+    def __init__(self):
+        """Initialisiert die Zähler"""
+        self._lock = threading.Lock()
+        self.counts: Dict[str, float] = {}
+        self.reset()
+
+    def reset(self):
+        """Setzt alle Zähler zurück"""
+        with self._lock:
+            self.counts = {"parsed": 0, "actions": 0, "finishes": 0, "repaired": 0, "invalid_tool": 0,
+                           "structured_calls": 0, "early_actions": 0, "early_seconds": 0.0}
+
+    def add(self, key: str, value: float = 1):
+        """Erhöht einen Zähler"""
+        with self._lock:
+            self.counts[key] += value
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Gibt die Zähler zurück
+
+        Returns:
+            Die Zähler und die Anzahl der vermiedenen Wiederholungen ("retries_avoided")
+        """
+        with self._lock:
+            return dict(self.counts, retries_avoided=self.counts["repaired"])
@@ -0,0 +1,318 @@
+"""
+Lokaler HTTP-Dienst für den Hybrid-Agent-Manager
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, Dict, Optional, Set
+
+from tracing import tracer
+
+# Antworttexte der unterstützten Statuscodes
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 503: "Service Unavailable"}
+
+# Maximale Größe eines Anfragekörpers in Bytes
+MAX_BODY_BYTES = 1 << 20
+
+# Sekunden ohne Ereignis, nach denen ein "heartbeat" gesendet wird (erkennt getrennte Clients)
+HEARTBEAT_SECONDS = 5.0
+
+
+class AgentServer:
+    """
+    Stellt analyze, refine und add-knowledge über lokales HTTP bereit
+
+    Ein einmal erstellter HybridAgentManager bedient alle Anfragen; Agenten,
+    Vektorstore und die LLM-Clients der Agenten bleiben zwischen den Anfragen
+    erhalten, sodass jeder Client seine offenen Verbindungen weiterverwendet. Einen
+    gemeinsamen HTTP-Client für alle Agenten gibt es nicht. Analyse-Anfragen landen in einer begrenzten
+    Warteschlange, die von `workers` Tasks abgearbeitet wird; ist sie voll,
+    antwortet der Server sofort mit 503. Die Antworten werden als NDJSON
+    gestreamt (ein JSON-Ereignis pro Zeile). Trennt ein Client die Verbindung,
+    wird seine Anfrage abgebrochen (gestellte LLM-Anfragen der AutoGen-Agenten
+    laufen im Thread-Pool zu Ende). Erkannt
+    wird das am Schreiben, nicht am Ende des Lesestroms: Ein Client darf nach der
+    Anfrage seine Senderichtung schließen (z.B. `nc -N`). Ohne Ereignisse der
+    Analyse wird dafür alle HEARTBEAT_SECONDS ein "heartbeat" gesendet.
+
+    Endpunkte:
+        POST /analyze         {"task": ..., "fetch_knowledge": true, "timeout": 120}
+        POST /refine          {"task": ..., "iterations": 3, "timeout": 600}
+        POST /add-knowledge   {"name": ..., "content": ...}
+        GET  /health
+        GET  /metrics         Laufzeiten, Tokens und Cache-Treffer im Prometheus-Format
+    """
+
+    def __init__(self,
+                manager,
+                host: str = "127.0.0.1",
+                port: int = 8080,
+                workers: int = 4,
+                queue_size: int = 32,
+                default_timeout: Optional[float] = None):
+        """
+        Initialisiert den Server
+
+        Args:
+            manager: Der HybridAgentManager, der alle Anfragen bearbeitet
+            host: Adresse des Servers
+            port: Port des Servers
+            workers: Anzahl gleichzeitig bearbeiteter Anfragen
+            queue_size: Maximale Anzahl wartender Anfragen
+            default_timeout: Zeitlimit in Sekunden für Anfragen ohne eigenes Limit
+        """
+        self.manager = manager
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.queue_size = queue_size
+        self.default_timeout = default_timeout
+        self.queue: Optional[asyncio.Queue] = None
+        self.running = 0
+        self.stats = {"accepted": 0, "rejected": 0, "completed": 0, "failed": 0, "cancelled": 0}
+        self._knowledge_lock: Optional[asyncio.Lock] = None
+        # Verbindungen, deren Statuszeile bereits gesendet wurde
+        self._responded: Set[asyncio.StreamWriter] = set()
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._worker_tasks = []
+        self._stopping = False
+
+    async def start(self):
+        """Startet den Server und die Worker"""
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self._knowledge_lock = asyncio.Lock()
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        print(f"Bug-Bounty-Dienst läuft unter http://{self.host}:{self.port} "
+              f"({self.workers} Worker, Warteschlange {self.queue_size})")
+
+    async def stop(self):
+        """Beendet den Server und die Worker"""
+        self._stopping = True
+        self._server.close()
+        await self._server.wait_closed()
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+
+    async def serve_forever(self):
+        """Startet den Server und bearbeitet Anfragen bis zum Abbruch"""
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def _worker(self):
+        while True:
+            job = await self.queue.get()
+            if job["cancelled"]:
+                continue
+            self.running += 1
+            job["task"] = asyncio.create_task(self._run_job(job))
+            try:
+                await job["task"]
+            except asyncio.CancelledError:
+                # Wurde nur der Job abgebrochen, läuft der Worker weiter
+                if self._stopping:
+                    raise
+            finally:
+                self.running -= 1
+
+    async def _run_job(self, job: Dict[str, Any]):
+        events = job["events"]
+        payload = job["payload"]
+        timeout = payload.get("timeout", self.default_timeout)
+        events.put_nowait({"event": "started"})
+        try:
+            if job["kind"] == "analyze":
+                result = await self.manager.a_analyze_bug_bounty_task(
+                    payload["task"],
+                    fetch_knowledge=payload.get("fetch_knowledge", True),
+                    timeout=timeout,
+                    on_event=events.put_nowait
+                )
+            else:
+                result = await self.manager.a_iterative_refinement(
+                    payload["task"],
+                    max_iterations=payload.get("iterations", 3),
+                    timeout=timeout,
+                    on_event=events.put_nowait
+                )
+            self.stats["completed"] += 1
+            events.put_nowait({"event": "result", "result": result})
+        except asyncio.TimeoutError:
+            self.stats["failed"] += 1
+            events.put_nowait({"event": "error", "error": f"Zeitlimit von {timeout} Sekunden überschritten"})
+        except Exception as e:
+            self.stats["failed"] += 1
+            events.put_nowait({"event": "error", "error": str(e)})
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await reader.readline()
+            if not request_line:
+                return
+            method, path, _ = request_line.decode("latin-1").split(" ", 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length", 0))
+            if length > MAX_BODY_BYTES:
+                await self._send_json(writer, 413, {"error": "Anfrage zu groß"})
+                return
+            body = await reader.readexactly(length) if length else b""
+
+            if path == "/health":
+                await self._send_json(writer, 200, self.health())
+                return
+            if path == "/metrics":
+                data = (tracer.prometheus() + self._queue_metrics()).encode("utf-8")
+                self._write_head(writer, 200, {"Content-Type": "text/plain; version=0.0.4",
+                                               "Content-Length": str(len(data))}, data)
+                await writer.drain()
+                return
+            if path not in ("/analyze", "/refine", "/add-knowledge"):
+                await self._send_json(writer, 404, {"error": f"Unbekannter Pfad: {path}"})
+                return
+            if method != "POST":
+                await self._send_json(writer, 405, {"error": "Nur POST wird unterstützt"})
+                return
+            try:
+                payload = json.loads(body or b"{}")
+            except json.JSONDecodeError as e:
+                await self._send_json(writer, 400, {"error": f"Ungültiges JSON: {e}"})
+                return
+
+            if path == "/add-knowledge":
+                await self._add_knowledge(writer, payload)
+            else:
+                await self._stream_job(writer, path.lstrip("/"), payload)
+        except (ConnectionResetError, BrokenPipeError, asyncio.IncompleteReadError):
+            pass
+        except ValueError as e:
+            # Nach der Statuszeile (z.B. mitten im NDJSON-Strom) lässt sich kein 400 mehr
+            # senden; dann wird nur die Verbindung geschlossen
+            if writer in self._responded:
+                print(f"Fehler beim Senden der Antwort: {e}")
+            else:
+                await self._send_json(writer, 400, {"error": "Ungültige Anfrage"})
+        finally:
+            self._responded.discard(writer)
+            writer.close()
+
+    async def _add_knowledge(self, writer: asyncio.StreamWriter, payload: Dict[str, Any]):
+        if not payload.get("name") or not payload.get("content"):
+            await self._send_json(writer, 400, {"error": "name und content sind erforderlich"})
+            return
+        # Das Hinzufügen baut den Vektorstore neu auf und blockiert; daher im Thread und nacheinander
+        async with self._knowledge_lock:
+            success = await asyncio.to_thread(self.manager.add_knowledge_to_base, payload["content"], payload["name"])
+        await self._send_json(writer, 200, {"success": success, "name": payload["name"]})
+
+    async def _stream_job(self, writer, kind: str, payload: Dict[str, Any]):
+        if not payload.get("task"):
+            await self._send_json(writer, 400, {"error": "task ist erforderlich"})
+            return
+        job = {"kind": kind, "payload": payload, "events": asyncio.Queue(), "cancelled": False, "task": None}
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            await self._send_json(writer, 503, {"error": "Warteschlange voll, bitte später erneut versuchen"},
+                                  extra_headers={"Retry-After": "5"})
+            return
+        self.stats["accepted"] += 1
+
+        self._write_head(writer, 200, {"Content-Type": "application/x-ndjson", "Transfer-Encoding": "chunked"})
+        await self._write_chunk(writer, {"event": "accepted", "queued": self.queue.qsize(), "time": time.time()})
+
+        # Endet, sobald die Verbindung verloren ist (ein Schreibversuch ist fehlgeschlagen
+        # oder der Client hat sie zurückgesetzt); ein halb geschlossener Client zählt nicht
+        closed = asyncio.ensure_future(writer.wait_closed())
+        next_event = None
+        try:
+            while True:
+                if next_event is None:
+                    next_event = asyncio.ensure_future(job["events"].get())
+                done, _ = await asyncio.wait({next_event, closed}, timeout=HEARTBEAT_SECONDS,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if closed in done or writer.is_closing():
+                    raise ConnectionResetError()
+                if next_event not in done:
+                    await self._write_chunk(writer, {"event": "heartbeat", "time": time.time()})
+                    continue
+                event, next_event = next_event.result(), None
+                await self._write_chunk(writer, event)
+                if event["event"] in ("result", "error"):
+                    break
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        except (ConnectionResetError, BrokenPipeError):
+            self._cancel(job)
+        except ValueError:
+            # Ein Ereignis ließ sich nicht senden; _handle schließt die Verbindung
+            self._cancel(job)
+            raise
+        finally:
+            if next_event is not None:
+                next_event.cancel()
+            closed.cancel()
+            if closed.done() and not closed.cancelled():
+                closed.exception()
+
+    def _cancel(self, job: Dict[str, Any]):
+        job["cancelled"] = True
+        self.stats["cancelled"] += 1
+        if job["task"] is not None:
+            job["task"].cancel()
+
+    def health(self) -> Dict[str, Any]:
+        """
+        Gibt den Zustand des Servers zurück
+
+        Returns:
+            Ein Wörterbuch mit Warteschlange, laufenden Anfragen und Zählern
+        """
+        return {
+            "queued": self.queue.qsize() if self.queue else 0,
+            "running": self.running,
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            **self.stats
+        }
+
+    def _queue_metrics(self) -> str:
+        health = self.health()
+        lines = ["# HELP kali_server_queued Wartende Anfragen", "# TYPE kali_server_queued gauge",
+                 f"kali_server_queued {health['queued']}",
+                 "# HELP kali_server_running Laufende Anfragen", "# TYPE kali_server_running gauge",
+                 f"kali_server_running {health['running']}",
+                 "# HELP kali_server_requests_total Anfragen nach Ergebnis", "# TYPE kali_server_requests_total counter"]
+        lines += [f'kali_server_requests_total{{outcome="{key}"}} {value}' for key, value in self.stats.items()]
+        return "\n".join(lines) + "\n"
+
+    def _write_head(self, writer: asyncio.StreamWriter, status: int, headers: Dict[str, str], data: bytes = b""):
+        lines = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}", "Connection: close"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + data)
+        self._responded.add(writer)
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, body: Dict[str, Any],
+                         extra_headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        headers = {"Content-Type": "application/json", "Content-Length": str(len(data)), **(extra_headers or {})}
+        self._write_head(writer, status, headers, data)
+        await writer.drain()
+
+    async def _write_chunk(self, writer: asyncio.StreamWriter, event: Dict[str, Any]):
+        data = (json.dumps(event, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+        writer.write(f"{len(data):X}\r\n".encode("latin-1") + data + b"\r\n")
+        await writer.drain()
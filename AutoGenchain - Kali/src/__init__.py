@@ -0,0 +1,3 @@
+"""
+Quellcode des Bug-Bounty-Agentensystems
+"""
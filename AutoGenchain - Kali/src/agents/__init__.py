@@ -0,0 +1,5 @@
+"""
+Agentenmodule
+"""
+
+from .langchain_agent import PenetrationTestAgent
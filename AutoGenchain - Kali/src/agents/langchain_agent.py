@@ -4,235 +4,450 @@ LangChain-Hauptagent mit RAG-Fähigkeiten für Bug-Bounty-Planung
 
 from langchain.chains import LLMChain
 from langchain.memory import ConversationBufferMemory
-from langchain.prompts import PromptTemplate
-from langchain.agents import Tool, AgentExecutor, LLMSingleActionAgent, AgentOutputParser
-from langchain.schema import AgentAction, AgentFinish
+from langchain.agents import Tool, AgentExecutor, AgentOutputParser, OpenAIFunctionsAgent, ZeroShotAgent
+from langchain.tools import StructuredTool
+from langchain.pydantic_v1 import BaseModel, Field
+from langchain.schema import AgentAction, AgentFinish, SystemMessage
+from langchain.prompts import MessagesPlaceholder
 from langchain.utilities import SerpAPIWrapper
 from langchain.chat_models import ChatOpenAI
-from langchain.vectorstores import Chroma
-from langchain.embeddings import OpenAIEmbeddings
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.document_loaders import DirectoryLoader, TextLoader
 from langchain.callbacks.streaming_stdout import StreamingStdOutCallbackHandler
-from typing import List, Union, Optional
-import re
-import os
+from langchain.callbacks.base import BaseCallbackHandler
+from typing import Any, Dict, List, Union, Optional
+import asyncio
 import json
+import time
 from dotenv import load_dotenv
 
+from prompt_builder import count_tokens
+from react_parser import ParserStats, ReActScanner
+from src.utils.knowledge_utils import DEFAULT_KNOWLEDGE_BASE_PATH, get_knowledge_service
+from tracing import tracer
+
 # Lade Umgebungsvariablen
 load_dotenv()
 
+# Zusätzliche Tokens pro Chat-Nachricht (Rolle und Trennzeichen) und für den Antwortbeginn
+_MESSAGE_OVERHEAD_TOKENS = 4
+_REPLY_PRIMING_TOKENS = 3
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """
+    Erfasst jeden LLM-Aufruf von Langchain als Span "llm"
+    
+    Beim Streaming liefert die API keine Tokenzahlen. Dann werden Prompt und
+    Antwort (samt Funktionsschemas und -aufrufen) mit count_tokens gezählt,
+    damit die Aufrufe im Hauptbuch und im Budget erscheinen.
+    """
+    
+    # Im Event-Loop ausführen, damit der aktuelle Span als Elternteil bekannt ist
+    run_inline = True
+    
+    def __init__(self, model_name: str):
+        """
+        Initialisiert den Handler
+        
+        Args:
+            model_name: Name des LLM-Modells für die Span-Attribute
+        """
+        self.model_name = model_name
+        self._runs: Dict[Any, tuple] = {}
+    
+    def _count(self, text: str) -> int:
+        return count_tokens(text, self.model_name)
+    
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        prompt_tokens = sum(self._count(prompt) for prompt in prompts)
+        self._runs[run_id] = (time.perf_counter(), tracer.current(), prompt_tokens)
+    
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        prompt_tokens = _REPLY_PRIMING_TOKENS
+        for message in (messages[0] if messages else []):
+            prompt_tokens += _MESSAGE_OVERHEAD_TOKENS + self._count(message.content or "")
+            prompt_tokens += self._count(json.dumps(message.additional_kwargs, ensure_ascii=False)) \
+                if message.additional_kwargs else 0
+        # Die Funktionsschemas werden mit jedem Aufruf gesendet
+        functions = (kwargs.get("invocation_params") or {}).get("functions")
+        if functions:
+            prompt_tokens += self._count(json.dumps(functions, ensure_ascii=False))
+        self._runs[run_id] = (time.perf_counter(), tracer.current(), prompt_tokens)
+    
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        start, parent, prompt_tokens = self._runs.pop(run_id, (time.perf_counter(), None, 0))
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        if usage:
+            prompt_tokens = usage.get("prompt_tokens") or 0
+            completion_tokens = usage.get("completion_tokens") or 0
+        else:
+            completion_tokens = 0
+            for generation in (response.generations[0] if response.generations else []):
+                completion_tokens += self._count(generation.text)
+                message = getattr(generation, "message", None)
+                function_call = getattr(message, "additional_kwargs", {}).get("function_call")
+                if function_call:
+                    completion_tokens += self._count(json.dumps(function_call, ensure_ascii=False))
+        tracer.record("llm", time.perf_counter() - start, parent,
+                      agent="PenetrationTestAgent", model=self.model_name,
+                      prompt_tokens=prompt_tokens,
+                      completion_tokens=completion_tokens)
+    
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        start, parent, _ = self._runs.pop(run_id, (time.perf_counter(), None, 0))
+        tracer.record("llm", time.perf_counter() - start, parent,
+                      agent="PenetrationTestAgent", model=self.model_name, error=type(error).__name__)
+
+
+class StreamingReActParser(AgentOutputParser):
+    """
+    Parser für ReAct-Ausgaben ohne Backtracking (siehe ReActScanner)
+    
+    Erkennt Aktionen auch in leicht abweichenden Formaten und ordnet Tool-Namen
+    unabhängig von der Schreibweise zu, statt dafür einen weiteren LLM-Aufruf
+    auszulösen.
+    """
+    
+    tool_names: List[str] = []
+    stats: Any = None
+    
+    def parse(self, llm_output: str) -> Union[AgentAction, AgentFinish]:
+        scanner = ReActScanner(self.tool_names).feed(llm_output).finish()
+        stats = self.stats or ParserStats()
+        stats.add("parsed")
+        
+        tool = scanner.tool()
+        known = tool in self.tool_names
+        if scanner.action is not None and (known or not scanner.final_answer) and scanner.action_first:
+            stats.add("actions")
+            if not known:
+                # Führt zur Beobachtung "ist kein gültiges Tool" und einem weiteren Aufruf
+                stats.add("invalid_tool")
+            elif not scanner.exact or not scanner.action_input or tool != scanner.action.strip():
+                # Der frühere reguläre Ausdruck hätte diese Ausgabe nicht korrekt erkannt
+                stats.add("repaired")
+            return AgentAction(tool=tool, tool_input=scanner.tool_input(), log=llm_output)
+        
+        stats.add("finishes")
+        return AgentFinish(return_values={"output": scanner.answer()}, log=llm_output)
+    
+    @property
+    def _type(self) -> str:
+        return "streaming_react"
+
+
+class EarlyActionDetector(BaseCallbackHandler):
+    """
+    Erkennt eine ReAct-Aktion bereits während des Streamings
+    
+    Erfasst, wie viel früher als das Ende der Ausgabe die Aktion feststand, als
+    Span "action_detected" und in den ParserStats.
+    """
+    
+    run_inline = True
+    
+    def __init__(self, tool_names: List[str], stats: ParserStats):
+        """
+        Initialisiert den Detektor
+        
+        Args:
+            tool_names: Namen der verfügbaren Tools
+            stats: Zähler des Agenten
+        """
+        self.tool_names = tool_names
+        self.stats = stats
+        self._runs: Dict[Any, Dict[str, Any]] = {}
+    
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id)
+    
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id)
+    
+    def _start(self, run_id):
+        self._runs[run_id] = {"scanner": ReActScanner(self.tool_names), "start": time.perf_counter(),
+                              "detected": None, "parent": tracer.current()}
+    
+    def on_llm_new_token(self, token: str, *, run_id, **kwargs):
+        run = self._runs.get(run_id)
+        if run is None or run["detected"] is not None:
+            return
+        if run["scanner"].feed(token).action_ready:
+            run["detected"] = time.perf_counter()
+    
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        run = self._runs.pop(run_id, None)
+        if run is None or run["detected"] is None:
+            return
+        saved = time.perf_counter() - run["detected"]
+        self.stats.add("early_actions")
+        self.stats.add("early_seconds", saved)
+        tracer.record("action_detected", run["detected"] - run["start"], run["parent"],
+                      tool=run["scanner"].tool(), seconds_before_end=saved)
+    
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._runs.pop(run_id, None)
+
+
+class ToolCallCounter(BaseCallbackHandler):
+    """Zählt die strukturierten Tool-Aufrufe im Function-Calling-Modus"""
+    
+    def __init__(self, stats: ParserStats):
+        self.stats = stats
+    
+    def on_agent_action(self, action, **kwargs):
+        self.stats.add("structured_calls")
+
+
+class KnowledgeQuery(BaseModel):
+    """Argumente des Wissensdatenbank-Tools im Function-Calling-Modus"""
+    
+    query: str = Field(description="Eine Frage zu Penetrationstests, Schwachstellen oder Hacking-Techniken")
+    category: Optional[str] = Field(None, description="Themenbereich, auf den die Suche beschränkt wird (leer: alle)")
+
+
 class PenetrationTestAgent:
     """Hauptagent für Bug-Bounty-Planung mit Langchain und RAG"""
     
     def __init__(self, 
-                 knowledge_base_path: str = "./knowledge_base",
+                 knowledge_base_path: str = DEFAULT_KNOWLEDGE_BASE_PATH,
                  model_name: str = "gpt-3.5-turbo",
-                 temperature: float = 0.2):
+                 temperature: float = 0.2,
+                 agent_mode: str = "functions",
+                 vector_backend: str = "chroma"):
         """
-        Initialisiert den Penetrationstest-Agenten
+        Initialisiert den Penetration Test Agenten
         
         Args:
-            knowledge_base_path: Pfad zur Wissensdatenbank mit Dokumenten
-            model_name: Name des zu verwendenden LLM-Modells (z.B. gpt-3.5-turbo, gpt-4)
-            temperature: Temperatur für den LLM (höher = kreativere Ausgaben)
+            knowledge_base_path: Pfad zur Wissensdatenbank
+            model_name: Name des zu verwendenden LLM-Modells
+            temperature: Temperatur für das LLM
+            agent_mode: "functions" für strukturierte Tool-Aufrufe (OpenAI Function Calling),
+                "react" für Text im ReAct-Format (für Modelle ohne Function Calling)
+            vector_backend: Vektorindex der Wissensdatenbank: "chroma" oder "compact" (Memmap)
         """
+        if agent_mode not in ("functions", "react"):
+            raise ValueError(f"Unbekannter Agentenmodus: {agent_mode}")
         self.knowledge_base_path = knowledge_base_path
         self.model_name = model_name
         self.temperature = temperature
+        self.agent_mode = agent_mode
         
-        # Initialisiere das LLM (Sprachmodell)
+        # Geparste Ausgaben, strukturierte Tool-Aufrufe und vermiedene Wiederholungen
+        self.parser_stats = ParserStats()
+        self.early_action_detector = EarlyActionDetector([], self.parser_stats)
         self.llm = ChatOpenAI(
-            model_name=self.model_name,
-            temperature=self.temperature,
+            model_name=model_name, 
+            temperature=temperature,
             streaming=True,
-            callbacks=[StreamingStdOutCallbackHandler()]
+            callbacks=[StreamingStdOutCallbackHandler(), TracingCallbackHandler(model_name),
+                       self.early_action_detector]
         )
         
-        # Setup der verschiedenen Komponenten
-        self.vectorstore = self._setup_vectorstore()
+        # Speicher für Konversationen der synchronen Aufrufe (siehe new_memory für getrennte Verläufe)
+        self.memory = self.new_memory()
+        
+        # Gemeinsamer Vektorstore für RAG (einmal pro Prozess und Wissensdatenbank)
+        self.knowledge = get_knowledge_service(knowledge_base_path, consumer="PenetrationTestAgent",
+                                               backend=vector_backend)
+        
+        # Tools einrichten
         self.tools = self._setup_tools()
-        self.agent_executor = self._setup_agent()
+        
+        # Agent einrichten
+        self.agent_chain = self._setup_agent()
     
-    def _setup_vectorstore(self):
-        """Richtet den Vector Store mit der Wissensdatenbank ein"""
-        try:
-            # Prüfe, ob der Wissensdatenbankpfad existiert
-            if not os.path.exists(self.knowledge_base_path):
-                print(f"Warnung: Wissensdatenbankpfad {self.knowledge_base_path} existiert nicht.")
-                return None
-            
-            # Lade Dokumente aus dem Wissensdatenbank-Verzeichnis
-            loader = DirectoryLoader(self.knowledge_base_path, glob="**/*.txt", loader_cls=TextLoader)
-            documents = loader.load()
-            
-            if not documents:
-                print("Warnung: Keine Dokumente in der Wissensdatenbank gefunden.")
-                return None
-            
-            print(f"Anzahl der geladenen Dokumente aus {self.knowledge_base_path}: {len(documents)}")
-            
-            # Teile Dokumente in kleinere Chunks
-            text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-            texts = text_splitter.split_documents(documents)
-            
-            # Erstelle Embeddings und Vector Store
-            embeddings = OpenAIEmbeddings()
-            vectorstore = Chroma.from_documents(texts, embeddings)
-            
-            return vectorstore
+    def new_memory(self) -> ConversationBufferMemory:
+        """
+        Erstellt einen leeren Konversationsspeicher
         
-        except Exception as e:
-            print(f"Fehler beim Einrichten des Vector Stores: {e}")
-            return None
+        Gleichzeitige Anfragen (z.B. im HTTP-Dienst) erhalten je einen eigenen
+        Speicher, damit der Verlauf einer Anfrage nicht im Prompt einer anderen
+        landet und nicht über die Laufzeit des Prozesses wächst.
+        
+        Returns:
+            Der Speicher (als Nachrichten für Function Calling, sonst als Text im Prompt)
+        """
+        return ConversationBufferMemory(return_messages=self.agent_mode == "functions")
+    
+    @property
+    def vectorstore(self):
+        """Der gemeinsame Vektorstore (None, wenn die Wissensdatenbank leer ist)"""
+        return self.knowledge.vectorstore
     
     def _setup_tools(self):
         """Richtet die Tools für den Agenten ein"""
         tools = []
         
-        if self.vectorstore:
-            # Tool für den Zugriff auf die Wissensdatenbank
-            knowledge_tool = Tool(
-                name="Wissensdatenbank",
-                func=lambda q: self._query_knowledge_base(q),
-                description="Nützlich für Fragen zu Sicherheitsthemen, Pentests und Bug-Bounty-Programmen. Frage nach spezifischen Informationen zur Sicherheit."
-            )
-            tools.append(knowledge_tool)
+        # Wissensdatenbank-Abfragetool
+        if self.knowledge.available:
+            description = "Nützlich für Fragen über Penetrationstests, Schwachstellen und Hacking-Techniken."
+            categories = ", ".join(self.knowledge.categories)
+            if self.agent_mode == "functions":
+                knowledge_base_tool = StructuredTool.from_function(
+                    func=self._search_knowledge,
+                    name="PenetrationTestKnowledge",
+                    description=f"{description} Mit category wird nur in einem Themenbereich gesucht: {categories}.",
+                    args_schema=KnowledgeQuery
+                )
+            else:
+                knowledge_base_tool = Tool(
+                    name="PenetrationTestKnowledge",
+                    func=self._search_knowledge,
+                    description=f"{description} Die Eingabe sollte eine Frage sein, die sich auf das Thema bezieht. "
+                                f"Um nur in einem Themenbereich zu suchen, stelle ihn mit Doppelpunkt voran "
+                                f"(z.B. \"methodology: Wie läuft die Aufklärung ab?\"): {categories}."
+                )
+            tools.append(knowledge_base_tool)
+        
+        # TODO: Weitere Tools für spezifische Penetrationstest-Aufgaben hinzufügen
         
         return tools
     
+    def _search_knowledge(self, query: str, category: Optional[str] = None):
+        """Sucht in der Wissensdatenbank, optional nur im Index einer Kategorie"""
+        if category is None:
+            # ReAct-Eingabe "kategorie: frage"
+            prefix, separator, rest = query.partition(":")
+            if separator and prefix.strip().lower() in self.knowledge.categories:
+                category, query = prefix.strip().lower(), rest.strip()
+        return self.knowledge.search(query, k=5, category=category)
+    
     def _setup_agent(self):
-        """Richtet den LLM-Agenten ein"""
-        # Template für die Agentenanweisung
-        template = """
-        Du bist ein hochspezialisierter Experte für Cybersicherheit, Penetrationstests und Bug-Bounty-Programme.
-        Deine Aufgabe ist es, detaillierte Strategien und Anleitungen für Bug-Bounty-Aufgaben zu entwickeln.
+        """Richtet den Langchain-Agenten im gewählten Modus ein"""
+        self.early_action_detector.tool_names = [tool.name for tool in self.tools]
+        if self.agent_mode == "functions":
+            return self._setup_functions_agent()
+        return self._setup_react_agent()
+    
+    def _setup_functions_agent(self):
+        """Richtet einen Agenten ein, der Tools über OpenAI Function Calling aufruft"""
+        # Das Modell liefert Tool-Aufrufe als strukturierte Daten; es gibt nichts zu parsen
+        agent = OpenAIFunctionsAgent.from_llm_and_tools(
+            llm=self.llm,
+            tools=self.tools,
+            system_message=SystemMessage(content=(
+                "Du bist ein Experte für Penetrationstests und Bug-Bounty-Jagd. "
+                "Du hast Zugriff auf eine Wissensdatenbank mit Informationen zu Penetrationstests und Schwachstellen. "
+                "Nutze die Tools, um den Benutzer bei der Planung von Bug-Bounty-Aktivitäten zu unterstützen. "
+                "Führe eine gründliche Analyse durch und erkläre deine Überlegungen in der endgültigen Antwort."
+            )),
+            extra_prompt_messages=[MessagesPlaceholder(variable_name="history")]
+        )
         
-        Nutze dein Wissen über Sicherheitsthemen, um hilfreiche Antworten und strukturierte Pläne zu erstellen.
+        return AgentExecutor.from_agent_and_tools(
+            agent=agent,
+            tools=self.tools,
+            memory=self.memory,
+            verbose=True,
+            callbacks=[ToolCallCounter(self.parser_stats)]
+        )
+    
+    def _setup_react_agent(self):
+        """Richtet einen Agenten ein, der Aktionen im ReAct-Format als Text ausgibt"""
+        # ZeroShotAgent ergänzt die Formatvorgaben, die Tool-Beschreibungen und den Verlauf der Schritte
+        prompt = ZeroShotAgent.create_prompt(
+            self.tools,
+            prefix="""Du bist ein Experte für Penetrationstests und Bug-Bounty-Jagd. 
+        Du hast Zugriff auf eine Wissensdatenbank mit Informationen zu Penetrationstests und Schwachstellen.
         
-        Verfügbare Tools:
-        {tools}
+        Verwende die folgenden Tools, um den Benutzer bei der Planung von Bug-Bounty-Aktivitäten zu unterstützen:""",
+            suffix="""Führe eine gründliche Analyse durch und erkläre deine Überlegungen, bevor du eine endgültige Antwort gibst.
         
-        Verwende die folgenden Formate für deine Antworten:
+        Bisheriger Konversationsverlauf:
+        {history}
         
-        Frage: Die Eingabe des Nutzers
-        Gedanken: Hier solltest du über den Lösungsansatz nachdenken
-        Aktion: Der Name des Tools, das du verwenden möchtest
-        Aktions-Eingabe: Die Eingabe für das Tool
-        Beobachtung: Das Ergebnis der Aktion
-        ... (dieser Gedanken/Aktion/Aktions-Eingabe/Beobachtungs-Prozess kann mehrfach wiederholt werden)
-        Gedanken: Jetzt kenne ich die endgültige Antwort
-        Finale Antwort: Die strukturierte Antwort auf die ursprüngliche Frage
+        Aktuelle Aufgabe: {input}
         
-        Beginne!
+        Denke Schritt für Schritt:
+        {agent_scratchpad}""",
+            input_variables=["input", "history", "agent_scratchpad"]
+        )
         
-        Frage: {input}
-        Gedanken:
-        """
+        # Tool-Namen für den Agenten verfügbar machen
+        tool_names = [tool.name for tool in self.tools]
         
-        prompt = PromptTemplate(
-            template=template,
-            input_variables=["input", "tools"],
-            partial_variables={}
-        )
+        # Parser für Agentenausgabe (zeilenweise, ohne Backtracking)
+        output_parser = StreamingReActParser(tool_names=tool_names, stats=self.parser_stats)
         
-        # Ausgabeparser für den Agenten
-        class CustomOutputParser(AgentOutputParser):
-            def parse(self, llm_output: str) -> Union[AgentAction, AgentFinish]:
-                # Prüfe, ob der LLM eine Aktion ausführen möchte
-                if "Aktion:" in llm_output:
-                    # Extrahiere den Aktionsnamen und die Eingabe
-                    action_match = re.search(r"Aktion:\s*(.*?)\nAktions-Eingabe:\s*(.*)", llm_output, re.DOTALL)
-                    if action_match:
-                        action = action_match.group(1).strip()
-                        action_input = action_match.group(2).strip()
-                        # Gibt eine Aktion zurück, die vom Agenten-Executor ausgeführt werden soll
-                        return AgentAction(tool=action, tool_input=action_input, log=llm_output)
-                
-                # Prüfe, ob der LLM seine Antwort abgeschlossen hat
-                if "Finale Antwort:" in llm_output:
-                    final_answer_match = re.search(r"Finale Antwort:\s*(.*)", llm_output, re.DOTALL)
-                    if final_answer_match:
-                        final_answer = final_answer_match.group(1).strip()
-                        # Gibt ein AgentFinish-Objekt zurück, das signalisiert, dass der Agent fertig ist
-                        return AgentFinish(
-                            return_values={"output": final_answer},
-                            log=llm_output,
-                        )
-                
-                # Wenn keine Aktion oder finale Antwort erkannt wurde, setze die Ausgabe als finale Antwort
-                return AgentFinish(
-                    return_values={"output": llm_output},
-                    log=llm_output,
-                )
+        # LLM Chain
+        llm_chain = LLMChain(
+            llm=self.llm,
+            prompt=prompt
+        )
         
-        # Erstelle den LLM-Agenten
-        llm_chain = LLMChain(llm=self.llm, prompt=prompt)
-        agent = LLMSingleActionAgent(
+        # Agent (hält bei "\nObservation:" an)
+        agent = ZeroShotAgent(
             llm_chain=llm_chain,
-            output_parser=CustomOutputParser(),
-            stop=["\nBeobachtung:"],
-            allowed_tools=[tool.name for tool in self.tools]
+            output_parser=output_parser,
+            allowed_tools=tool_names
         )
         
-        # Erstelle den Agenten-Executor
+        # Agent Executor
         agent_executor = AgentExecutor.from_agent_and_tools(
             agent=agent,
             tools=self.tools,
+            memory=self.memory,
             verbose=True,
-            max_iterations=5
+            handle_parsing_errors=True
         )
         
         return agent_executor
     
-    def _query_knowledge_base(self, query: str) -> str:
-        """Führt eine Abfrage gegen die Wissensdatenbank durch"""
-        if not self.vectorstore:
-            return "Die Wissensdatenbank ist nicht verfügbar."
-        
-        # Durchsuche die Wissensdatenbank
-        docs = self.vectorstore.similarity_search(query, k=3)
+    def run(self, query: str) -> str:
+        """
+        Führt eine Anfrage mit dem Agenten aus
         
-        if not docs:
-            return "Keine relevanten Informationen in der Wissensdatenbank gefunden."
+        Args:
+            query: Die Benutzereingabe/Anfrage
         
-        # Formatiere die Ergebnisse
-        result = "\n\nInformationen aus der Wissensdatenbank:\n"
-        for i, doc in enumerate(docs):
-            result += f"\n--- Abschnitt {i+1} ---\n"
-            result += doc.page_content
-            result += f"\n--- Quelle: {os.path.basename(doc.metadata['source'])} ---\n"
+        Returns:
+            Die Antwort des Agenten
+        """
+        if not self.tools:
+            return "Der Agent hat keine Tools zur Verfügung. Bitte stelle sicher, dass die Wissensdatenbank korrekt eingerichtet ist."
         
-        return result
+        try:
+            result = self.agent_chain.run(input=query)
+            return result
+        except Exception as e:
+            return f"Fehler bei der Ausführung der Anfrage: {e}"
     
-    def run(self, query: str) -> str:
+    async def arun(self,
+                   query: str,
+                   timeout: Optional[float] = None,
+                   memory: Optional[ConversationBufferMemory] = None) -> str:
         """
-        Führt eine Anfrage durch den Agenten aus
+        Führt eine Anfrage asynchron mit dem Agenten aus
+        
+        Bei Überschreiten des Zeitlimits oder Abbruch des Tasks wird auch der laufende
+        LLM-Aufruf abgebrochen.
         
         Args:
-            query: Die Anfrage des Benutzers
-            
+            query: Die Benutzereingabe/Anfrage
+            timeout: Zeitlimit in Sekunden (None für kein Limit)
+            memory: Konversationsspeicher dieses Aufrufs (None für den gemeinsamen Speicher)
+        
         Returns:
             Die Antwort des Agenten
+            
+        Raises:
+            asyncio.TimeoutError: Wenn das Zeitlimit überschritten wurde
         """
         if not self.tools:
-            # Wenn keine Tools verfügbar sind, verwende das LLM direkt
-            response = self.llm.predict(
-                f"""Du bist ein Experte für Cybersicherheit, Penetrationstests und Bug-Bounty-Programme.
-                Beantworte folgende Frage so detailliert und hilfreich wie möglich:
-                
-                {query}
-                """
-            )
-            return response
-        
-        # Führe die Anfrage durch den Agenten-Executor aus
+            return "Der Agent hat keine Tools zur Verfügung. Bitte stelle sicher, dass die Wissensdatenbank korrekt eingerichtet ist."
+        
         try:
-            response = self.agent_executor.run(query)
-            return response
+            agent_chain = self.agent_chain
+            if memory is not None:
+                # Flache Kopie: Agent, Tools und LLM werden geteilt, nur der Speicher nicht
+                # (die Callbacks sind von copy() ausgenommen und werden übernommen)
+                agent_chain = agent_chain.copy(update={"memory": memory, "callbacks": agent_chain.callbacks,
+                                                       "callback_manager": agent_chain.callback_manager})
+            return await asyncio.wait_for(agent_chain.arun(input=query), timeout)
+        except asyncio.TimeoutError:
+            raise
         except Exception as e:
-            return f"Fehler bei der Ausführung der Anfrage: {str(e)}"
+            return f"Fehler bei der Ausführung der Anfrage: {e}"
     
     def add_document_to_knowledge_base(self, content: str, filename: str) -> bool:
         """
@@ -240,29 +455,56 @@ class PenetrationTestAgent:
         
         Args:
             content: Der Inhalt des Dokuments
-            filename: Der Name der Datei, in der der Inhalt gespeichert werden soll
+            filename: Der Dateiname für das Dokument
             
         Returns:
-            True, wenn das Dokument erfolgreich hinzugefügt wurde, sonst False
+            True, wenn erfolgreich hinzugefügt, sonst False
         """
-        try:
-            # Erstelle den Wissensdatenbank-Ordner, falls er nicht existiert
-            os.makedirs(self.knowledge_base_path, exist_ok=True)
-            
-            # Vollständiger Pfad für die neue Datei
-            file_path = os.path.join(self.knowledge_base_path, filename)
-            
-            # Schreibe den Inhalt in die Datei
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(content)
-            
-            print(f"Dokument wurde gespeichert unter {file_path}")
-            
-            # Aktualisiere den Vector Store mit dem neuen Dokument
-            self.vectorstore = self._setup_vectorstore()
-            
-            return True
+        # Der gemeinsame Index nimmt nur die Chunks des neuen Dokuments auf
+        if not self.knowledge.add_document(content, filename):
+            return False
         
-        except Exception as e:
-            print(f"Fehler beim Hinzufügen des Dokuments zur Wissensdatenbank: {e}")
-            return False 
\ No newline at end of file
+        if not self.tools:
+            # Erstes Dokument: Tools und Agent mit der Wissensdatenbank einrichten
+            self.tools = self._setup_tools()
+            self.agent_chain = self._setup_agent()
+        
+        return True
+
+
+# Beispielverwendung (aus dem Projektverzeichnis: python -m src.agents.langchain_agent)
+if __name__ == "__main__":
+    agent = PenetrationTestAgent()
+    
+    # Füge ein Beispieldokument hinzu, falls die Wissensdatenbank leer ist
+    if not agent.vectorstore:
+        example_content = """
+        Grundlegende Phasen eines Penetrationstests:
+        
+        1. Aufklärung (Reconnaissance): Sammlung von Informationen über das Zielsystem
+           - Passive Aufklärung: OSINT, Whois-Lookup, DNS-Informationen
+           - Aktive Aufklärung: Port Scanning, Diensterkennung
+        
+        2. Schwachstellenanalyse (Vulnerability Assessment):
+           - Identifizierung potenzieller Schwachstellen
+           - Priorisierung basierend auf Risiko und Auswirkung
+        
+        3. Exploitation:
+           - Ausnutzung identifizierter Schwachstellen
+           - Erstellung von Proof-of-Concept-Exploits
+        
+        4. Post-Exploitation:
+           - Privilege Escalation
+           - Laterale Bewegung im Netzwerk
+           - Persistenzmechanismen
+        
+        5. Berichterstattung:
+           - Dokumentation gefundener Schwachstellen
+           - Empfehlungen zur Behebung
+           - Risikobewertung
+        """
+        agent.add_document_to_knowledge_base(example_content, "pentest_basics.txt")
+    
+    # Testeingabe
+    result = agent.run("Wie kann ich bei einem Bug-Bounty-Programm mit der Aufklärungsphase beginnen?")
+    print(result) 
\ No newline at end of file
@@ -0,0 +1,3 @@
+"""
+Hilfsfunktionen der Agenten
+"""
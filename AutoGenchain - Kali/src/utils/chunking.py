@@ -0,0 +1,347 @@
+"""
+Strukturbewusstes Chunking von Wissensdatenbank-Dateien nach Tokens
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+from prompt_builder import count_tokens, split_tokens
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+_LIST_ITEM = re.compile(r"^(\s*)(\d+[.)]|[-*+•])\s+")
+_FENCE = re.compile(r"^\s*(```|~~~)")
+
+
+def _join(units: List[Dict[str, Any]]) -> str:
+    """Verbindet Blöcke mit ihrem ursprünglichen Trennzeichen"""
+    return "".join((unit.get("sep", "\n\n") if index else "") + unit["text"] for index, unit in enumerate(units))
+
+
+class _Section:
+    """Abschnitt unter einer Überschrift mit eigenen Blöcken und Unterabschnitten"""
+
+    def __init__(self, index: int, level: int, heading: Optional[str], parent: Optional["_Section"]):
+        self.index = index
+        self.level = level
+        self.heading = heading
+        self.title = heading.lstrip("#").strip() if heading else ""
+        self.parent = parent
+        self.blocks: List[Dict[str, Any]] = []
+        self.children: List["_Section"] = []
+        self.text = ""
+        self.tokens = 0
+        # Einzige Überschrift der obersten Ebene: der Titel des Dokuments
+        self.is_title = False
+
+    def path(self) -> List["_Section"]:
+        """Die Abschnitte von der obersten Überschrift bis zu diesem (ohne Dokumentanfang)"""
+        sections = []
+        section: Optional[_Section] = self
+        while section is not None and section.heading is not None:
+            sections.append(section)
+            section = section.parent
+        return sections[::-1]
+
+    def context(self) -> List["_Section"]:
+        """Der Pfad ohne den Titel des Dokuments (die Quelle steht in den Metadaten)"""
+        return [section for section in self.path() if not section.is_title]
+
+
+class StructureChunker:
+    """
+    Teilt Markdown-artige Texte an Überschriften, Listeneinträgen und Codeblöcken
+
+    Der Text wird in einen Baum aus Abschnitten zerlegt. Passt ein Abschnitt ins
+    Tokenbudget, wird er ganz übernommen; aufeinanderfolgende kleine Abschnitte
+    und Blöcke werden zu einem Chunk zusammengefasst. Ist ein Abschnitt zu groß,
+    wird er an Blockgrenzen (Absatz, Listeneintrag samt Unterpunkten, Codeblock)
+    geteilt; nur ein einzelner zu großer Block wird zeilenweise getrennt, mit
+    `overlap_tokens` Überlappung. Überlange Zeilen werden an Wortgrenzen und
+    einzelne überlange Wörter (z.B. Base64 oder minifizierter Code) in
+    Tokenfenster geteilt, sodass kein Chunk das Budget überschreitet. Zeilen, die mit ":" enden (z.B. "Beispiel-Payloads:"),
+    bleiben beim folgenden Block.
+
+    Jeder Chunk beginnt mit dem Pfad seiner Überschriften (ohne den Titel des
+    Dokuments), soweit er sie nicht selbst enthält, und trägt den umschließenden
+    Abschnitt als Metadaten ("section", "section_path", "parent_id"). `parent` enthält den Text des
+    Abschnitts, auf den eine Suche den Chunk erweitern kann.
+    """
+
+    def __init__(self,
+                max_tokens: int = 300,
+                overlap_tokens: int = 0,
+                model: str = "gpt-3.5-turbo",
+                heading_context: bool = True):
+        """
+        Initialisiert den Chunker
+
+        Args:
+            max_tokens: Maximale Größe eines Chunks in Tokens
+            overlap_tokens: Überlappung, wenn ein einzelner Block geteilt werden muss
+            model: Das Modell, dessen Tokenizer die Größe bestimmt
+            heading_context: Ob Chunks mit dem Pfad ihrer Überschriften beginnen
+        """
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.model = model
+        self.heading_context = heading_context
+
+    def _tokens(self, text: str) -> int:
+        return count_tokens(text, self.model)
+
+    def split_text(self, text: str) -> List[str]:
+        """
+        Teilt einen Text in Chunks
+
+        Args:
+            text: Der Text
+
+        Returns:
+            Die Texte der Chunks
+        """
+        return [chunk["text"] for chunk in self.split(text)]
+
+    def split(self, text: str, source: str = "") -> List[Dict[str, Any]]:
+        """
+        Teilt einen Text in Chunks mit Metadaten
+
+        Args:
+            text: Der Text
+            source: Quelle des Textes (z.B. Dateipfad) für die Metadaten
+
+        Returns:
+            Liste von {"text", "metadata", "parent"}; metadata enthält source, section,
+            section_path, parent_id, parent_tokens, tokens und chunk (laufende Nummer)
+        """
+        root = self._parse(text)
+        chunks = []
+        for units, section, partial in self._pack(root):
+            body = _join(units)
+            # Erweiterung: ein geteilter Abschnitt auf sich selbst, ein ganzer auf den übergeordneten
+            parent = section if partial or section.parent is None else section.parent
+            path = section.path()
+            context = section.context()
+            if context and body.startswith(section.heading):
+                context = context[:-1]
+            if not body.strip():
+                # Leere Dateien oder Abschnitte ergeben keinen Chunk
+                continue
+            if self.heading_context and context:
+                body = " > ".join(s.title for s in context) + "\n" + body
+            chunks.append({
+                "text": body,
+                "metadata": {
+                    "source": source,
+                    "section": section.title,
+                    "section_path": " > ".join(s.title for s in path),
+                    "parent_id": f"{source}#{parent.index}",
+                    "parent_tokens": parent.tokens,
+                    "tokens": self._tokens(body),
+                    "chunk": len(chunks),
+                },
+                "parent": parent.text,
+            })
+        return chunks
+
+    def _parse(self, text: str) -> _Section:
+        """Zerlegt den Text in Abschnitte und Blöcke"""
+        root = _Section(0, 0, None, None)
+        sections = [root]
+        current = root
+        block: Optional[Dict[str, Any]] = None
+        fence: Optional[str] = None
+        # Trennzeichen vor dem nächsten Block, wie im Original (mit oder ohne Leerzeile)
+        sep = "\n\n"
+
+        def close():
+            nonlocal block
+            if block is not None:
+                block["text"] = "\n".join(block.pop("lines")).strip("\n")
+                if block["text"].strip():
+                    current.blocks.append(block)
+                block = None
+
+        for line in text.splitlines():
+            if fence is not None:
+                block["lines"].append(line)
+                if line.strip().startswith(fence):
+                    fence = None
+                    close()
+                    sep = "\n"
+                continue
+            if not line.strip():
+                sep = "\n\n"
+
+            fence_match = _FENCE.match(line)
+            heading = _HEADING.match(line)
+            item = _LIST_ITEM.match(line)
+            if fence_match:
+                close()
+                fence = fence_match.group(1)
+                block = {"kind": "code", "lines": [line], "sep": sep}
+            elif heading:
+                close()
+                level = len(heading.group(1))
+                parent = current
+                while parent.level >= level:
+                    parent = parent.parent
+                current = _Section(len(sections), level, line.strip(), parent)
+                parent.children.append(current)
+                sections.append(current)
+            elif not line.strip():
+                # Leerzeilen trennen Absätze, Listeneinträge laufen über Leerzeilen weiter
+                if block is not None and block["kind"] != "item":
+                    close()
+            elif item and not item.group(1):
+                close()
+                block = {"kind": "item", "lines": [line], "sep": sep}
+            elif block is not None and (block["kind"] == "item" and (line[:1].isspace() or item)):
+                block["lines"].append(line)
+            elif block is not None and block["kind"] == "paragraph":
+                block["lines"].append(line)
+            else:
+                close()
+                block = {"kind": "item" if item else "paragraph", "lines": [line], "sep": sep}
+            if line.strip():
+                sep = "\n"
+        if block is not None:
+            if fence is not None:
+                block["lines"].append(fence)
+            close()
+
+        if len(root.children) == 1 and not root.blocks:
+            root.children[0].is_title = True
+        for section in reversed(sections):
+            self._measure(section)
+        return root
+
+    def _measure(self, section: _Section):
+        """Berechnet Text und Tokens eines Abschnitts und verbindet Blöcke mit ":"-Zeilen"""
+        blocks: List[Dict[str, Any]] = []
+        for block in section.blocks:
+            if blocks and blocks[-1]["text"].rstrip("*").endswith(":") and blocks[-1]["kind"] != "code":
+                joined = blocks[-1]["text"] + "\n" + block["text"]
+                if self._tokens(joined) <= self.max_tokens:
+                    blocks[-1] = {"kind": block["kind"], "text": joined, "sep": blocks[-1]["sep"]}
+                    continue
+            blocks.append(block)
+        section.blocks = blocks
+        units = [{"text": block["text"], "sep": block["sep"]} for block in blocks]
+        units += [{"text": child.text, "sep": "\n\n"} for child in section.children]
+        section.text = _join(([{"text": section.heading, "sep": ""}] if section.heading else []) + units)
+        section.tokens = self._tokens(section.text)
+
+    def _pack(self, section: _Section):
+        """
+        Fasst Blöcke und Unterabschnitte zu Chunks zusammen
+
+        Returns:
+            Liste von (Einheiten, umschließender Abschnitt, geteilt)
+        """
+        # Platz für den Pfad der Überschriften, der dem Chunk vorangestellt wird
+        context = section.context()
+        limit = self.max_tokens
+        if self.heading_context and context:
+            limit -= self._tokens(" > ".join(s.title for s in context)) + 1
+        if section.tokens <= limit:
+            return [([{"text": section.text}], section, False)]
+
+        units: List[Dict[str, Any]] = []
+        block_limit = limit
+        if section.heading:
+            units.append({"text": section.heading, "heading_only": True, "owner": section})
+            # Die Überschrift bleibt beim ersten Stück und muss mit ihm ins Budget passen
+            block_limit -= self._tokens(section.heading) + 2
+        for block in section.blocks:
+            for piece in self._split_block(block, block_limit):
+                units.append({"text": piece, "sep": block["sep"], "owner": section})
+
+        packed = []
+        group: List[Dict[str, Any]] = []
+        size = 0
+
+        def flush():
+            nonlocal group, size
+            if group:
+                owners = {unit["owner"].index for unit in group}
+                if len(owners) == 1 and group[0]["owner"] is not section:
+                    packed.append((group, group[0]["owner"], False))
+                else:
+                    packed.append((group, section, True))
+            group, size = [], 0
+
+        def add(unit: Dict[str, Any]):
+            nonlocal size
+            # Das Trennzeichen zum vorherigen Block zählt mit
+            tokens = self._tokens(unit.get("sep", "\n\n") + unit["text"] if group else unit["text"])
+            # Eine Überschrift allein bildet keinen Chunk, sie bleibt beim folgenden Inhalt
+            if group and size + tokens > limit and not (len(group) == 1 and group[0].get("heading_only")):
+                flush()
+            group.append(unit)
+            size += tokens
+
+        for unit in units:
+            add(unit)
+        for child in section.children:
+            if child.tokens <= limit:
+                add({"text": child.text, "sep": "\n\n", "owner": child})
+            else:
+                if len(group) == 1 and group[0].get("heading_only"):
+                    # Überschrift ohne eigenen Inhalt: wird über den Pfad im Chunk erhalten
+                    group, size = [], 0
+                flush()
+                packed.extend(self._pack(child))
+        flush()
+        return packed
+
+    def _split_block(self, block: Dict[str, Any], limit: int) -> List[str]:
+        """Teilt einen zu großen Block zeilenweise (Codeblöcke behalten ihre Zäune)"""
+        if self._tokens(block["text"]) <= limit:
+            return [block["text"]]
+        lines = block["text"].split("\n")
+        opener = closer = ""
+        if block["kind"] == "code" and len(lines) > 2:
+            opener, closer, lines = lines[0], lines[-1], lines[1:-1]
+        budget = limit - self._tokens(opener + "\n" + closer)
+
+        # Einzelne überlange Zeilen an Wortgrenzen teilen, überlange Wörter in Tokenfenster
+        split_lines = []
+        for line in lines:
+            if self._tokens(line) < budget:
+                split_lines.append(line)
+                continue
+            words, size = [], 0
+            for word in line.split(" "):
+                tokens = self._tokens(word) + 1
+                if words and size + tokens >= budget:
+                    split_lines.append(" ".join(words))
+                    words, size = [], 0
+                if tokens >= budget:
+                    split_lines.extend(split_tokens(word, budget - 1, self.model))
+                    continue
+                words.append(word)
+                size += tokens
+            if words:
+                split_lines.append(" ".join(words))
+
+        pieces, current, size = [], [], 0
+        for line in split_lines:
+            tokens = self._tokens(line) + 1
+            if current and size + tokens > budget:
+                pieces.append(current)
+                # Überlappung aus den letzten Zeilen des vorherigen Stücks
+                overlap, overlap_size = [], 0
+                for previous in reversed(current):
+                    previous_tokens = self._tokens(previous) + 1
+                    if overlap_size + previous_tokens > self.overlap_tokens:
+                        break
+                    overlap.insert(0, previous)
+                    overlap_size += previous_tokens
+                current, size = overlap, overlap_size
+            current.append(line)
+            size += tokens
+        if current:
+            pieces.append(current)
+        if opener:
+            return [opener + "\n" + "\n".join(piece) + "\n" + closer for piece in pieces]
+        return ["\n".join(piece) for piece in pieces]
@@ -0,0 +1,241 @@
+"""
+Langchain-Vektorstore über dem kompakten Memmap-Index
+"""
+
+import json
+import os
+import shutil
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain.embeddings.base import Embeddings
+from langchain.schema import Document
+from langchain.vectorstores.base import VectorStore
+
+from src.utils.vector_index import CompactVectorIndex, normalize
+
+
+class CompactVectorStore(VectorStore):
+    """
+    Vektorstore mit CompactVectorIndex statt Chroma
+
+    Ein Store ist ein Verzeichnis mit dem Index und den Chunks (documents.jsonl,
+    deren Zeilenanfänge in documents.npy stehen). Texte werden erst für die
+    Treffer einer Suche von der Platte gelesen. Das Verzeichnis wird nie
+    verändert: mit add_texts() hinzugefügte Chunks liegen nur im Speicher des
+    Prozesses, gelöschte werden ausgeblendet. Neue Fassungen der Quellen
+    erhalten ein eigenes Verzeichnis (siehe KnowledgeService), sodass Worker,
+    die den alten Index noch geöffnet haben, nicht gestört werden.
+    """
+
+    def __init__(self, path: str, embedding: Embeddings, nprobe: Optional[int] = None):
+        """
+        Öffnet einen mit from_texts() erstellten Store read-only
+
+        Args:
+            path: Verzeichnis des Store
+            embedding: Embeddings für Anfragen und hinzugefügte Chunks
+            nprobe: Anzahl der durchsuchten IVF-Listen (Standard siehe CompactVectorIndex)
+        """
+        self.path = path
+        self.index = CompactVectorIndex(path)
+        self.nprobe = nprobe
+        self._embedding = embedding
+        self._offsets = np.load(os.path.join(path, "documents.npy"), mmap_mode="r")
+        self._file = open(os.path.join(path, "documents.jsonl"), "rb")
+        with open(os.path.join(path, "extra.json"), "r", encoding="utf-8") as f:
+            self.extra: Dict[str, Any] = json.load(f)
+        self._lock = threading.Lock()
+        self._deleted: set = set()
+        self._added: Dict[str, Tuple[Document, np.ndarray]] = {}
+        self._next_added = 0
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        """Ob unter dem Pfad ein vollständiger Store liegt"""
+        return os.path.exists(os.path.join(path, "extra.json"))
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def _document(self, row: int) -> Document:
+        """Liest einen Chunk des Index von der Platte"""
+        start, stop = int(self._offsets[row]), int(self._offsets[row + 1])
+        record = json.loads(os.pread(self._file.fileno(), stop - start, start))
+        return Document(page_content=record["text"], metadata=record["metadata"])
+
+    @classmethod
+    def from_texts(cls,
+                   texts: List[str],
+                   embedding: Embeddings,
+                   metadatas: Optional[List[dict]] = None,
+                   path: Optional[str] = None,
+                   dtype: str = "int8",
+                   nlist: Optional[int] = None,
+                   extra: Optional[Dict[str, Any]] = None,
+                   **kwargs: Any) -> "CompactVectorStore":
+        """
+        Bettet die Texte ein und schreibt einen neuen Store
+
+        Der Store wird in einem temporären Verzeichnis aufgebaut und dann umbenannt.
+        Hat ein anderer Prozess denselben Pfad inzwischen angelegt, wird dessen
+        Store geöffnet.
+
+        Args:
+            texts: Die Texte der Chunks
+            embedding: Die Embeddings
+            metadatas: Metadaten pro Chunk
+            path: Verzeichnis des Store
+            dtype: Quantisierung der Vektoren ("int8" oder "float16")
+            nlist: Anzahl der IVF-Listen (siehe CompactVectorIndex.build)
+            extra: Weitere Angaben, die mit dem Store gespeichert werden
+
+        Returns:
+            Der geöffnete Store
+
+        Raises:
+            ValueError: Wenn kein Pfad angegeben ist
+        """
+        if not path:
+            raise ValueError("CompactVectorStore braucht einen Pfad")
+        metadatas = metadatas or [{} for _ in texts]
+        vectors = np.asarray(embedding.embed_documents(list(texts)), dtype=np.float32)
+
+        temporary = f"{path}.tmp-{os.getpid()}"
+        shutil.rmtree(temporary, ignore_errors=True)
+        CompactVectorIndex.build(temporary, vectors, dtype=dtype, nlist=nlist)
+        offsets = [0]
+        with open(os.path.join(temporary, "documents.jsonl"), "wb") as f:
+            for text, metadata in zip(texts, metadatas):
+                line = (json.dumps({"text": text, "metadata": metadata}, ensure_ascii=False) + "\n").encode("utf-8")
+                f.write(line)
+                offsets.append(offsets[-1] + len(line))
+        np.save(os.path.join(temporary, "documents.npy"), np.asarray(offsets, dtype=np.int64))
+        # extra.json zuletzt: markiert den Store als vollständig
+        with open(os.path.join(temporary, "extra.json"), "w", encoding="utf-8") as f:
+            json.dump(extra or {}, f, ensure_ascii=False)
+
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            os.rename(temporary, path)
+        except OSError:
+            if not cls.exists(path):
+                raise
+            shutil.rmtree(temporary, ignore_errors=True)
+        return cls(path, embedding, **kwargs)
+
+    def add_texts(self,
+                  texts: Iterable[str],
+                  metadatas: Optional[List[dict]] = None,
+                  **kwargs: Any) -> List[str]:
+        """
+        Fügt Chunks im Speicher hinzu (das Verzeichnis bleibt unverändert)
+
+        Returns:
+            Die IDs der neuen Chunks
+        """
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        vectors = normalize(np.asarray(self._embedding.embed_documents(texts), dtype=np.float32))
+        ids = []
+        with self._lock:
+            added = dict(self._added)
+            for text, metadata, vector in zip(texts, metadatas, vectors):
+                chunk_id = f"added-{self._next_added}"
+                self._next_added += 1
+                added[chunk_id] = (Document(page_content=text, metadata=metadata), vector)
+                ids.append(chunk_id)
+            # Suchen lesen ohne Sperre: das Dictionary wird ersetzt, nicht verändert
+            self._added = added
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        """Blendet Chunks des Index aus bzw. entfernt hinzugefügte Chunks"""
+        with self._lock:
+            added = dict(self._added)
+            deleted = set(self._deleted)
+            for chunk_id in ids or []:
+                if chunk_id in added:
+                    del added[chunk_id]
+                else:
+                    deleted.add(int(chunk_id))
+            self._added, self._deleted = added, deleted
+        return True
+
+    def get(self,
+            where: Optional[Dict[str, Any]] = None,
+            include: Optional[List[str]] = None,
+            limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Gibt Chunks wie Chroma.get() zurück (liest dafür alle Chunks von der Platte)
+
+        Args:
+            where: Gleichheitsbedingungen auf den Metadaten
+            include: Zusätzlich zu den IDs: "documents", "metadatas" und/oder "embeddings"
+            limit: Maximale Anzahl der Chunks
+
+        Returns:
+            Dictionary mit "ids" und den angeforderten Feldern
+        """
+        include = include or ["documents", "metadatas"]
+        found: List[Tuple[str, Document, Any]] = []
+        for chunk_id, document, vector in self._chunks():
+            if limit is not None and len(found) >= limit:
+                break
+            if where and any(document.metadata.get(key) != value for key, value in where.items()):
+                continue
+            found.append((chunk_id, document, vector))
+
+        result: Dict[str, Any] = {"ids": [chunk_id for chunk_id, _, _ in found]}
+        if "documents" in include:
+            result["documents"] = [document.page_content for _, document, _ in found]
+        if "metadatas" in include:
+            result["metadatas"] = [document.metadata for _, document, _ in found]
+        if "embeddings" in include:
+            result["embeddings"] = [self._vector(vector).tolist() for _, _, vector in found]
+        return result
+
+    def _chunks(self):
+        """Alle sichtbaren Chunks als (ID, Dokument, Zeilennummer bzw. Vektor)"""
+        deleted, added = self._deleted, self._added
+        for row in range(self.index.count):
+            if row not in deleted:
+                yield str(row), self._document(row), row
+        for chunk_id, (document, vector) in added.items():
+            yield chunk_id, document, vector
+
+    def _vector(self, vector: Any) -> np.ndarray:
+        """Der Vektor eines Chunks (Zeilennummer im Index oder Vektor eines hinzugefügten Chunks)"""
+        if not isinstance(vector, (int, np.integer)):
+            return vector
+        position = int(np.flatnonzero(self.index.ids == vector)[0])
+        if self.index.exact is not None:
+            return np.asarray(self.index.exact[position])
+        codes = self.index.codes[position].astype(np.float32)
+        return codes * self.index.scales[position] if self.index.scales is not None else codes
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4) -> List[Tuple[Document, float]]:
+        """Sucht im Index und unter den hinzugefügten Chunks"""
+        query = normalize(np.asarray(embedding, dtype=np.float32))
+        deleted, added = self._deleted, self._added
+        rows, scores = self.index.search(query, k=k + len(deleted), nprobe=self.nprobe)
+        results = [(float(score), str(row)) for row, score in zip(rows, scores) if int(row) not in deleted]
+        results += [(float(vector @ query), chunk_id) for chunk_id, (_, vector) in added.items()]
+        results.sort(key=lambda result: -result[0])
+        return [(added[chunk_id][0] if chunk_id in added else self._document(int(chunk_id)), score)
+                for score, chunk_id in results[:k]]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self._embedding.embed_query(query), k=k)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [document for document, _ in self.similarity_search_by_vector_with_score(embedding, k=k)]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [document for document, _ in self.similarity_search_with_score(query, k=k)]
+
+    def _select_relevance_score_fn(self):
+        # Die Scores sind bereits Kosinus-Ähnlichkeiten
+        return lambda score: score
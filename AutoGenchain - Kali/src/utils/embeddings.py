@@ -0,0 +1,113 @@
+"""
+Lokale Embeddings ohne API-Aufrufe und ohne Modell-Download
+"""
+
+import hashlib
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+_WORD = re.compile(r"\w+")
+
+
+def _bucket(feature: str, dimensions: int) -> int:
+    """Stabiler Hash eines Merkmals (unabhängig von PYTHONHASHSEED)"""
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little") % dimensions
+
+
+class HashingEmbeddings:
+    """
+    Embeddings per Feature-Hashing aus Wörtern und Zeichen-n-Grammen
+
+    Jedes Wort und jedes Zeichen-n-Gramm eines Wortes (z.B. "schw", "chwa", ...)
+    wird auf eine von `dimensions` Positionen gehasht; die n-Gramme finden auch
+    Teile deutscher Komposita wie "Schwachstellenanalyse". Mit fit() werden die
+    Merkmale nach ihrer inversen Dokumentfrequenz gewichtet. Die Vektoren sind
+    L2-normiert, das Skalarprodukt ist also die Kosinus-Ähnlichkeit.
+
+    Die Klasse erfüllt die Schnittstelle von Langchain-Embeddings (embed_documents,
+    embed_query) und kann damit auch an Chroma übergeben werden. Sie eignet sich für
+    reproduzierbare Offline-Benchmarks, nicht als Ersatz für ein semantisches Modell.
+    """
+
+    def __init__(self, dimensions: int = 1024, ngram: int = 4):
+        """
+        Initialisiert die Embeddings
+
+        Args:
+            dimensions: Länge der Vektoren
+            ngram: Länge der Zeichen-n-Gramme (0 für nur ganze Wörter)
+        """
+        self.dimensions = dimensions
+        self.ngram = ngram
+        self.idf: Optional[Dict[str, float]] = None
+        self._default_idf = 1.0
+
+    def features(self, text: str) -> Counter:
+        """
+        Zerlegt einen Text in Merkmale
+
+        Args:
+            text: Der Text
+
+        Returns:
+            Häufigkeit pro Merkmal
+        """
+        features: Counter = Counter()
+        for word in _WORD.findall(text.lower()):
+            features["w:" + word] += 1
+            padded = f"<{word}>"
+            if self.ngram and len(padded) > self.ngram:
+                for i in range(len(padded) - self.ngram + 1):
+                    features["n:" + padded[i:i + self.ngram]] += 1
+        return features
+
+    def fit(self, texts: Iterable[str]) -> "HashingEmbeddings":
+        """
+        Berechnet die inverse Dokumentfrequenz der Merkmale
+
+        Args:
+            texts: Die Texte des Korpus
+
+        Returns:
+            Die Embeddings (für verkettete Aufrufe)
+        """
+        frequency: Counter = Counter()
+        count = 0
+        for text in texts:
+            frequency.update(set(self.features(text)))
+            count += 1
+        self.idf = {feature: math.log((1 + count) / (1 + df)) + 1 for feature, df in frequency.items()}
+        self._default_idf = math.log(1 + count) + 1
+        return self
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Berechnet die Vektoren mehrerer Texte
+
+        Args:
+            texts: Die Texte
+
+        Returns:
+            Matrix (Anzahl Texte × dimensions) mit L2-normierten float32-Zeilen
+        """
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, count in self.features(text).items():
+                weight = 1 + math.log(count)
+                if self.idf is not None:
+                    weight *= self.idf.get(feature, self._default_idf)
+                matrix[row, _bucket(feature, self.dimensions)] += weight
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Langchain-Schnittstelle: Vektoren der Dokumente"""
+        return self.embed(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        """Langchain-Schnittstelle: Vektor einer Anfrage"""
+        return self.embed([text])[0].tolist()
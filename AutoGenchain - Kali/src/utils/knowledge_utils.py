@@ -0,0 +1,482 @@
+"""
+Gemeinsamer Wissensdienst: ein Vektorindex pro Wissensdatenbank und Prozess
+"""
+
+import hashlib
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain.document_loaders import DirectoryLoader, TextLoader
+from langchain.embeddings import OpenAIEmbeddings
+from langchain.embeddings.base import Embeddings
+from langchain.schema import Document
+from langchain.vectorstores import Chroma
+from langchain.vectorstores.base import VectorStore
+
+from src.utils.chunking import StructureChunker
+from src.utils.compact_store import CompactVectorStore
+from tracing import tracer
+
+DEFAULT_KNOWLEDGE_BASE_PATH = "./bugbounty-agents/knowledge_base"
+VECTOR_BACKENDS = ("chroma", "compact")
+
+# Kategorie einer Quelldatei: ihr Unterverzeichnis in der Wissensdatenbank (z.B. wifi/),
+# sonst die erste Kategorie, deren Stichwort im Dateinamen vorkommt
+CATEGORY_KEYWORDS = [
+    ("methodology", ("methodology", "methodik")),
+    ("vulnerabilities", ("owasp", "vulnerab", "web_app_security")),
+    ("exploits", ("exploit",)),
+    ("bug_bounty", ("bug_bounty", "bugbounty")),
+    ("wifi", ("wifi", "wlan", "wireless")),
+]
+DEFAULT_CATEGORY = "general"
+
+_services: Dict[Tuple[str, str, str], "KnowledgeService"] = {}
+_services_lock = threading.Lock()
+
+
+def get_knowledge_service(knowledge_base_path: str = DEFAULT_KNOWLEDGE_BASE_PATH,
+                          consumer: Optional[str] = None,
+                          backend: str = "chroma",
+                          index_path: Optional[str] = None) -> "KnowledgeService":
+    """
+    Gibt den Wissensdienst einer Wissensdatenbank zurück und legt ihn beim ersten Aufruf an
+
+    Alle Aufrufer im Prozess mit demselben Pfad, Backend und Indexverzeichnis erhalten
+    denselben Dienst und damit denselben Vektorindex. Ein anderes Backend oder
+    Indexverzeichnis ergibt einen eigenen Dienst.
+
+    Args:
+        knowledge_base_path: Pfad zur Wissensdatenbank
+        consumer: Name des Aufrufers, der bisher einen eigenen Index aufgebaut hätte
+            (für den Speicherbericht; None für Aufrufer, die den Index nur mitbenutzen)
+        backend: Vektorindex ("chroma" oder "compact")
+        index_path: Verzeichnis der kompakten Indizes (Standard: <Wissensdatenbank>.index)
+
+    Returns:
+        Der Wissensdienst
+    """
+    path = os.path.abspath(knowledge_base_path)
+    key = (path, backend, os.path.abspath(index_path) if index_path else path + ".index")
+    with _services_lock:
+        service = _services.get(key)
+        if service is None:
+            service = _services[key] = KnowledgeService(knowledge_base_path, collection_name=f"knowledge-{len(_services)}",
+                                                        backend=backend, index_path=index_path)
+    if consumer:
+        service.register_consumer(consumer)
+    return service
+
+
+def categorize(source: str, knowledge_base_path: str) -> str:
+    """
+    Bestimmt die Kategorie einer Quelldatei
+
+    Args:
+        source: Pfad der Datei
+        knowledge_base_path: Pfad der Wissensdatenbank
+
+    Returns:
+        Die Kategorie (DEFAULT_CATEGORY, wenn keine passt)
+    """
+    parts = os.path.relpath(source, knowledge_base_path).split(os.sep)
+    if len(parts) > 1 and parts[0] != "..":
+        return parts[0].lower()
+    name = os.path.basename(source).lower()
+    for category, keywords in CATEGORY_KEYWORDS:
+        if any(keyword in name for keyword in keywords):
+            return category
+    return DEFAULT_CATEGORY
+
+
+class _EmbeddingCache(Embeddings):
+    """Bettet jeden Text nur einmal ein, auch wenn er in mehrere Indizes eingefügt wird"""
+
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+        self.vectors: Dict[str, List[float]] = {}
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        missing = [text for text in dict.fromkeys(texts) if text not in self.vectors]
+        if missing:
+            self.vectors.update(zip(missing, self.embeddings.embed_documents(missing)))
+        return [self.vectors[text] for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+
+class KnowledgeService:
+    """
+    Vektorindex über einer Wissensdatenbank, den sich alle Agenten eines Prozesses teilen
+
+    Der Index wird beim ersten Zugriff genau einmal aufgebaut; gleichzeitige erste
+    Zugriffe warten auf denselben Aufbau. Suchen nehmen danach keine Sperre mehr,
+    sodass beliebig viele Threads parallel lesen können. Neue Dokumente werden
+    unter der Sperre inkrementell eingefügt (nur ihre eigenen Chunks werden
+    eingebettet); den gleichzeitigen Zugriff von Lesern und Schreiber auf die
+    Collection synchronisiert der Chroma-Client selbst.
+
+    Bisher hat jeder PenetrationTestAgent und der Wissensdatenbank-Test einen
+    eigenen Index aufgebaut, und jedes hinzugefügte Dokument hat alle Chunks neu
+    eingebettet. memory_report() schätzt den dadurch eingesparten Speicher.
+
+    Mit backend="compact" liegt der Index als CompactVectorStore (int8-Memmap) auf
+    der Festplatte, in einem Verzeichnis pro Fassung der Quellen unter
+    `index_path`. Weitere Prozesse öffnen ihn, statt neu einzubetten, und teilen
+    sich seine Seiten über den Page-Cache.
+
+    Jeder Chunk trägt Kategorie, Quelldatei und Abschnitt als Metadaten. Neben dem
+    Gesamtindex wird pro Kategorie ein eigener Index aufgebaut (mit denselben
+    Embeddings), damit Suchen mit `category` nur diese Partition durchsuchen.
+    """
+
+    def __init__(self,
+                knowledge_base_path: str,
+                max_tokens: int = 300,
+                collection_name: str = "knowledge",
+                chunker: Optional[StructureChunker] = None,
+                backend: str = "chroma",
+                index_path: Optional[str] = None):
+        """
+        Initialisiert den Dienst (der Index wird erst beim ersten Zugriff aufgebaut)
+
+        Args:
+            knowledge_base_path: Pfad zur Wissensdatenbank
+            max_tokens: Maximale Größe der Textchunks in Tokens
+            collection_name: Name der Chroma-Collection (eindeutig pro Dienst)
+            chunker: Eigener Chunker mit split(text, source) (sonst StructureChunker)
+            backend: Vektorindex: "chroma" (im Prozess) oder "compact" (Memmap auf der Festplatte)
+            index_path: Verzeichnis der kompakten Indizes (Standard: <Wissensdatenbank>.index)
+
+        Raises:
+            ValueError: Bei unbekanntem Backend
+        """
+        if backend not in VECTOR_BACKENDS:
+            raise ValueError(f"Unbekanntes Vektor-Backend: {backend} (erlaubt: {', '.join(VECTOR_BACKENDS)})")
+        self.knowledge_base_path = knowledge_base_path
+        self.collection_name = collection_name
+        self.backend = backend
+        self.index_path = index_path or os.path.abspath(knowledge_base_path) + ".index"
+        self.chunker = chunker or StructureChunker(max_tokens=max_tokens)
+        # Text der umschließenden Abschnitte pro parent_id, für search(expand=True)
+        self.parents: Dict[str, str] = {}
+        # Index pro Kategorie (z.B. "methodology"), aufgebaut zusammen mit dem Gesamtindex
+        self.partitions: Dict[str, VectorStore] = {}
+        self.consumers: Dict[str, int] = {}
+        self.stats = {"builds": 0, "embedded_chunks": 0, "saved_embeddings": 0, "chunks": 0, "text_bytes": 0,
+                      "embedding_tokens": 0, "dimensions": 0}
+        self._vectorstore: Optional[VectorStore] = None
+        self._store_path: Optional[str] = None
+        self._embeddings: Optional[_EmbeddingCache] = None
+        self._built = False
+        self._lock = threading.RLock()
+
+    def register_consumer(self, consumer: str):
+        """
+        Vermerkt einen Nutzer des Index
+
+        Args:
+            consumer: Name des Nutzers (z.B. "PenetrationTestAgent")
+        """
+        with self._lock:
+            self.consumers[consumer] = self.consumers.get(consumer, 0) + 1
+
+    @property
+    def vectorstore(self) -> Optional[VectorStore]:
+        """Der Vektorindex (None, wenn die Wissensdatenbank leer oder nicht verfügbar ist)"""
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self._vectorstore = self._build()
+                    self._built = True
+        return self._vectorstore
+
+    @property
+    def available(self) -> bool:
+        """Ob der Index Dokumente enthält"""
+        return self.vectorstore is not None
+
+    def _build(self) -> Optional[VectorStore]:
+        """Lädt alle Dokumente der Wissensdatenbank und baut den Index auf"""
+        # Prüfe, ob die Wissensdatenbank existiert
+        if not os.path.exists(self.knowledge_base_path):
+            os.makedirs(self.knowledge_base_path)
+            print(f"Wissensdatenbank-Verzeichnis erstellt unter {self.knowledge_base_path}")
+            print("Füge bitte Dokumente zum Wissensdatenbank-Verzeichnis hinzu.")
+            return None
+
+        try:
+            with tracer.span("knowledge_build", path=self.knowledge_base_path) as span:
+                self._embeddings = _EmbeddingCache(OpenAIEmbeddings())
+                if self.backend == "compact":
+                    self._store_path = os.path.join(self.index_path, self._fingerprint())
+                    if CompactVectorStore.exists(self._store_path):
+                        vectorstore = self._open(self._store_path)
+                        span.set(chunks=self.stats["chunks"], loaded=True)
+                        print(f"Kompakter Vektorindex mit {self.stats['chunks']} Textchunks geladen.")
+                        return vectorstore
+
+                loader = DirectoryLoader(self.knowledge_base_path, glob="**/*.txt", loader_cls=TextLoader)
+                documents = loader.load()
+
+                if not documents:
+                    print("Keine Dokumente in der Wissensdatenbank gefunden.")
+                    return None
+
+                texts = self._split(documents)
+                # Alle Chunks einmal einbetten; Gesamt- und Kategorie-Indizes nutzen dieselben Vektoren
+                self._embeddings.embed_documents([text.page_content for text in texts])
+                by_category: Dict[str, List[Document]] = {}
+                for text in texts:
+                    by_category.setdefault(text.metadata["category"], []).append(text)
+                # Kategorien zuerst: ein vollständiger Gesamtindex auf der Festplatte setzt sie voraus
+                self.partitions = {category: self._create_store(category_texts, category)
+                                   for category, category_texts in sorted(by_category.items())}
+                stats = {"chunks": len(texts),
+                         "text_bytes": sum(len(text.page_content.encode("utf-8")) for text in texts),
+                         "embedding_tokens": sum(text.metadata.get("tokens", 0) for text in texts)}
+                vectorstore = self._create_store(texts, extra={"parents": self.parents, "stats": stats,
+                                                               "categories": sorted(self.partitions)})
+                self.stats["builds"] += 1
+                self._count(texts, vectorstore)
+                span.set(documents=len(documents), chunks=len(texts), categories=len(self.partitions))
+            print(f"Vektorstore mit {len(texts)} Textchunks aus {len(documents)} Dokumenten erstellt "
+                  f"(Kategorien: {', '.join(f'{c} ({len(t)})' for c, t in sorted(by_category.items()))}).")
+            return vectorstore
+        except Exception as e:
+            print(f"Fehler beim Einrichten des Vektorstores: {e}")
+            return None
+        finally:
+            if self._embeddings is not None:
+                self._embeddings.vectors.clear()
+
+    def _create_store(self, texts: List[Document], category: Optional[str] = None,
+                      extra: Optional[Dict[str, Any]] = None) -> VectorStore:
+        """Erstellt den Gesamtindex (category=None) oder den Index einer Kategorie"""
+        suffix = f"-{category}" if category else ""
+        if self.backend == "compact":
+            return CompactVectorStore.from_documents(texts, self._embeddings, path=self._store_path + suffix,
+                                                     extra=extra)
+        return Chroma.from_documents(texts, self._embeddings, collection_name=self.collection_name + suffix)
+
+    def _fingerprint(self) -> str:
+        """Kennung der aktuellen Fassung aller Quelldateien und der Chunking-Einstellungen"""
+        digest = hashlib.sha1()
+        digest.update(repr(sorted(vars(self.chunker).items())).encode("utf-8"))
+        for directory, _, files in sorted(os.walk(self.knowledge_base_path)):
+            for name in sorted(files):
+                if name.endswith(".txt"):
+                    path = os.path.join(directory, name)
+                    status = os.stat(path)
+                    source = os.path.relpath(path, self.knowledge_base_path)
+                    digest.update(f"{source}:{status.st_size}:{status.st_mtime_ns}\n".encode("utf-8"))
+        return digest.hexdigest()[:16]
+
+    def _open(self, store_path: str) -> CompactVectorStore:
+        """Öffnet einen vorhandenen kompakten Index samt Kategorien und übernimmt Abschnitte und Statistik"""
+        vectorstore = CompactVectorStore(store_path, self._embeddings)
+        self.partitions = {category: CompactVectorStore(f"{store_path}-{category}", self._embeddings)
+                           for category in vectorstore.extra.get("categories", [])}
+        self.parents.update(vectorstore.extra.get("parents", {}))
+        for key, value in vectorstore.extra.get("stats", {}).items():
+            self.stats[key] += value
+        self.stats["dimensions"] = vectorstore.index.dimensions
+        self.stats["builds"] += 1
+        return vectorstore
+
+    def _split(self, documents: List[Document]) -> List[Document]:
+        """Teilt Dokumente in Chunks mit Kategorie und Abschnitt als Metadaten und merkt sich die Abschnitte"""
+        texts = []
+        for document in documents:
+            source = document.metadata["source"]
+            category = categorize(source, self.knowledge_base_path)
+            for chunk in self.chunker.split(document.page_content, source):
+                chunk["metadata"]["category"] = category
+                self.parents[chunk["metadata"]["parent_id"]] = chunk["parent"]
+                texts.append(Document(page_content=chunk["text"], metadata=chunk["metadata"]))
+        return texts
+
+    def _count(self, texts: List[Document], vectorstore: Chroma):
+        """Zählt eingebettete Chunks, Tokens, Textgröße und Dimension der Embeddings"""
+        self.stats["embedded_chunks"] += len(texts)
+        self.stats["chunks"] += len(texts)
+        self.stats["text_bytes"] += sum(len(text.page_content.encode("utf-8")) for text in texts)
+        self.stats["embedding_tokens"] += sum(text.metadata.get("tokens", 0) for text in texts)
+        if not self.stats["dimensions"]:
+            embeddings = vectorstore.get(limit=1, include=["embeddings"]).get("embeddings") or []
+            self.stats["dimensions"] = len(embeddings[0]) if embeddings else 0
+
+    @property
+    def categories(self) -> List[str]:
+        """Die Kategorien mit eigenem Index"""
+        return sorted(self.partitions) if self.available else []
+
+    def search(self,
+               query: str,
+               k: int = 5,
+               expand: bool = False,
+               max_expand_tokens: int = 1200,
+               category: Optional[str] = None) -> List[Document]:
+        """
+        Sucht die zu einer Anfrage passenden Chunks
+
+        Args:
+            query: Die Anfrage
+            k: Anzahl der Ergebnisse
+            expand: Ob Chunks auf ihren umschließenden Abschnitt erweitert werden
+            max_expand_tokens: Größter Abschnitt, auf den erweitert wird
+            category: Nur im Index dieser Kategorie suchen (unbekannte Kategorien: alle Chunks)
+
+        Returns:
+            Die gefundenen Chunks (leer, wenn der Index nicht verfügbar ist); erweiterte
+            Chunks desselben Abschnitts erscheinen nur einmal
+        """
+        vectorstore = self.vectorstore
+        if vectorstore is None:
+            return []
+        partition = self.partitions.get(category) if category else None
+        with tracer.span("retrieval", query_chars=len(query), category=category if partition else None) as span:
+            documents = (partition or vectorstore).similarity_search(query, k=k)
+            if expand:
+                documents = self._expand(documents, max_expand_tokens)
+            span.set(documents=len(documents))
+        return documents
+
+    def _expand(self, documents: List[Document], max_expand_tokens: int) -> List[Document]:
+        """Ersetzt Chunks durch ihren umschließenden Abschnitt, sofern er klein genug ist"""
+        expanded, seen = [], set()
+        for document in documents:
+            parent_id = document.metadata.get("parent_id")
+            parent = self.parents.get(parent_id)
+            if parent is None or document.metadata.get("parent_tokens", 0) > max_expand_tokens:
+                key = (parent_id, document.page_content)
+                if key not in seen:
+                    seen.add(key)
+                    expanded.append(document)
+            elif parent_id not in seen:
+                seen.add(parent_id)
+                expanded.append(Document(page_content=parent, metadata=dict(document.metadata, expanded=True)))
+        return expanded
+
+    def retriever(self, k: int = 5):
+        """
+        Gibt einen Langchain-Retriever über dem gemeinsamen Index zurück
+
+        Args:
+            k: Anzahl der Ergebnisse pro Anfrage
+
+        Returns:
+            Der Retriever (None, wenn der Index nicht verfügbar ist)
+        """
+        vectorstore = self.vectorstore
+        return vectorstore.as_retriever(search_kwargs={"k": k}) if vectorstore is not None else None
+
+    def add_document(self, content: str, filename: str) -> bool:
+        """
+        Speichert ein Dokument in der Wissensdatenbank und fügt seine Chunks dem Index hinzu
+
+        Ein vorhandenes Dokument gleichen Namens wird ersetzt.
+
+        Args:
+            content: Der Inhalt des Dokuments
+            filename: Der Dateiname für das Dokument
+
+        Returns:
+            True, wenn erfolgreich hinzugefügt, sonst False
+        """
+        try:
+            with self._lock:
+                if not os.path.exists(self.knowledge_base_path):
+                    os.makedirs(self.knowledge_base_path)
+
+                file_path = os.path.join(self.knowledge_base_path, filename)
+                with open(file_path, 'w', encoding='utf-8') as f:
+                    f.write(content)
+
+                if self._vectorstore is None:
+                    # Noch kein Index: mit dem neuen Dokument vollständig aufbauen
+                    self._vectorstore = self._build()
+                    self._built = True
+                    return self._vectorstore is not None
+
+                # Chunks einer früheren Fassung entfernen, nur die neuen Chunks einbetten
+                category = categorize(file_path, self.knowledge_base_path)
+                partition = self.partitions.get(category)
+                if partition is not None:
+                    partition_ids = partition.get(where={"source": file_path}, include=[]).get("ids") or []
+                    if partition_ids:
+                        partition.delete(ids=partition_ids)
+                old = self._vectorstore.get(where={"source": file_path}, include=["documents", "metadatas"])
+                if old.get("ids"):
+                    self._vectorstore.delete(ids=old["ids"])
+                    self.stats["chunks"] -= len(old["ids"])
+                    self.stats["text_bytes"] -= sum(len(text.encode("utf-8")) for text in old["documents"])
+                    self.stats["embedding_tokens"] -= sum(metadata.get("tokens", 0) for metadata in old["metadatas"])
+                    for metadata in old["metadatas"]:
+                        self.parents.pop(metadata.get("parent_id"), None)
+                texts = self._split([Document(page_content=content, metadata={"source": file_path})])
+                try:
+                    self._vectorstore.add_documents(texts)
+                    if partition is not None:
+                        partition.add_documents(texts)
+                    else:
+                        self.partitions[category] = self._create_store(texts, category)
+                finally:
+                    self._embeddings.vectors.clear()
+                self._count(texts, self._vectorstore)
+                # Bisher wurde der Index dabei mit allen Chunks neu aufgebaut
+                self.stats["saved_embeddings"] += self.stats["chunks"] - len(texts)
+                print(f"{len(texts)} Textchunks aus {filename} zum Vektorstore hinzugefügt.")
+                return True
+        except Exception as e:
+            print(f"Fehler beim Hinzufügen des Dokuments: {e}")
+            return False
+
+    def memory_report(self) -> Dict[str, Any]:
+        """
+        Schätzt den Speicher des Index und die Einsparung gegenüber eigenen Indizes pro Nutzer
+
+        Pro Chunk hält Chroma 0.4 den float32-Vektor im HNSW-Index und ein zweites Mal
+        in seiner SQLite-Datenbank, dazu den Text. Ohne den gemeinsamen Dienst hätte
+        jeder registrierte Nutzer einen eigenen Index aufgebaut und jedes hinzugefügte
+        Dokument alle Chunks neu eingebettet.
+
+        Der kompakte Index liest pro Chunk einen int8-Vektor mit Skala und
+        Zeilennummer; Texte und exakte Vektoren bleiben auf der Festplatte. Die
+        Kategorie-Indizes enthalten jeden Chunk ein zweites Mal.
+
+        Returns:
+            Chunks, Dimension, eingebettete Tokens, geschätzte Bytes pro Index, Nutzer, vermiedene Indizes,
+            eingesparte Bytes sowie eingebettete und beim Hinzufügen eingesparte Embeddings
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            consumers = dict(self.consumers)
+        copies = 2 if self.partitions else 1
+        if self.backend == "compact":
+            index_bytes = copies * stats["chunks"] * (stats["dimensions"] + 4 + 8)
+        else:
+            index_bytes = copies * (stats["chunks"] * 2 * 4 * stats["dimensions"] + stats["text_bytes"])
+        avoided_indexes = max(sum(consumers.values()) - 1, 0) if stats["builds"] else 0
+        return {
+            "chunks": stats["chunks"],
+            "dimensions": stats["dimensions"],
+            "embedding_tokens": stats["embedding_tokens"],
+            "index_bytes": index_bytes,
+            "consumers": consumers,
+            "avoided_indexes": avoided_indexes,
+            "saved_bytes": avoided_indexes * index_bytes,
+            "embedded_chunks": stats["embedded_chunks"],
+            "saved_embeddings": stats["saved_embeddings"]
+        }
+
+    def print_memory_report(self):
+        """Gibt den Speicherbericht aus"""
+        report = self.memory_report()
+        consumers = ", ".join(f"{name} ×{count}" for name, count in report["consumers"].items()) or "keine"
+        print(f"\nWissensindex {self.knowledge_base_path}: {report['chunks']} Chunks, "
+              f"{report['embedding_tokens']} Tokens, {report['dimensions']} Dimensionen, ca. {report['index_bytes'] / 2**20:.1f} MiB")
+        print(f"Nutzer: {consumers}; vermiedene Indizes: {report['avoided_indexes']}, "
+              f"eingespart ca. {report['saved_bytes'] / 2**20:.1f} MiB und {report['saved_embeddings']} Embeddings")
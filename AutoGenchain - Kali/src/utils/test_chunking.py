@@ -0,0 +1,109 @@
+"""
+Tests für das strukturbewusste Chunking
+"""
+
+import pytest
+
+from prompt_builder import count_tokens
+from src.utils.chunking import StructureChunker
+
+MODEL = "gpt-3.5-turbo"
+
+DOCUMENT = """# WiFi-Pentesting
+
+Einleitung zum Vorgehen.
+
+## Aufklärung
+
+Passive Erfassung der Netzwerke mit airodump-ng.
+
+- Kanal festlegen
+  - Unterpunkt zum Kanal
+- BSSID notieren
+
+## Angriffe
+
+Beispiel-Payloads:
+```bash
+aireplay-ng --deauth 10 -a AA:BB:CC:DD:EE:FF wlan0mon
+```
+
+### WPA2
+
+Handshake aufzeichnen und offline knacken.
+"""
+
+
+def tokens(text: str) -> int:
+    return count_tokens(text, MODEL)
+
+
+def test_kleines_dokument_ein_chunk():
+    chunks = StructureChunker(max_tokens=1000, model=MODEL).split(DOCUMENT, source="wifi.md")
+    assert len(chunks) == 1
+    assert chunks[0]["text"] == DOCUMENT.strip("\n")
+    assert chunks[0]["metadata"]["source"] == "wifi.md"
+    assert chunks[0]["metadata"]["chunk"] == 0
+
+
+def test_teilt_an_ueberschriften_mit_pfad():
+    chunks = StructureChunker(max_tokens=25, model=MODEL).split(DOCUMENT, source="wifi.md")
+    assert all(chunk["metadata"]["tokens"] <= 25 for chunk in chunks)
+    wpa2 = next(chunk for chunk in chunks if "Handshake" in chunk["text"])
+    assert wpa2["text"].startswith("Angriffe\n### WPA2")
+    assert wpa2["metadata"]["section_path"] == "WiFi-Pentesting > Angriffe > WPA2"
+    # Listeneinträge bleiben mit ihren Unterpunkten zusammen
+    assert any("- Kanal festlegen\n  - Unterpunkt zum Kanal" in chunk["text"] for chunk in chunks)
+
+
+def test_einleitung_bleibt_beim_codeblock():
+    chunks = StructureChunker(max_tokens=40, model=MODEL).split(DOCUMENT)
+    code = next(chunk["text"] for chunk in chunks if "aireplay-ng" in chunk["text"])
+    assert "Beispiel-Payloads:\n```bash" in code
+
+
+@pytest.mark.parametrize("max_tokens,overlap", [(30, 0), (30, 10), (80, 20)])
+def test_grosser_block_bleibt_im_budget(max_tokens, overlap):
+    text = "## Liste\n\n" + "\n".join(f"Zeile {i} mit etwas Text zum Auffüllen" for i in range(100))
+    chunks = StructureChunker(max_tokens=max_tokens, overlap_tokens=overlap, model=MODEL).split(text)
+    assert len(chunks) > 1
+    assert all(tokens(chunk["text"]) <= max_tokens for chunk in chunks)
+    covered = "\n".join(chunk["text"] for chunk in chunks)
+    assert all(f"Zeile {i} " in covered for i in range(100))
+
+
+def test_codeblock_behaelt_zaeune():
+    code = "```python\n" + "\n".join(f"print({i})  # Kommentar" for i in range(80)) + "\n```"
+    chunks = StructureChunker(max_tokens=50, model=MODEL).split(code)
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert chunk["text"].startswith("```python\n")
+        assert chunk["text"].endswith("\n```")
+        assert tokens(chunk["text"]) <= 50
+
+
+def test_ueberlange_zeile_und_ueberlanges_wort():
+    line = " ".join(f"wort{i}" for i in range(2000))
+    for text in (line, "x" * 50000, "Base64: " + "QUJD" * 5000 + " Ende"):
+        chunks = StructureChunker(max_tokens=100, model=MODEL).split(text)
+        assert all(tokens(chunk["text"]) <= 100 for chunk in chunks)
+        assert "".join(chunk["text"] for chunk in chunks).replace("\n", "").replace(" ", "") \
+            == text.replace(" ", "")
+
+
+@pytest.mark.parametrize("text", ["", "\n\n", "   \n\t\n"])
+def test_leere_datei_ergibt_keinen_chunk(text):
+    assert StructureChunker(model=MODEL).split(text) == []
+
+
+def test_nur_ueberschriften_ohne_leere_chunks():
+    chunks = StructureChunker(max_tokens=20, model=MODEL).split("# Titel\n\n## Leer\n\n## Auch leer\n")
+    assert all(chunk["text"].strip() for chunk in chunks)
+
+
+def test_parent_erweitert_geteilten_abschnitt():
+    chunks = StructureChunker(max_tokens=40, model=MODEL).split(DOCUMENT, source="wifi.md")
+    for chunk in chunks:
+        assert chunk["metadata"]["parent_id"].startswith("wifi.md#")
+        assert chunk["metadata"]["parent_tokens"] == tokens(chunk["parent"])
+        assert chunk["text"].split("\n")[-1] in chunk["parent"]
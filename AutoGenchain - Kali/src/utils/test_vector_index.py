@@ -0,0 +1,98 @@
+"""
+Tests für den kompakten Vektorindex
+"""
+
+import numpy as np
+import pytest
+
+from src.utils.vector_index import CompactVectorIndex, normalize
+
+DIMENSIONS = 32
+
+
+def clustered(count: int, clusters: int = 20, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, DIMENSIONS))
+    return (centers[rng.integers(clusters, size=count)] + 0.3 * rng.normal(size=(count, DIMENSIONS))).astype(np.float32)
+
+
+def brute_force(vectors: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    return np.argsort(-(normalize(vectors) @ normalize(query).reshape(-1)), kind="stable")[:k]
+
+
+def recall(index: CompactVectorIndex, vectors: np.ndarray, queries: np.ndarray, k: int = 10, **kwargs) -> float:
+    hits = sum(len(set(index.search(q, k=k, **kwargs)[0]) & set(brute_force(vectors, q, k))) for q in queries)
+    return hits / (k * len(queries))
+
+
+@pytest.mark.parametrize("dtype", ["int8", "float16"])
+def test_findet_gespeicherte_vektoren(tmp_path, dtype):
+    vectors = clustered(500)
+    index = CompactVectorIndex.build(str(tmp_path / "index"), vectors, dtype=dtype)
+    ids, scores = index.search(vectors[123], k=3)
+    assert ids[0] == 123
+    assert scores[0] == pytest.approx(1.0, abs=1e-5)
+    assert list(scores) == sorted(scores, reverse=True)
+
+
+@pytest.mark.parametrize("dtype,exact,minimum", [("int8", True, 0.99), ("float16", True, 0.99),
+                                                  ("int8", False, 0.9), ("float16", False, 0.97)])
+def test_recall_ohne_ivf(tmp_path, dtype, exact, minimum):
+    vectors, queries = clustered(2000), clustered(30, seed=1)
+    index = CompactVectorIndex.build(str(tmp_path / "index"), vectors, dtype=dtype, nlist=0, exact=exact)
+    assert (index.exact is not None) == exact
+    assert recall(index, vectors, queries) >= minimum
+
+
+def test_ivf_recall_steigt_mit_nprobe(tmp_path):
+    vectors, queries = clustered(4000), clustered(30, seed=1)
+    index = CompactVectorIndex.build(str(tmp_path / "index"), vectors, nlist=32)
+    assert index.meta["nlist"] == 32
+    assert index.offsets[-1] == len(vectors)
+    assert sorted(index.ids) == list(range(len(vectors)))
+    low = recall(index, vectors, queries, nprobe=1)
+    high = recall(index, vectors, queries, nprobe=32)
+    assert high >= low
+    assert high == pytest.approx(recall(CompactVectorIndex.build(str(tmp_path / "flat"), vectors, nlist=0),
+                                        vectors, queries))
+
+
+def test_kleine_indizes_ohne_ivf(tmp_path):
+    index = CompactVectorIndex.build(str(tmp_path / "index"), clustered(100))
+    assert index.meta["nlist"] == 0
+    assert index.centroids is None
+
+
+def test_blockweise_suche_und_memmap_eingabe(tmp_path, monkeypatch):
+    monkeypatch.setattr("src.utils.vector_index._BLOCK_ROWS", 64)
+    vectors = clustered(1000)
+    np.save(tmp_path / "vectors.npy", vectors)
+    source = np.load(tmp_path / "vectors.npy", mmap_mode="r")
+    index = CompactVectorIndex.build(str(tmp_path / "index"), source, dtype="float16")
+    queries = clustered(10, seed=2)
+    for query in queries:
+        assert list(index.search(query, k=5)[0]) == list(brute_force(vectors, query, 5))
+
+
+def test_wiederoeffnen_und_meta(tmp_path):
+    path = str(tmp_path / "index")
+    vectors = clustered(300)
+    CompactVectorIndex.build(path, vectors, dtype="int8", fingerprint="abc")
+    index = CompactVectorIndex(path)
+    assert (index.count, index.dimensions, index.dtype) == (300, DIMENSIONS, "int8")
+    assert index.meta["fingerprint"] == "abc"
+    assert index.codes.dtype == np.int8
+    # int8 mit Skala: etwa ein Viertel der float32-Größe
+    assert index.codes.nbytes + index.scales.nbytes < vectors.nbytes / 3
+    assert index.disk_bytes() > 0
+
+
+def test_ungueltige_eingaben(tmp_path):
+    with pytest.raises(ValueError):
+        CompactVectorIndex.build(str(tmp_path / "a"), clustered(10), dtype="float32")
+    with pytest.raises(ValueError):
+        CompactVectorIndex.build(str(tmp_path / "b"), np.empty((0, DIMENSIONS), dtype=np.float32))
+    CompactVectorIndex.build(str(tmp_path / "c"), clustered(10))
+    (tmp_path / "c" / "meta.json").write_text('{"format": 99}', encoding="utf-8")
+    with pytest.raises(ValueError):
+        CompactVectorIndex(str(tmp_path / "c"))
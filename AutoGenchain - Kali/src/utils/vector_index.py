@@ -0,0 +1,249 @@
+"""
+Kompakter Vektorindex auf der Festplatte mit quantisierten Embeddings
+"""
+
+import json
+import math
+import mmap
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+FORMAT_VERSION = 1
+
+# Zeilen pro Block bei Aufbau und Suche (begrenzt den temporären float32-Speicher)
+_BLOCK_ROWS = 16384
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normiert die Zeilen (Skalarprodukt = Kosinus-Ähnlichkeit)"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Ordnet jede Zeile dem ähnlichsten Zentroid zu"""
+    assignment = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), _BLOCK_ROWS):
+        block = normalize(vectors[start:start + _BLOCK_ROWS])
+        assignment[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assignment
+
+
+def _kmeans(sample: np.ndarray, nlist: int, iterations: int = 8, seed: int = 0) -> np.ndarray:
+    """Sphärisches k-Means auf einer Stichprobe (die Zentroide sind L2-normiert)"""
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = _assign(sample, centroids)
+        order = np.argsort(assignment, kind="stable")
+        counts = np.bincount(assignment, minlength=nlist)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        filled = counts > 0
+        sums = np.add.reduceat(sample[order], starts[filled], axis=0)
+        centroids[filled] = normalize(sums)
+        # Leere Listen mit zufälligen Punkten neu belegen
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            centroids[empty] = sample[rng.choice(len(sample), len(empty), replace=False)]
+    return centroids
+
+
+class CompactVectorIndex:
+    """
+    Vektorindex als NumPy-Memmap mit int8- oder float16-quantisierten Vektoren
+
+    Ein Index ist ein Verzeichnis mit .npy-Dateien, die read-only per Memmap
+    geöffnet werden. Mehrere Worker-Prozesse, die denselben Index öffnen, teilen
+    sich die Seiten über den Page-Cache des Betriebssystems; im Prozess selbst
+    liegen nur die Zentroide und die Puffer einer Suche.
+
+    - codes.npy: quantisierte Vektoren (int8 mit einer Skala pro Zeile in
+      scales.npy, oder float16)
+    - exact.npy: die normierten float32-Vektoren, aus denen nur die Kandidaten
+      für das exakte Re-Ranking gelesen werden (optional)
+    - ids.npy: die ursprüngliche Zeilennummer jeder gespeicherten Zeile
+    - centroids.npy, offsets.npy: invertierte Listen (IVF); die Zeilen jeder
+      Liste liegen zusammenhängend, damit eine Suche nur nprobe Bereiche liest
+
+    Ohne IVF (nlist=0) durchsucht eine Suche alle Zeilen blockweise per
+    Brute-Force. In beiden Fällen werden die besten `rerank` Kandidaten mit den
+    exakten Vektoren neu bewertet.
+    """
+
+    def __init__(self, path: str):
+        """
+        Öffnet einen mit build() erstellten Index read-only
+
+        Args:
+            path: Verzeichnis des Index
+
+        Raises:
+            ValueError: Wenn das Verzeichnis keinen Index in diesem Format enthält
+        """
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unbekanntes Indexformat in {path}: {self.meta.get('format')}")
+        self.path = path
+        self.count = self.meta["count"]
+        self.dimensions = self.meta["dimensions"]
+        self.dtype = self.meta["dtype"]
+        self.codes = self._load("codes.npy")
+        self.scales = self._load("scales.npy") if self.dtype == "int8" else None
+        self.exact = self._load("exact.npy") if self.meta["exact"] else None
+        if self.exact is not None and hasattr(mmap, "MADV_RANDOM"):
+            # Beim Re-Ranking werden einzelne Zeilen gelesen: kein Readahead der Nachbarseiten
+            self.exact._mmap.madvise(mmap.MADV_RANDOM)
+        self.ids = self._load("ids.npy")
+        self.centroids = np.load(os.path.join(path, "centroids.npy")) if self.meta["nlist"] else None
+        self.offsets = np.load(os.path.join(path, "offsets.npy")) if self.meta["nlist"] else None
+
+    def _load(self, name: str) -> np.ndarray:
+        return np.load(os.path.join(self.path, name), mmap_mode="r")
+
+    @classmethod
+    def build(cls,
+              path: str,
+              vectors: np.ndarray,
+              dtype: str = "int8",
+              nlist: Optional[int] = None,
+              exact: bool = True,
+              seed: int = 0,
+              **meta) -> "CompactVectorIndex":
+        """
+        Schreibt einen Index und öffnet ihn
+
+        Die Vektoren werden blockweise verarbeitet und dürfen selbst ein Memmap sein.
+
+        Args:
+            path: Verzeichnis des Index (wird angelegt)
+            vectors: Matrix (Anzahl × Dimension) der Embeddings
+            dtype: "int8" (ein Byte pro Wert) oder "float16"
+            nlist: Anzahl der IVF-Listen (0 für Brute-Force, None für √Anzahl ab 50.000 Vektoren)
+            exact: Ob die float32-Vektoren für das Re-Ranking gespeichert werden
+            seed: Startwert für das k-Means
+            **meta: Weitere Angaben für meta.json (z.B. ein Fingerabdruck der Quellen)
+
+        Returns:
+            Der geöffnete Index
+
+        Raises:
+            ValueError: Bei unbekanntem dtype oder leerer Matrix
+        """
+        if dtype not in ("int8", "float16"):
+            raise ValueError(f"Nicht unterstützter dtype: {dtype}")
+        count, dimensions = vectors.shape
+        if not count:
+            raise ValueError("Ein Index braucht mindestens einen Vektor")
+        if nlist is None:
+            nlist = int(math.sqrt(count)) if count >= 50000 else 0
+        nlist = min(nlist, count)
+        os.makedirs(path, exist_ok=True)
+
+        order = np.arange(count)
+        if nlist:
+            rng = np.random.default_rng(seed)
+            sample_rows = np.sort(rng.choice(count, min(count, nlist * 32), replace=False))
+            centroids = _kmeans(normalize(vectors[sample_rows]), nlist, seed=seed)
+            assignment = _assign(vectors, centroids)
+            order = np.argsort(assignment, kind="stable")
+            offsets = np.concatenate(([0], np.cumsum(np.bincount(assignment, minlength=nlist))))
+            np.save(os.path.join(path, "centroids.npy"), centroids.astype(np.float32))
+            np.save(os.path.join(path, "offsets.npy"), offsets.astype(np.int64))
+        np.save(os.path.join(path, "ids.npy"), order.astype(np.int64))
+
+        codes = np.lib.format.open_memmap(os.path.join(path, "codes.npy"), mode="w+",
+                                          dtype=np.dtype(dtype), shape=(count, dimensions))
+        scales = np.lib.format.open_memmap(os.path.join(path, "scales.npy"), mode="w+",
+                                           dtype=np.float32, shape=(count,)) if dtype == "int8" else None
+        exact_vectors = np.lib.format.open_memmap(os.path.join(path, "exact.npy"), mode="w+",
+                                                  dtype=np.float32, shape=(count, dimensions)) if exact else None
+        for start in range(0, count, _BLOCK_ROWS):
+            rows = order[start:start + _BLOCK_ROWS]
+            if nlist:
+                block = normalize(vectors[rows])
+            else:
+                # Ohne IVF bleibt die Reihenfolge erhalten: zusammenhängend lesen
+                block = normalize(vectors[start:start + len(rows)])
+            stop = start + len(block)
+            if dtype == "int8":
+                scale = np.maximum(np.abs(block).max(axis=1), 1e-12) / 127
+                codes[start:stop] = np.round(block / scale[:, None]).astype(np.int8)
+                scales[start:stop] = scale
+            else:
+                codes[start:stop] = block.astype(np.float16)
+            if exact_vectors is not None:
+                exact_vectors[start:stop] = block
+        for array in (codes, scales, exact_vectors):
+            if array is not None:
+                array.flush()
+        del codes, scales, exact_vectors
+
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({**meta, "format": FORMAT_VERSION, "count": count, "dimensions": dimensions,
+                       "dtype": dtype, "nlist": nlist, "exact": exact}, f, indent=2)
+        return cls(path)
+
+    def _ranges(self, query: np.ndarray, nprobe: Optional[int]) -> List[Tuple[int, int]]:
+        """Die zu durchsuchenden Zeilenbereiche (alle oder die nprobe nächsten Listen)"""
+        if self.centroids is None:
+            return [(0, self.count)]
+        nprobe = min(nprobe or max(1, len(self.centroids) // 16), len(self.centroids))
+        lists = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        return [(int(self.offsets[i]), int(self.offsets[i + 1])) for i in np.sort(lists)]
+
+    def search(self,
+               query: np.ndarray,
+               k: int = 5,
+               nprobe: Optional[int] = None,
+               rerank: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Sucht die ähnlichsten Vektoren zu einer Anfrage
+
+        Args:
+            query: Der Anfragevektor
+            k: Anzahl der Ergebnisse
+            nprobe: Anzahl der durchsuchten IVF-Listen (Standard: nlist / 16)
+            rerank: Anzahl der Kandidaten aus den quantisierten Vektoren, die exakt
+                neu bewertet werden (Standard: 8 × k)
+
+        Returns:
+            (ursprüngliche Zeilennummern, Kosinus-Ähnlichkeiten), absteigend sortiert
+        """
+        query = normalize(query).reshape(-1)
+        candidates = max(k, rerank or 8 * k)
+        positions, scores = [], []
+        for start, stop in self._ranges(query, nprobe):
+            for block_start in range(start, stop, _BLOCK_ROWS):
+                block_stop = min(block_start + _BLOCK_ROWS, stop)
+                block_scores = self.codes[block_start:block_stop].astype(np.float32) @ query
+                if self.scales is not None:
+                    block_scores *= self.scales[block_start:block_stop]
+                if len(block_scores) > candidates:
+                    best = np.argpartition(-block_scores, candidates - 1)[:candidates]
+                    block_scores = block_scores[best]
+                    best += block_start
+                else:
+                    best = np.arange(block_start, block_stop)
+                positions.append(best)
+                scores.append(block_scores)
+        if not positions:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        positions, scores = np.concatenate(positions), np.concatenate(scores)
+        if len(scores) > candidates:
+            best = np.argpartition(-scores, candidates - 1)[:candidates]
+            positions, scores = positions[best], scores[best]
+        if self.exact is not None:
+            # Exaktes Re-Ranking: nur die Seiten der Kandidaten werden gelesen
+            positions = np.sort(positions)
+            scores = self.exact[positions] @ query
+        top = np.argsort(-scores, kind="stable")[:k]
+        return np.asarray(self.ids[positions[top]]), scores[top]
+
+    def disk_bytes(self) -> int:
+        """Größe aller Dateien des Index"""
+        return sum(os.path.getsize(os.path.join(self.path, name)) for name in os.listdir(self.path))
@@ -0,0 +1,175 @@
+"""
+Pool vorgewärmter Agenten-Teams für parallele Gruppenchat-Sitzungen
+"""
+
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional
+
+from autogen_agents import BugBountyAgents
+
+
+def deep_size(obj: Any, seen: Optional[set] = None) -> int:
+    """
+    Schätzt den Speicherbedarf eines Objekts einschließlich seiner Inhalte
+
+    Args:
+        obj: Das zu messende Objekt (Listen, Wörterbücher und Strings)
+        seen: Bereits gezählte Objekte
+
+    Returns:
+        Die Größe in Bytes
+    """
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_size(item, seen) for item in obj)
+    return size
+
+
+class AgentTeamPool:
+    """
+    Führt mehrere Aufgaben parallel mit einem einmal erstellten Agenten-Team aus
+
+    Agenten, LLM-Clients und Systemnachrichten werden nur einmal erstellt. Jede
+    Sitzung erhält einen eigenen GroupChat, Manager und Proxy-Agenten; der
+    Gesprächszustand der geteilten Agenten ist nach dem Manager der Sitzung getrennt
+    und wird nach der Sitzung wieder entfernt.
+    """
+
+    def __init__(self,
+                team: Optional[BugBountyAgents] = None,
+                max_concurrency: int = 4,
+                **team_kwargs):
+        """
+        Initialisiert den Pool
+
+        Args:
+            team: Ein vorhandenes Agenten-Team; sonst wird eines erstellt
+            max_concurrency: Maximale Anzahl gleichzeitig laufender Sitzungen
+            team_kwargs: Argumente für BugBountyAgents, falls kein Team übergeben wird
+        """
+        self.team = team or BugBountyAgents(**team_kwargs)
+        self.max_concurrency = max_concurrency
+        self._slots = threading.Semaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self.active_sessions: Dict[str, Dict[str, Any]] = {}
+        self.completed: List[Dict[str, Any]] = []
+
+    @contextmanager
+    def session(self):
+        """
+        Stellt eine isolierte Sitzung bereit, sobald ein Platz im Pool frei ist
+
+        Yields:
+            Ein Tupel aus Sitzungs-ID und Sitzung (siehe BugBountyAgents.create_session)
+        """
+        with self._slots:
+            session_id = uuid.uuid4().hex[:8]
+            session = self.team.create_session()
+            with self._lock:
+                self.active_sessions[session_id] = session
+            try:
+                yield session_id, session
+            finally:
+                with self._lock:
+                    self.active_sessions.pop(session_id, None)
+                self.team.close_session(session)
+
+    def session_memory(self, session: Dict[str, Any]) -> int:
+        """
+        Berechnet den Speicherbedarf des Gesprächszustands einer Sitzung
+
+        Args:
+            session: Die Sitzung
+
+        Returns:
+            Die Größe in Bytes
+        """
+        manager = session["manager"]
+        seen: set = set()
+        size = deep_size(session["group_chat"].messages, seen)
+        for agent in session["group_chat"].agents:
+            size += deep_size(agent._oai_messages.get(manager, []), seen)
+        size += deep_size(dict(manager._oai_messages), seen)
+        return size
+
+    def run(self, task: str) -> Dict[str, Any]:
+        """
+        Bearbeitet eine Aufgabe in einer eigenen Sitzung
+
+        Args:
+            task: Die Aufgabe für das Team
+
+        Returns:
+            Ein Wörterbuch mit Sitzungs-ID, Nachrichten, Laufzeit, Speicherbedarf und Ergebnis
+        """
+        with self.session() as (session_id, session):
+            start = time.perf_counter()
+            messages = self.team.run_session(session, task)
+            result = {
+                "session_id": session_id,
+                "task": task,
+                "messages": list(messages),
+                "seconds": time.perf_counter() - start,
+                "memory_bytes": self.session_memory(session),
+                "final_plan": next((m["content"] for m in reversed(messages) if m.get("content")), "")
+            }
+        with self._lock:
+            self.completed.append(result)
+        return result
+
+    def map(self, tasks: Iterable[str]) -> List[Dict[str, Any]]:
+        """
+        Bearbeitet mehrere Aufgaben parallel
+
+        Args:
+            tasks: Die Aufgaben
+
+        Returns:
+            Die Ergebnisse in der Reihenfolge der Aufgaben
+        """
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            return list(executor.map(self.run, tasks))
+
+    def memory_report(self) -> Dict[str, Any]:
+        """
+        Fasst den Speicherbedarf der aktiven und abgeschlossenen Sitzungen zusammen
+
+        Returns:
+            Ein Wörterbuch mit Bytes pro aktiver Sitzung und Durchschnitt der abgeschlossenen
+        """
+        with self._lock:
+            active = dict(self.active_sessions)
+            completed = [r["memory_bytes"] for r in self.completed]
+        return {
+            "active": {session_id: self.session_memory(s) for session_id, s in active.items()},
+            "completed_sessions": len(completed),
+            "average_completed_bytes": sum(completed) / len(completed) if completed else 0
+        }
+
+
+if __name__ == "__main__":
+    # Beispiel für die Verwendung
+    pool = AgentTeamPool(max_concurrency=3)
+
+    tasks = [
+        "Erstelle einen Plan für die Aufklärung von example.com",
+        "Bewerte die Angriffsfläche einer öffentlichen REST-API",
+        "Plane die Überprüfung eines Login-Formulars auf SQL-Injection"
+    ]
+
+    for result in pool.map(tasks):
+        print(f"[{result['session_id']}] {result['task']}: {len(result['messages'])} Nachrichten, "
+              f"{result['seconds']:.1f}s, {result['memory_bytes'] / 1024:.1f} KiB")
+
+    print(pool.memory_report())
@@ -0,0 +1,179 @@
+"""
+Lokale Erkennung des Gesprächsendes für die AutoGen-Agenten
+"""
+
+import hashlib
+import json
+import math
+import re
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Union
+
+# Formulierungen, mit denen Agenten eine erledigte Aufgabe signalisieren
+COMPLETION_MARKERS = [
+    r"\bTERMINATE\b",
+    r"\b(die )?aufgabe (ist )?(jetzt )?(erledigt|abgeschlossen)\b",
+    r"\b(der )?aktionsplan (ist )?(jetzt )?(fertig|vollständig|abgeschlossen)\b",
+    r"\b(the )?task (is )?(now )?(complete|completed|done|finished)\b",
+]
+
+# Rückfragen, die Agenten auch mitten in der Diskussion stellen: beenden nur in der
+# letzten Zeile einer Nachricht, die eine Zusammenfassung enthält
+FOLLOW_UP_MARKERS = [
+    r"\bgibt es noch (etwas|weitere fragen)\b",
+    r"\bis there anything else (i can|you need)",
+]
+
+SUMMARY_MARKERS = [
+    r"\b(zusammenfassung|zusammenfassend|fazit|abschließend)\b",
+    r"\b(endgültige[rn]?|finale[rn]?|vollständige[rn]?) (plan|strategie|bericht|aktionsplan)\b",
+    r"\b(in summary|to summarize|final (plan|report))\b",
+]
+
+
+def trigram_embedding(text: str, dim: int = 256) -> List[float]:
+    """
+    Kleines lokales Embedding aus gehashten Zeichen-Trigrammen
+
+    Args:
+        text: Der einzubettende Text
+        dim: Anzahl der Dimensionen
+
+    Returns:
+        Der Vektor des Textes
+    """
+    text = " ".join(re.findall(r"\w+", text.lower()))
+    vector = [0.0] * dim
+    for i in range(len(text) - 2):
+        bucket = int(hashlib.md5(text[i:i + 3].encode()).hexdigest()[:8], 16) % dim
+        vector[bucket] += 1.0
+    return vector
+
+
+def cosine_similarity(a: List[float], b: List[float]) -> float:
+    """Kosinus-Ähnlichkeit zweier Vektoren"""
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class TerminationDetector:
+    """
+    Ersatz für die is_termination_msg-Lambdas, der nicht nur auf "TERMINATE" achtet
+
+    Beendet das Gespräch auch bei Abschlussformulierungen, bei Rückfragen wie
+    "Gibt es noch weitere Fragen?" am Ende einer zusammenfassenden Nachricht, bei
+    Antworten, die eine der letzten Nachrichten (fast) wörtlich wiederholen, bei
+    mehreren leeren Antworten in Folge und bei Tool-Schleifen (dieselben
+    Tool-Aufrufe mit denselben Argumenten immer wieder). Jeder prüfende Agent
+    braucht eine eigene Instanz, da sich der Detektor die gesehenen Nachrichten
+    merkt. Jedes Ende steht mit Nachricht, Detektor und Grund in `events`.
+    """
+
+    def __init__(self,
+                markers: Optional[List[str]] = None,
+                follow_up_markers: Optional[List[str]] = None,
+                summary_markers: Optional[List[str]] = None,
+                similarity_threshold: float = 0.92,
+                window: int = 4,
+                max_empty: int = 2,
+                max_tool_repeats: int = 3,
+                embed: Optional[Callable[[str], List[float]]] = None):
+        """
+        Initialisiert den Detektor
+
+        Args:
+            markers: Reguläre Ausdrücke für Abschlussformulierungen
+            follow_up_markers: Reguläre Ausdrücke für Rückfragen (nur in der letzten Zeile)
+            summary_markers: Reguläre Ausdrücke, von denen einer zu einer Rückfrage passen muss
+            similarity_threshold: Ab dieser Ähnlichkeit gilt eine Antwort als Wiederholung
+            window: Anzahl der letzten Nachrichten, mit denen verglichen wird
+            max_empty: Anzahl leerer Antworten in Folge, nach der beendet wird
+            max_tool_repeats: Wie oft dieselben Tool-Aufrufe vorkommen dürfen, bevor beendet wird
+            embed: Optionale Embedding-Funktion statt der Trigramm-Embeddings
+        """
+        self.patterns = [re.compile(m, re.IGNORECASE) for m in markers or COMPLETION_MARKERS]
+        self.follow_up_patterns = [re.compile(m, re.IGNORECASE) for m in follow_up_markers or FOLLOW_UP_MARKERS]
+        self.summary_patterns = [re.compile(m, re.IGNORECASE) for m in summary_markers or SUMMARY_MARKERS]
+        self.similarity_threshold = similarity_threshold
+        self.window = window
+        self.max_empty = max_empty
+        self.max_tool_repeats = max_tool_repeats
+        self.embed = embed or trigram_embedding
+        self.events: List[Dict[str, Any]] = []
+        self._embeddings: List[List[float]] = []
+        self._empty = 0
+        self._seen = 0
+        self._tool_calls: Counter = Counter()
+
+    def __call__(self, message: Union[Dict, str]) -> bool:
+        """
+        Prüft, ob das Gespräch mit dieser Nachricht beendet werden soll
+
+        Args:
+            message: Die empfangene Nachricht
+
+        Returns:
+            True, wenn das Gespräch beendet werden soll
+        """
+        self._seen += 1
+        stop = self._check(message)
+        if stop:
+            detector, reason = stop
+            self.events.append({"message": self._seen, "detector": detector, "reason": reason})
+            return True
+        return False
+
+    def _check(self, message: Union[Dict, str]):
+        """Gibt (Detektor, Grund) zurück, wenn das Gespräch enden soll, sonst None"""
+        if isinstance(message, dict):
+            content = (message.get("content") or "").strip()
+            calls = [call.get("function", {}) for call in message.get("tool_calls") or []]
+            if message.get("function_call"):
+                calls.append(message["function_call"])
+            if calls:
+                # Eine Nachricht mit Tool-Aufrufen ist nicht fertig, was auch immer sie sagt
+                self._empty = 0
+                signature = json.dumps(sorted((str(c.get("name")), str(c.get("arguments"))) for c in calls))
+                self._tool_calls[signature] += 1
+                if self._tool_calls[signature] >= self.max_tool_repeats:
+                    return "tool_loop", f"dieselben Tool-Aufrufe {self._tool_calls[signature]}-mal"
+                return None
+        else:
+            content = (message or "").strip()
+
+        if not content:
+            self._empty += 1
+            if self._empty >= self.max_empty:
+                return "empty", f"{self._empty} leere Antworten in Folge"
+            return None
+        self._empty = 0
+
+        for pattern in self.patterns:
+            match = pattern.search(content)
+            if match:
+                return "completion_marker", f"Abschlussformulierung '{match.group(0)}'"
+        last_line = content.splitlines()[-1]
+        if any(pattern.search(content) for pattern in self.summary_patterns):
+            for pattern in self.follow_up_patterns:
+                match = pattern.search(last_line)
+                if match:
+                    return "follow_up", f"Rückfrage '{match.group(0)}' nach einer Zusammenfassung"
+
+        embedding = self.embed(content)
+        similarity = max(
+            (cosine_similarity(embedding, e) for e in self._embeddings[-self.window:]),
+            default=0.0
+        )
+        self._embeddings.append(embedding)
+        if similarity >= self.similarity_threshold:
+            return "repetition", f"Wiederholung einer früheren Antwort (Ähnlichkeit {similarity:.2f})"
+        return None
+
+    def reset(self):
+        """Setzt den Detektor für ein neues Gespräch zurück"""
+        self.events.clear()
+        self._embeddings.clear()
+        self._empty = 0
+        self._seen = 0
+        self._tool_calls.clear()
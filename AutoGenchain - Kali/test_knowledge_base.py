@@ -4,13 +4,11 @@ Test der Wissensdatenbank-Integration für den Langchain-Agenten
 
 import os
 from dotenv import load_dotenv
-from langchain.document_loaders import DirectoryLoader, TextLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.embeddings import OpenAIEmbeddings
-from langchain.vectorstores import Chroma
 from langchain.chains import RetrievalQA
 from langchain.chat_models import ChatOpenAI
 
+from src.utils.knowledge_utils import DEFAULT_KNOWLEDGE_BASE_PATH, get_knowledge_service
+
 # Lade Umgebungsvariablen
 load_dotenv()
 
@@ -21,31 +19,28 @@ if not os.getenv("OPENAI_API_KEY"):
     exit(1)
 
 def initialize_vector_store(knowledge_base_path):
-    """Initialisiert den Vector Store mit der Wissensdatenbank"""
+    """Gibt den gemeinsamen Vector Store der Wissensdatenbank zurück"""
     print(f"Initialisiere Vector Store mit Dokumenten aus: {knowledge_base_path}")
     
-    # Lade Dokumente aus dem Wissensdatenbank-Verzeichnis
-    loader = DirectoryLoader(knowledge_base_path, glob="**/*.txt", loader_cls=TextLoader)
-    documents = loader.load()
-    
-    print(f"Anzahl der geladenen Dokumente: {len(documents)}")
-    for doc in documents:
-        print(f"- {os.path.basename(doc.metadata['source'])}")
+    # Derselbe Index wie für die Agenten im selben Prozess (wird nur einmal aufgebaut)
+    knowledge = get_knowledge_service(knowledge_base_path, consumer="test_knowledge_base")
+    vector_store = knowledge.vectorstore
     
-    # Teile Dokumente in kleinere Chunks
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    texts = text_splitter.split_documents(documents)
-    print(f"Dokumente in {len(texts)} Chunks aufgeteilt")
+    if vector_store is None:
+        print("FEHLER: Der Vector Store konnte nicht erstellt werden.")
+        exit(1)
     
-    # Erstelle Embeddings und Vector Store
-    embeddings = OpenAIEmbeddings()
-    vector_store = Chroma.from_documents(texts, embeddings)
+    metadatas = vector_store.get(include=["metadatas"])["metadatas"]
+    sources = sorted({os.path.basename(metadata["source"]) for metadata in metadatas})
+    print(f"Anzahl der geladenen Dokumente: {len(sources)}")
+    for source in sources:
+        print(f"- {source}")
     print("Vector Store erfolgreich erstellt")
     
     return vector_store
 
-def test_query(vector_store, query):
-    """Testet eine Abfrage gegen den Vector Store"""
+def test_query(vector_store, query, llm=None):
+    """Testet eine Abfrage gegen den Vector Store (llm wird über alle Abfragen wiederverwendet)"""
     print(f"\n--- Teste Abfrage: '{query}' ---")
     
     # Erstelle einen Retriever aus dem Vector Store
@@ -63,7 +58,7 @@ def test_query(vector_store, query):
         print(f"Inhalt: {doc.page_content[:300]}...")
     
     # Erstelle einen QA-Chain mit dem Retriever und einem LLM
-    llm = ChatOpenAI(temperature=0.2, model="gpt-3.5-turbo")
+    llm = llm or ChatOpenAI(temperature=0.2, model="gpt-3.5-turbo")
     qa_chain = RetrievalQA.from_chain_type(
         llm=llm,
         chain_type="stuff",
@@ -80,13 +75,15 @@ def test_query(vector_store, query):
 
 def main():
     """Hauptfunktion"""
-    knowledge_base_path = "./bugbounty-agents/knowledge_base"
+    knowledge_base_path = DEFAULT_KNOWLEDGE_BASE_PATH
     
     print("=== Test der Bug-Bounty-Wissensdatenbank ===\n")
     
     # Initialisiere den Vector Store
     vector_store = initialize_vector_store(knowledge_base_path)
+    llm = ChatOpenAI(temperature=0.2, model="gpt-3.5-turbo")
     
+    # Recall, MRR und Latenzen misst benchmarks/bench_retrieval.py (offline)
     # Teste verschiedene Abfragen
     test_queries = [
         "Was sind die OWASP Top 10 und welche Schwachstellen gehören dazu?",
@@ -98,9 +95,11 @@ def main():
     ]
     
     for query in test_queries:
-        test_query(vector_store, query)
+        test_query(vector_store, query, llm)
         print("\n" + "="*50 + "\n")
     
+    get_knowledge_service(knowledge_base_path).print_memory_report()
+    
     # Interaktiver Modus für benutzerdefinierte Abfragen
     print("\n=== Interaktiver Modus ===")
     print("Geben Sie Ihre Fragen ein (oder 'exit' zum Beenden):")
@@ -110,7 +109,7 @@ def main():
         if user_query.lower() in ['exit', 'quit', 'q']:
             break
         
-        test_query(vector_store, user_query)
+        test_query(vector_store, user_query, llm)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,53 @@
+"""
+Tests für die Fortschrittsüberwachung des Gruppenchats
+"""
+
+import pytest
+
+from progress_monitor import MinHash, ProgressMonitor
+
+TEXT = "Für example.com wurden 12 Subdomains gefunden, darunter api, dev und staging."
+
+
+def test_minhash_aehnlichkeit():
+    minhash = MinHash()
+    assert MinHash.similarity(minhash.signature(TEXT), minhash.signature(TEXT)) == 1.0
+    assert MinHash.similarity(minhash.signature(TEXT),
+                              minhash.signature("Die API prüft redirect_uri nicht streng.")) < 0.2
+
+
+def test_stop_nach_wiederholungen():
+    monitor = ProgressMonitor(patience=2)
+    assert monitor.observe({"content": TEXT}, "Recon") == 1.0
+    monitor.observe({"content": TEXT}, "TeamLead")
+    assert not monitor.is_termination_msg({"content": TEXT})
+    monitor.observe({"content": TEXT}, "Recon")
+    assert monitor.is_termination_msg({"content": TEXT})
+    assert monitor.events == [{"round": 3, "speaker": "Recon", "novelty": 0.0, "action": "stop"}]
+
+
+def test_redirect_vor_stop():
+    events = []
+    monitor = ProgressMonitor(patience=1, action="redirect", on_event=events.append)
+    monitor.observe({"content": TEXT}, "Recon")
+    monitor.observe({"content": TEXT}, "Recon")
+    assert not monitor.is_termination_msg({"content": TEXT})
+    monitor.observe({"content": TEXT}, "Recon")
+    assert monitor.is_termination_msg({"content": TEXT})
+    assert [event["action"] for event in events] == ["redirect", "stop"]
+    monitor.reset()
+    assert not monitor.is_termination_msg({"content": TEXT})
+    assert monitor.rounds == []
+
+
+def test_tool_aufrufe_zaehlen_als_inhalt():
+    monitor = ProgressMonitor()
+    call = {"content": None, "tool_calls": [{"function": {"name": "search_recon_knowledge",
+                                                          "arguments": '{"query": "dns"}'}}]}
+    monitor.observe(call, "Recon")
+    assert monitor.observe(call, "Recon") == 0.0
+
+
+def test_unbekannte_aktion():
+    with pytest.raises(ValueError):
+        ProgressMonitor(action="ignore")
@@ -0,0 +1,90 @@
+"""
+Tests für das Tokenbudget des PromptBuilder
+"""
+
+import pytest
+
+from prompt_builder import TRUNCATION_MARK, PromptBuilder, count_tokens
+
+MODEL = "gpt-4o-mini"
+
+
+def words(n: int, word: str = "wort") -> str:
+    return " ".join(f"{word}{i}" for i in range(n))
+
+
+def builder(**kwargs) -> PromptBuilder:
+    return PromptBuilder(model=MODEL, verbose=False, **kwargs)
+
+
+def test_alles_passt_unveraendert():
+    fitted = builder().add("a", "kurz").add("b", "auch kurz").fit(1000)
+    assert fitted == {"a": "kurz", "b": "auch kurz"}
+
+
+def test_keep_wird_nie_gekuerzt():
+    text = words(400)
+    fitted = builder().add("fest", text, strategy="keep").add("rest", words(50), min_tokens=10).fit(100)
+    assert fitted["fest"] == text
+    assert fitted["rest"] == ""
+
+
+def test_prioritaet_und_reservierte_mindestgroesse():
+    pb = builder()
+    pb.add("niedrig", words(300), priority=0, min_tokens=40)
+    pb.add("hoch", words(300), priority=10, min_tokens=40)
+    fitted = pb.fit(300)
+    hoch, niedrig = count_tokens(fitted["hoch"], MODEL), count_tokens(fitted["niedrig"], MODEL)
+    assert hoch > niedrig >= 40
+    assert hoch + niedrig <= 300
+
+
+def test_abschnitt_unter_min_tokens_entfaellt():
+    fitted = builder().add("a", words(200), min_tokens=100).fit(60)
+    assert fitted["a"] == ""
+
+
+@pytest.mark.parametrize("strategy", ["head", "tail", "middle"])
+def test_kuerzungsstrategien(strategy):
+    text = words(400)
+    fitted = builder().add("a", text, strategy=strategy, min_tokens=10).fit(100)["a"]
+    assert count_tokens(fitted, MODEL) <= 100
+    assert TRUNCATION_MARK.strip() in fitted
+    if strategy in ("head", "middle"):
+        assert fitted.startswith("wort0 ")
+    if strategy in ("tail", "middle"):
+        assert fitted.endswith("wort399")
+
+
+def test_summarize_verwendet_summarizer_und_budget():
+    calls = []
+
+    def summarizer(text, max_tokens):
+        calls.append(max_tokens)
+        return words(1000, "zusammenfassung")
+
+    pb = builder(summarizer=summarizer)
+    fitted = pb.add("a", words(500), strategy="summarize", min_tokens=10).fit(80)
+    assert calls == [80]
+    assert count_tokens(fitted["a"], MODEL) <= 80
+
+
+def test_report_vorher_nachher():
+    pb = builder().add("a", words(400), min_tokens=10).add("b", "kurz")
+    pb.fit(120)
+    report = {entry["section"]: entry for entry in pb.report}
+    assert report["a"]["before"] == count_tokens(words(400), MODEL)
+    assert report["a"]["after"] < report["a"]["before"]
+    assert report["b"]["before"] == report["b"]["after"]
+
+
+def test_unbekannte_strategie():
+    with pytest.raises(ValueError):
+        builder().add("a", "text", strategy="drop")
+
+
+def test_render_haelt_budget_ein():
+    pb = builder(budget=200).add("kontext", words(1000), min_tokens=10).add("frage", "Welche Ports?", strategy="keep")
+    prompt = pb.render("Frage: {frage}\nKontext:\n{kontext}")
+    assert prompt.startswith("Frage: Welche Ports?")
+    assert count_tokens(prompt, MODEL) <= 200
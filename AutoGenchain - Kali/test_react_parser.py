@@ -0,0 +1,111 @@
+"""
+Tests für den ReAct-Scanner und die Parser-Statistik
+"""
+
+import pytest
+
+from react_parser import ParserStats, ReActScanner
+
+TOOLS = ["NmapScan", "WebSearch"]
+
+
+def scan(text: str) -> ReActScanner:
+    return ReActScanner(TOOLS).feed(text).finish()
+
+
+def test_exaktes_format():
+    scanner = scan("Thought: Ports prüfen\nAction: NmapScan\nAction Input: 10.0.0.1\n")
+    assert scanner.tool() == "NmapScan"
+    assert scanner.tool_input() == "10.0.0.1"
+    assert scanner.exact and scanner.action_first and scanner.action_ready
+
+
+@pytest.mark.parametrize("text", [
+    "**Action:** NmapScan\n**Action Input:** 10.0.0.1",
+    "### Action: NmapScan\n### Action Input: 10.0.0.1",
+    "> `Action`: NmapScan\n> `Action Input`: 10.0.0.1",
+])
+def test_markdown_hervorhebungen(text):
+    scanner = scan(text)
+    assert scanner.tool() == "NmapScan"
+    assert scanner.tool_input() == "10.0.0.1"
+    assert not scanner.exact
+
+
+@pytest.mark.parametrize("text", [
+    "ACTION: nmapscan\naction input: 10.0.0.1",
+    "Action : Nmapscan tool\nAction Input : \"10.0.0.1\"",
+    "action: nmapscan()\nACTION INPUT: '10.0.0.1'",
+])
+def test_gross_kleinschreibung_und_tool_namen(text):
+    scanner = scan(text)
+    assert scanner.tool() == "NmapScan"
+    assert scanner.tool_input() == "10.0.0.1"
+
+
+def test_unbekanntes_tool_bleibt_unveraendert():
+    assert scan("Action: Sqlmap\nAction Input: x").tool() == "Sqlmap"
+
+
+def test_eingabe_in_der_folgezeile():
+    scanner = ReActScanner(TOOLS).feed("Action: WebSearch\nAction Input:\n")
+    assert not scanner.action_ready
+    scanner.feed("CVE-2024-3094 xz\n")
+    assert scanner.action_ready
+    assert scanner.tool_input() == "CVE-2024-3094 xz"
+
+
+def test_halluzinierte_beobachtung_wird_ignoriert():
+    scanner = scan("Action: NmapScan\nAction Input: 10.0.0.1\nObservation: 22/tcp open\n"
+                   "Action: WebSearch\nAction Input: ssh\nFinal Answer: fertig")
+    assert scanner.tool() == "NmapScan"
+    assert scanner.tool_input() == "10.0.0.1"
+    assert scanner.final_answer == []
+
+
+def test_final_answer_vor_action():
+    scanner = scan("Final Answer: Port 22 ist offen.\nAction: NmapScan\nAction Input: 10.0.0.1")
+    assert scanner.action == "NmapScan"
+    assert not scanner.action_first
+    assert scanner.answer() == "Port 22 ist offen."
+
+
+def test_final_answer_mehrzeilig_und_ohne_markierung():
+    assert scan("Final Answer: Zeile 1\nZeile 2").answer() == "Zeile 1\nZeile 2"
+    assert scan("  Nur Text  ").answer() == "Nur Text"
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 13])
+def test_gestreamte_stuecke(size):
+    text = "Thought: suchen\n**Action**: websearch\nAction Input:\n\"CVE-2024-3094\"\nObservation: x\n"
+    whole = scan(text)
+    scanner = ReActScanner(TOOLS)
+    for start in range(0, len(text), size):
+        scanner.feed(text[start:start + size])
+    scanner.finish()
+    assert (scanner.tool(), scanner.tool_input(), scanner.exact) == (whole.tool(), whole.tool_input(), whole.exact)
+    assert scanner.tool() == "WebSearch"
+    assert scanner.tool_input() == "CVE-2024-3094"
+    assert scanner.text == text
+
+
+def test_action_ready_vor_dem_ende_des_streams():
+    scanner = ReActScanner(TOOLS).feed("Action: NmapScan\nAction Input: 10.0.0.1")
+    assert not scanner.action_ready
+    scanner.feed("\n")
+    assert scanner.action_ready
+
+
+def test_parser_stats():
+    stats = ParserStats()
+    stats.add("parsed")
+    stats.add("repaired")
+    stats.add("early_seconds", 0.5)
+    report = stats.report()
+    assert report["parsed"] == 1
+    assert report["retries_avoided"] == 1
+    assert report["early_seconds"] == 0.5
+    stats.reset()
+    assert stats.report()["parsed"] == 0
+    with pytest.raises(KeyError):
+        stats.add("unbekannt")
@@ -0,0 +1,56 @@
+"""
+Tests für die lokale Erkennung des Gesprächsendes
+"""
+
+from termination import TerminationDetector
+
+
+def call(name: str, arguments: str) -> dict:
+    return {"content": None, "tool_calls": [{"id": "c", "function": {"name": name, "arguments": arguments}}]}
+
+
+def test_terminate_und_abschlussformulierung():
+    assert TerminationDetector()({"content": "TERMINATE"})
+    detector = TerminationDetector()
+    assert detector("Die Aufgabe ist jetzt erledigt.")
+    assert detector.events == [{"message": 1, "detector": "completion_marker",
+                                "reason": "Abschlussformulierung 'Die Aufgabe ist jetzt erledigt'"}]
+
+
+def test_rueckfrage_nur_nach_zusammenfassung_in_letzter_zeile():
+    detector = TerminationDetector()
+    assert not detector("Gibt es noch weitere Fragen zum Scope, bevor ich beginne?")
+    assert not detector("Fazit: Port 443 offen.\nGibt es noch weitere Fragen? Dann scanne ich weiter.\nStarte Scan.")
+    assert detector("Zusammenfassung: Port 443 offen.\nGibt es noch weitere Fragen?")
+    assert detector.events[-1]["detector"] == "follow_up"
+
+
+def test_tool_aufrufe_beenden_nicht_bis_zur_schleife():
+    detector = TerminationDetector(max_tool_repeats=3)
+    message = call("search_recon_knowledge", '{"query": "dns"}')
+    message["content"] = "Task complete, searching once more"
+    assert not detector(message)
+    assert not detector(call("search_recon_knowledge", '{"query": "whois"}'))
+    assert not detector(call("search_recon_knowledge", '{"query": "dns"}'))
+    assert detector({"content": None, "function_call": {"name": "search_recon_knowledge",
+                                                         "arguments": '{"query": "dns"}'}})
+    assert detector.events[-1]["detector"] == "tool_loop"
+
+
+def test_leere_antworten_und_wiederholung():
+    detector = TerminationDetector(max_empty=2)
+    assert not detector({"content": ""})
+    assert detector({"content": "  "})
+    detector.reset()
+    text = "Für example.com wurden 12 Subdomains gefunden, darunter api und dev."
+    assert not detector(text)
+    assert detector(text + " ")
+    assert detector.events[-1]["detector"] == "repetition"
+
+
+def test_reset():
+    detector = TerminationDetector(max_tool_repeats=2)
+    detector(call("a", "{}"))
+    detector.reset()
+    assert not detector(call("a", "{}"))
+    assert detector.events == []
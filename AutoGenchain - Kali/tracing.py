@@ -0,0 +1,403 @@
+"""
+Spans und Metriken für Laufzeit, Tokens und Cache-Treffer der Agenten-Pipeline
+"""
+
+import contextvars
+import copy
+import functools
+import inspect
+import itertools
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+import autogen
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+_span_ids = itertools.count(1)
+
+
+class Span:
+    """Ein abgeschlossener oder laufender Abschnitt der Pipeline"""
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, **attrs):
+        self.id = next(_span_ids)
+        self.name = name
+        self.parent = parent
+        self.parent_id = parent.id if parent else None
+        self.path = f"{parent.path};{name}" if parent else name
+        self.attrs: Dict[str, Any] = attrs
+        self.start = time.time()
+        self._start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.thread = threading.get_ident()
+        self._token = None
+
+    def set(self, **attrs):
+        """Ergänzt Attribute des Spans (z.B. Tokens oder Cache-Treffer)"""
+        self.attrs.update(attrs)
+
+    def ancestors(self):
+        """Gibt die übergeordneten Spans zurück, vom direkten Elternteil aufwärts"""
+        span = self.parent
+        while span is not None:
+            yield span
+            span = span.parent
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Gibt den Span als Wörterbuch zurück"""
+        return {"id": self.id, "parent_id": self.parent_id, "name": self.name, "path": self.path,
+                "start": self.start, "duration": self.duration, "attrs": self.attrs}
+
+
+class Tracer:
+    """
+    Sammelt Spans und daraus abgeleitete Metriken
+
+    Der aktuelle Span wird über contextvars verfolgt und gilt damit pro Thread
+    bzw. pro asyncio-Task. Es werden höchstens `max_spans` Spans aufbewahrt;
+    die Metriken für Prometheus werden laufend aggregiert.
+    """
+
+    def __init__(self, max_spans: int = 10000):
+        """
+        Initialisiert den Tracer
+
+        Args:
+            max_spans: Maximale Anzahl aufbewahrter Spans
+        """
+        self.spans: deque = deque(maxlen=max_spans)
+        self.metrics: Dict[tuple, Dict[str, float]] = {}
+        self._listeners: List[Callable[[Span], None]] = []
+        self._lock = threading.Lock()
+
+    def current(self) -> Optional[Span]:
+        """Gibt den aktuellen Span zurück"""
+        return _current_span.get()
+
+    def start_span(self, name: str, **attrs) -> Span:
+        """
+        Startet einen Span als Kind des aktuellen Spans und macht ihn zum aktuellen
+
+        Args:
+            name: Name des Spans
+            attrs: Attribute des Spans
+
+        Returns:
+            Der gestartete Span (mit end_span im selben Thread bzw. Task beenden)
+        """
+        span = Span(name, self.current(), **attrs)
+        span._token = _current_span.set(span)
+        return span
+
+    def end_span(self, span: Span, **attrs):
+        """
+        Beendet einen mit start_span gestarteten Span
+
+        Args:
+            span: Der Span
+            attrs: Zusätzliche Attribute
+        """
+        if span.duration is not None:
+            return
+        span.set(**attrs)
+        span.duration = time.perf_counter() - span._start
+        try:
+            _current_span.reset(span._token)
+        except ValueError:
+            # In einem anderen Kontext beendet; der aktuelle Span bleibt unverändert
+            pass
+        self._finish(span)
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """
+        Kontextmanager für einen Span
+
+        Args:
+            name: Name des Spans
+            attrs: Attribute des Spans
+
+        Yields:
+            Der Span
+        """
+        span = self.start_span(name, **attrs)
+        try:
+            yield span
+        except BaseException as e:
+            span.set(error=type(e).__name__)
+            raise
+        finally:
+            self.end_span(span)
+
+    def record(self, name: str, duration: float, parent: Optional[Span] = None, **attrs) -> Span:
+        """
+        Erfasst einen bereits abgeschlossenen Span (z.B. aus Callbacks anderer Threads)
+
+        Args:
+            name: Name des Spans
+            duration: Dauer in Sekunden
+            parent: Übergeordneter Span
+            attrs: Attribute des Spans
+
+        Returns:
+            Der erfasste Span
+        """
+        span = Span(name, parent, **attrs)
+        span.start -= duration
+        span.duration = duration
+        self._finish(span)
+        return span
+
+    def _finish(self, span: Span):
+        key = (span.name, str(span.attrs.get("model", "")))
+        with self._lock:
+            self.spans.append(span)
+            metric = self.metrics.setdefault(key, {"count": 0, "seconds": 0.0, "prompt_tokens": 0,
+                                                   "completion_tokens": 0, "cache_hits": 0, "errors": 0})
+            metric["count"] += 1
+            metric["seconds"] += span.duration
+            metric["prompt_tokens"] += span.attrs.get("prompt_tokens") or 0
+            metric["completion_tokens"] += span.attrs.get("completion_tokens") or 0
+            metric["cache_hits"] += bool(span.attrs.get("cache_hit"))
+            metric["errors"] += "error" in span.attrs
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(span)
+
+    def add_listener(self, listener: Callable[[Span], None]):
+        """
+        Registriert eine Funktion, die mit jedem beendeten Span aufgerufen wird
+
+        Args:
+            listener: Die Funktion (wird im Thread bzw. Task des Spans aufgerufen)
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[Span], None]):
+        """Entfernt eine mit add_listener registrierte Funktion"""
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def reset(self):
+        """Verwirft alle Spans und Metriken"""
+        with self._lock:
+            self.spans.clear()
+            self.metrics.clear()
+
+    def export_json(self, path: str, root: Optional[Span] = None) -> str:
+        """
+        Schreibt die Spans als Trace-Datei (Chrome-Trace-Format, z.B. für Perfetto)
+
+        Args:
+            path: Pfad der Ausgabedatei
+            root: Nur diesen Span und seine Nachfahren exportieren
+
+        Returns:
+            Der Pfad der Datei
+        """
+        spans = self.tree(root) if root else list(self.spans)
+        events = [{
+            "name": span.name, "ph": "X", "pid": 1, "tid": span.thread,
+            "ts": span.start * 1e6, "dur": (span.duration or 0) * 1e6,
+            "args": dict(span.attrs, id=span.id, parent_id=span.parent_id)
+        } for span in spans]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"traceEvents": events, "spans": [s.to_dict() for s in spans]},
+                      f, indent=2, ensure_ascii=False, default=str)
+        return path
+
+    def prometheus(self) -> str:
+        """
+        Gibt die Metriken im Textformat von Prometheus zurück
+
+        Returns:
+            Der Text für einen /metrics-Endpunkt
+        """
+        with self._lock:
+            metrics = copy.deepcopy(self.metrics)
+        lines = [
+            "# HELP kali_span_seconds Laufzeit der Pipeline-Abschnitte in Sekunden",
+            "# TYPE kali_span_seconds summary",
+        ]
+        for (name, model), m in sorted(metrics.items()):
+            labels = f'span="{name}",model="{model}"'
+            lines.append(f"kali_span_seconds_sum{{{labels}}} {m['seconds']:.6f}")
+            lines.append(f"kali_span_seconds_count{{{labels}}} {m['count']}")
+        for metric, help_text, fields in [
+            ("kali_tokens_total", "Verbrauchte Tokens", ("prompt_tokens", "completion_tokens")),
+            ("kali_cache_hits_total", "Antworten aus dem Cache", ("cache_hits",)),
+            ("kali_span_errors_total", "Abschnitte mit Fehler", ("errors",)),
+        ]:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for (name, model), m in sorted(metrics.items()):
+                for field in fields:
+                    kind = f',kind="{field.replace("_tokens", "")}"' if metric == "kali_tokens_total" else ""
+                    lines.append(f'{metric}{{span="{name}",model="{model}"{kind}}} {m[field]}')
+        return "\n".join(lines) + "\n"
+
+    def tree(self, root: Span) -> List[Span]:
+        """Gibt einen Span und alle seine Nachfahren zurück"""
+        with self._lock:
+            spans = list(self.spans)
+        children: Dict[int, List[Span]] = {}
+        for span in spans:
+            children.setdefault(span.parent_id, []).append(span)
+        result, stack = [], [root]
+        while stack:
+            span = stack.pop()
+            result.append(span)
+            stack.extend(children.get(span.id, []))
+        return result
+
+    def print_flame(self, root: Span, width: int = 30):
+        """
+        Gibt eine Flame-Aufschlüsselung eines Spans aus
+
+        Spans mit gleichem Pfad werden zusammengefasst; jede Zeile zeigt Gesamtdauer,
+        Anteil am Wurzel-Span, Anzahl, Tokens und Cache-Treffer.
+
+        Args:
+            root: Der Wurzel-Span (z.B. einer Analyse)
+            width: Breite der Balken in Zeichen
+        """
+        groups: Dict[str, Dict[str, Any]] = {}
+        for span in self.tree(root):
+            group = groups.setdefault(span.path, {"seconds": 0.0, "count": 0, "tokens": 0, "cache_hits": 0})
+            group["seconds"] += span.duration or 0
+            group["count"] += 1
+            group["tokens"] += (span.attrs.get("prompt_tokens") or 0) + (span.attrs.get("completion_tokens") or 0)
+            group["cache_hits"] += bool(span.attrs.get("cache_hit"))
+
+        total = root.duration or 1e-9
+        print(f"\n{'Abschnitt':<48} {'Sekunden':>9} {'Anteil':>7} {'Anz.':>5} {'Tokens':>8} {'Cache':>6}")
+        # Tiefensuche über die Pfade, Geschwister nach Dauer absteigend
+        children: Dict[str, List[str]] = {}
+        for path in groups:
+            children.setdefault(path.rsplit(";", 1)[0] if ";" in path else None, []).append(path)
+        ordered, stack = [], [root.path]
+        while stack:
+            path = stack.pop()
+            ordered.append(path)
+            stack.extend(sorted(children.get(path, []), key=lambda p: groups[p]["seconds"]))
+
+        for path in ordered:
+            group = groups[path]
+            depth = path.count(";")
+            label = ("  " * depth + path.rsplit(";", 1)[-1])[:48]
+            share = group["seconds"] / total
+            bar = "█" * max(1, round(min(share, 1.0) * width)) if group["seconds"] else ""
+            print(f"{label:<48} {group['seconds']:>9.2f} {share:>7.1%} {group['count']:>5} "
+                  f"{group['tokens']:>8} {group['cache_hits']:>6}  {bar}")
+
+
+# Gemeinsamer Tracer der Anwendung
+tracer = Tracer()
+
+
+def traced(name: str, tracer: Tracer = tracer):
+    """
+    Dekorator, der jeden Aufruf einer Funktion oder Koroutine als Span erfasst
+
+    Args:
+        name: Name des Spans
+        tracer: Der Tracer
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with tracer.span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with tracer.span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def instrument_client(client: autogen.OpenAIWrapper, agent_name: str, tracer: Tracer = tracer):
+    """
+    Erfasst jeden Aufruf eines AutoGen-Clients als Span "llm"
+
+    Cache-Treffer von AutoGen erkennt man daran, dass nur die Gesamtnutzung des
+    Clients steigt, nicht die tatsächliche Nutzung.
+
+    Args:
+        client: Der OpenAIWrapper eines Agenten
+        agent_name: Name des Agenten für die Span-Attribute
+        tracer: Der Tracer
+    """
+    if client is None or getattr(client, "_traced", False):
+        return
+    create = client.create
+
+    def traced_create(**params):
+        actual_before = copy.deepcopy(client.actual_usage_summary)
+        with tracer.span("llm", agent=agent_name) as span:
+            response = create(**params)
+            usage = getattr(response, "usage", None)
+            details = getattr(usage, "prompt_tokens_details", None)
+            span.set(model=getattr(response, "model", None),
+                     prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+                     completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+                     cached_tokens=getattr(details, "cached_tokens", 0) or 0,
+                     cache_hit=client.actual_usage_summary == actual_before)
+        return response
+
+    client.create = traced_create
+    client._traced = True
+
+
+class TracedGroupChat(autogen.GroupChat):
+    """
+    GroupChat, der jede Runde und jede Sprecherauswahl als Span erfasst
+
+    Eine Runde beginnt mit der Sprecherauswahl und endet, wenn die Antwort des
+    Sprechers im Chat ankommt. Der Zustand liegt in einem Wörterbuch, das sich
+    der GroupChat mit der Kopie im Manager teilt.
+    """
+
+    def __init__(self, *args, tracer: Tracer = tracer, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._tracer = tracer
+        self._trace_state: Dict[str, Any] = {"round": None, "rounds": 0}
+
+    def _start_round(self):
+        self.close_round()
+        self._trace_state["rounds"] += 1
+        self._trace_state["round"] = self._tracer.start_span("round", round=self._trace_state["rounds"])
+
+    def close_round(self, **attrs):
+        """Beendet die laufende Runde (auch am Ende eines Chats aufrufen)"""
+        span = self._trace_state["round"]
+        if span is not None:
+            self._trace_state["round"] = None
+            self._tracer.end_span(span, **attrs)
+
+    def select_speaker(self, last_speaker, selector):
+        self._start_round()
+        with self._tracer.span("speaker_selection") as span:
+            speaker = super().select_speaker(last_speaker, selector)
+            span.set(speaker=speaker.name)
+        return speaker
+
+    async def a_select_speaker(self, last_speaker, selector):
+        self._start_round()
+        with self._tracer.span("speaker_selection") as span:
+            speaker = await super().a_select_speaker(last_speaker, selector)
+            span.set(speaker=speaker.name)
+        return speaker
+
+    def append(self, message, speaker):
+        super().append(message, speaker)
+        self.close_round(speaker=speaker.name, chars=len(str(message.get("content") or "")))
@@ -0,0 +1,232 @@
+"""
+Abrechnung von Tokens, Kosten und Latenz pro Agent und Runde
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from tracing import Span, Tracer, tracer
+
+# Preise in USD pro 1000 Tokens (Eingabe, Ausgabe[, zwischengespeicherte Eingabe]),
+# falls die Konfiguration keine enthält
+DEFAULT_PRICES = {
+    "gpt-4o-mini": (0.00015, 0.0006, 0.000075),
+    "gpt-4o": (0.0025, 0.01, 0.00125),
+    "gpt-4": (0.03, 0.06),
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+}
+
+# Name, unter dem die Sprecherauswahl des Gruppenchats abgerechnet wird
+SELECTOR_NAME = "GroupChatManager"
+
+
+def _empty_usage() -> Dict[str, Any]:
+    return {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "billed_tokens": 0,
+            "cached_tokens": 0, "cache_hits": 0, "seconds": 0.0, "cost": 0.0}
+
+
+class UsageLedger:
+    """
+    Erfasst die LLM-Aufrufe einer Analyse pro Agent und pro Runde des Gruppenchats
+
+    Das Hauptbuch wertet die "llm"-Spans des Tracers aus, die unterhalb der mit
+    track() verfolgten Spans entstehen; es funktioniert damit für synchrone und
+    asynchrone Chats sowie für parallele Sitzungen. Aufrufe während der
+    Sprecherauswahl werden dem GroupChatManager zugerechnet. Antworten aus dem
+    AutoGen-Cache zählen als Cache-Treffer ohne Kosten und ohne Budgetverbrauch.
+    Vom Anbieter zwischengespeicherte Prompt-Tokens ("cached_tokens") werden zum
+    günstigeren Preis für zwischengespeicherte Eingaben abgerechnet, zählen aber
+    voll für `max_tokens`.
+
+    Ist `max_tokens` oder `max_cost` erreicht, beendet ein Manager, dem
+    is_termination_msg() übergeben wurde, den Gruppenchat nach der aktuellen Nachricht.
+    """
+
+    def __init__(self,
+                prices: Optional[Dict[str, Tuple[float, float]]] = None,
+                max_tokens: Optional[int] = None,
+                max_cost: Optional[float] = None,
+                tracer: Tracer = tracer):
+        """
+        Initialisiert das Hauptbuch
+
+        Args:
+            prices: Preise in USD pro 1000 Tokens (Eingabe, Ausgabe[, zwischengespeicherte Eingabe]) je Modell
+            max_tokens: Maximale Anzahl abgerechneter Tokens (None für kein Limit)
+            max_cost: Maximale Kosten in USD (None für kein Limit)
+            tracer: Der Tracer, dessen Spans ausgewertet werden
+        """
+        # Ohne eigenen Preis kosten zwischengespeicherte Eingaben so viel wie andere
+        self.prices = {model: (price[0], price[1], price[2] if len(price) > 2 else price[0])
+                       for model, price in (prices or DEFAULT_PRICES).items()}
+        self.max_tokens = max_tokens
+        self.max_cost = max_cost
+        self._tracer = tracer
+        self._roots: List[Span] = []
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Verwirft alle erfassten Aufrufe"""
+        self.totals = _empty_usage()
+        self.agents: Dict[str, Dict[str, Any]] = {}
+        self.rounds: Dict[int, Dict[str, Any]] = {}
+        self._round_spans: Dict[int, Span] = {}
+        self.budget_exceeded: Optional[str] = None
+
+    def price(self, model: Optional[str]) -> Tuple[float, float, float]:
+        """
+        Gibt den Preis eines Modells zurück
+
+        Versionierte Namen wie "gpt-4o-2024-08-06" erhalten den Preis des längsten
+        passenden Eintrags.
+
+        Args:
+            model: Name des Modells
+
+        Returns:
+            Preis in USD pro 1000 Tokens (Eingabe, Ausgabe, zwischengespeicherte Eingabe);
+            (0, 0, 0) für unbekannte Modelle
+        """
+        matches = [name for name in self.prices if model and model.startswith(name)]
+        return self.prices[max(matches, key=len)] if matches else (0.0, 0.0, 0.0)
+
+    @contextmanager
+    def track(self, span: Span):
+        """
+        Erfasst alle LLM-Aufrufe unterhalb eines Spans, solange der Kontext aktiv ist
+
+        Args:
+            span: Der Span einer Analyse oder Zusammenarbeit
+        """
+        with self._lock:
+            self._roots.append(span)
+            if len(self._roots) == 1:
+                self._tracer.add_listener(self.observe)
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._roots.remove(span)
+                if not self._roots:
+                    self._tracer.remove_listener(self.observe)
+
+    def is_termination_msg(self, message: Dict) -> bool:
+        """
+        Beendet den Chat, sobald das Budget erreicht ist
+
+        Als (Teil der) is_termination_msg des GroupChatManager übergeben: Der
+        Manager prüft jede Nachricht, nachdem der Gruppenchat sie aufgenommen hat.
+        """
+        return self.budget_exceeded is not None
+
+    def observe(self, span: Span):
+        """
+        Rechnet einen beendeten "llm"-Span ab, falls er zu einem verfolgten Span gehört
+
+        Args:
+            span: Der beendete Span
+        """
+        if span.name != "llm":
+            return
+        ancestors = list(span.ancestors())
+        if not any(root in ancestors for root in self._roots):
+            return
+
+        agent = span.attrs.get("agent") or "unbekannt"
+        round_span = None
+        for ancestor in ancestors:
+            if ancestor.name == "speaker_selection":
+                agent = SELECTOR_NAME
+            elif ancestor.name == "round":
+                round_span = ancestor
+                break
+
+        # cache_hit: Antwort aus dem AutoGen-Cache, ohne Anfrage an den Anbieter
+        cache_hit = bool(span.attrs.get("cache_hit"))
+        prompt_tokens = span.attrs.get("prompt_tokens") or 0
+        completion_tokens = span.attrs.get("completion_tokens") or 0
+        cached_tokens = min(span.attrs.get("cached_tokens") or 0, prompt_tokens)
+        input_price, output_price, cached_price = self.price(span.attrs.get("model"))
+        cost = 0.0 if cache_hit else (input_price * (prompt_tokens - cached_tokens) + cached_price * cached_tokens
+                                      + output_price * completion_tokens) / 1000
+
+        with self._lock:
+            entries = [self.totals, self.agents.setdefault(agent, dict(_empty_usage(), model=span.attrs.get("model")))]
+            if round_span is not None:
+                self._round_spans[round_span.id] = round_span
+                entries.append(self.rounds.setdefault(round_span.id, dict(_empty_usage(), agents={})))
+            for entry in entries:
+                entry["calls"] += 1
+                entry["prompt_tokens"] += prompt_tokens
+                entry["completion_tokens"] += completion_tokens
+                entry["billed_tokens"] += 0 if cache_hit else prompt_tokens + completion_tokens
+                entry["cached_tokens"] += cached_tokens
+                entry["cache_hits"] += cache_hit
+                entry["seconds"] += span.duration or 0.0
+                entry["cost"] += cost
+            if round_span is not None:
+                agents = self.rounds[round_span.id]["agents"]
+                agents[agent] = agents.get(agent, 0) + prompt_tokens + completion_tokens
+            self._check_budget()
+
+    def _check_budget(self):
+        if self.budget_exceeded is not None:
+            return
+        if self.max_tokens is not None and self.totals["billed_tokens"] >= self.max_tokens:
+            self.budget_exceeded = f"Tokenlimit von {self.max_tokens} erreicht"
+        elif self.max_cost is not None and self.totals["cost"] >= self.max_cost:
+            self.budget_exceeded = f"Kostenlimit von {self.max_cost:.4f} USD erreicht"
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Gibt die Abrechnung als JSON-fähiges Wörterbuch zurück
+
+        Returns:
+            Gesamtwerte, Werte pro Agent, pro Runde und der Zustand des Budgets
+        """
+        with self._lock:
+            rounds = []
+            for span_id, entry in self.rounds.items():
+                span = self._round_spans[span_id]
+                rounds.append(dict(entry, round=span.attrs.get("round"), speaker=span.attrs.get("speaker"),
+                                   agents=dict(entry["agents"])))
+            return {
+                "totals": dict(self.totals),
+                "agents": {name: dict(entry) for name, entry in self.agents.items()},
+                "rounds": rounds,
+                "budget": {
+                    "max_tokens": self.max_tokens,
+                    "max_cost": self.max_cost,
+                    "exceeded": self.budget_exceeded
+                }
+            }
+
+    def print_report(self):
+        """Gibt die Abrechnung pro Agent und Runde aus"""
+        print_usage(self.summary())
+
+
+def print_usage(usage: Dict[str, Any]):
+    """
+    Gibt eine mit UsageLedger.summary() erstellte Abrechnung aus
+
+    Args:
+        usage: Die Abrechnung
+    """
+    print(f"\n{'Agent':<28} {'Aufrufe':>7} {'Eingabe':>8} {'Ausgabe':>8} {'Cache':>6} {'Sekunden':>9} {'USD':>9}")
+    for name, entry in sorted(usage["agents"].items(), key=lambda item: -item[1]["cost"]):
+        print(f"{name[:28]:<28} {entry['calls']:>7} {entry['prompt_tokens']:>8} {entry['completion_tokens']:>8} "
+              f"{entry['cache_hits']:>6} {entry['seconds']:>9.2f} {entry['cost']:>9.4f}")
+    totals = usage["totals"]
+    print(f"{'Gesamt':<28} {totals['calls']:>7} {totals['prompt_tokens']:>8} {totals['completion_tokens']:>8} "
+          f"{totals['cache_hits']:>6} {totals['seconds']:>9.2f} {totals['cost']:>9.4f}")
+    if usage["rounds"]:
+        print(f"\n{'Runde':>5} {'Sprecher':<28} {'Tokens':>8} {'Sekunden':>9} {'USD':>9}")
+        for entry in usage["rounds"]:
+            print(f"{entry['round'] or '-':>5} {str(entry['speaker'] or '-')[:28]:<28} "
+                  f"{entry['prompt_tokens'] + entry['completion_tokens']:>8} {entry['seconds']:>9.2f} "
+                  f"{entry['cost']:>9.4f}")
+    if usage["budget"]["exceeded"]:
+        print(f"\nBudget: {usage['budget']['exceeded']}, Gruppenchat vorzeitig beendet")
@@ -0,0 +1,90 @@
+import csv
+import os
+import random
+import string
+import tempfile
+import time
+
+from travel_data import TravelDataStore, normalize_key
+
+# Microbenchmark: 100k synthetic cities are written to a CSV file, loaded into a
+# TravelDataStore and looked up exactly, case-insensitively, by alias, by prefix and
+# with a typo. The baseline is what the tools did before: an exact dict lookup,
+# falling back to a case-insensitive linear scan.
+
+N_CITIES = 100_000
+N_LOOKUPS = 2_000
+
+random.seed(0)
+
+
+def synthetic_city() -> str:
+    words = random.randint(1, 2)
+    return " ".join(
+        random.choice(string.ascii_uppercase)
+        + "".join(random.choices(string.ascii_lowercase, k=random.randint(4, 9)))
+        for _ in range(words)
+    )
+
+
+def write_csv(path: str) -> list:
+    cities = sorted({synthetic_city() for _ in range(N_CITIES)})
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["city", "hotel", "aliases"])
+        for i, city in enumerate(cities):
+            alias = f"C{i}" if i % 10 == 0 else ""
+            writer.writerow([city, f"Top hotel in {city}: Hotel {i}", alias])
+    return cities
+
+
+def linear_lookup(data: dict, query: str):
+    if query in data:
+        return data[query]
+    wanted = normalize_key(query)
+    return next((v for k, v in data.items() if normalize_key(k) == wanted), None)
+
+
+def typo(city: str) -> str:
+    i = random.randint(2, len(city) - 1)
+    return city[:i] + city[i + 1 :]
+
+
+def time_lookups(lookup, queries) -> float:
+    start = time.perf_counter()
+    for query in queries:
+        lookup(query)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "hotels.csv")
+        cities = write_csv(path)
+        start = time.perf_counter()
+        store = TravelDataStore.from_csv(
+            path, key_column="city", value_column="hotel", alias_column="aliases"
+        )
+        load_seconds = time.perf_counter() - start
+        with open(path, newline="", encoding="utf-8") as f:
+            plain = {row["city"]: row["hotel"] for row in csv.DictReader(f)}
+
+    sample = random.sample(cities, N_LOOKUPS)
+    # (query, expected city) pairs per kind of lookup.
+    cases = {
+        "exact": [(c, c) for c in sample],
+        "lower case": [(c.lower(), c) for c in sample],
+        "alias": [(f"C{i}", cities[i]) for i in range(0, len(cities), 10)][:N_LOOKUPS],
+        "prefix": [(c[: max(4, len(c) - 2)], c) for c in sample],
+        "typo": [(typo(c), c) for c in sample],
+    }
+
+    print(f"{len(store)} cities loaded from CSV in {load_seconds:.2f}s")
+    print(f"{'lookup':<12} {'store µs':>10} {'correct':>8} {'linear µs':>10}")
+    for case, pairs in cases.items():
+        queries = [q for q, _ in pairs]
+        correct = sum(store.resolve(q) == city for q, city in pairs) / len(pairs)
+        store_us = time_lookups(store.get, queries)
+        # The linear scan is slow; time it on a subset.
+        linear_us = time_lookups(lambda q: linear_lookup(plain, q), queries[:50])
+        print(f"{case:<12} {store_us:>10.1f} {correct:>8.0%} {linear_us:>10.1f}")
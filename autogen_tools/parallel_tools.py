@@ -0,0 +1,155 @@
+import asyncio
+import functools
+import inspect
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from autogen import Agent, ConversableAgent
+
+# Parallel execution of the tool calls in a single assistant message.
+#
+# ConversableAgent.generate_tool_calls_reply runs the tool calls of a message one
+# after another. ParallelToolExecutor replaces that step for an executing agent
+# (the one the tools were registered with via register_for_execution): async tools
+# run on the event loop, sync tools on a thread pool, each with its own timeout.
+# Tool responses are returned in the order of the tool calls.
+#
+# Usage:
+#     executor = ParallelToolExecutor(timeout=10, timeouts={"get_flight_status": 5})
+#     executor.attach(user_proxy)
+
+
+class ParallelToolExecutor:
+    def __init__(
+        self,
+        max_workers: int = 8,
+        timeout: float = 30.0,
+        timeouts: Optional[Dict[str, float]] = None,
+    ):
+        self.timeout = timeout
+        self.timeouts = dict(timeouts or {})
+        self.timings: List[Dict[str, Any]] = []
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+
+    def attach(self, agent: ConversableAgent) -> None:
+        # Take the place of the built-in tool call replies, keeping the termination check first.
+        position = next(
+            i
+            for i, entry in enumerate(agent._reply_func_list)
+            if entry["reply_func"] is ConversableAgent.a_generate_tool_calls_reply
+        )
+        agent.register_reply(
+            [Agent, None], self.generate_tool_calls_reply, position=position
+        )
+        agent.register_reply(
+            [Agent, None],
+            self.a_generate_tool_calls_reply,
+            position=position,
+            ignore_async_in_sync_chat=True,
+        )
+
+    def generate_tool_calls_reply(
+        self,
+        recipient: ConversableAgent,
+        messages: Optional[List[Dict]] = None,
+        sender: Optional[Agent] = None,
+        config: Optional[Any] = None,
+    ):
+        coro = self.a_generate_tool_calls_reply(recipient, messages, sender, config)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coro)
+        # Called from inside a running event loop (e.g. a notebook): run on a helper thread.
+        with ThreadPoolExecutor(max_workers=1) as helper:
+            return helper.submit(asyncio.run, coro).result()
+
+    async def a_generate_tool_calls_reply(
+        self,
+        recipient: ConversableAgent,
+        messages: Optional[List[Dict]] = None,
+        sender: Optional[Agent] = None,
+        config: Optional[Any] = None,
+    ):
+        if messages is None:
+            messages = recipient._oai_messages[sender]
+        tool_calls = messages[-1].get("tool_calls") or []
+        if not tool_calls:
+            return False, None
+        start = time.perf_counter()
+        tool_returns = await asyncio.gather(
+            *(
+                self._a_execute_tool_call(recipient, tool_call)
+                for tool_call in tool_calls
+            )
+        )
+        self.timings.append(
+            {
+                "tool_calls": len(tool_calls),
+                "wall_seconds": time.perf_counter() - start,
+                "calls": [r.pop("_timing") for r in tool_returns],
+            }
+        )
+        return True, {
+            "role": "tool",
+            "tool_responses": tool_returns,
+            "content": "\n\n".join(str(r.get("content", "")) for r in tool_returns),
+        }
+
+    async def _a_execute_tool_call(
+        self, agent: ConversableAgent, tool_call: Dict
+    ) -> Dict:
+        function_call = tool_call.get("function", {})
+        name = function_call.get("name")
+        func = agent.function_map.get(name)
+        timeout = self.timeouts.get(name, self.timeout)
+        status = "ok"
+        start = time.perf_counter()
+        if func is None:
+            status = "error"
+            content = f"Error: Function {name} not found."
+        else:
+            try:
+                arguments = json.loads(function_call.get("arguments") or "{}")
+                if inspect.iscoroutinefunction(func):
+                    pending = func(**arguments)
+                else:
+                    loop = asyncio.get_running_loop()
+                    pending = loop.run_in_executor(
+                        self._pool, functools.partial(func, **arguments)
+                    )
+                content = str(await asyncio.wait_for(pending, timeout))
+            except asyncio.TimeoutError:
+                # A sync tool keeps running on its worker thread; its result is discarded.
+                status = "timeout"
+                content = f"Error: {name} timed out after {timeout} seconds."
+            except json.JSONDecodeError as e:
+                status = "error"
+                content = f"Error: {e}\n The argument must be in JSON format."
+            except Exception as e:
+                status = "error"
+                content = f"Error: {e}"
+        return {
+            "tool_call_id": tool_call["id"],
+            "role": "tool",
+            "content": content,
+            "_timing": {
+                "name": name,
+                "status": status,
+                "seconds": time.perf_counter() - start,
+            },
+        }
+
+    def print_timings(self) -> None:
+        for i, batch in enumerate(self.timings, start=1):
+            sequential = sum(call["seconds"] for call in batch["calls"])
+            print(
+                f"Tool batch {i}: {batch['tool_calls']} calls in {batch['wall_seconds']:.3f}s "
+                f"(sequential would take ~{sequential:.3f}s)"
+            )
+            for call in batch["calls"]:
+                print(
+                    f"  {call['name']:<24} {call['status']:<8} {call['seconds']:.3f}s"
+                )
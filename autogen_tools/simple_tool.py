@@ -1,8 +1,12 @@
 import os
-from autogen import ConversableAgent
+import re
+import time
+from autogen import Agent, ConversableAgent
 from typing import Annotated
 from dotenv import load_dotenv
 
+from termination import termination_check
+
 load_dotenv()
 
 model = "gpt-3.5-turbo"
@@ -36,8 +40,8 @@ assistant = ConversableAgent(
 # The user proxy agent is used for interacting with the assistant agent and executes tool calls.
 user_proxy = ConversableAgent(
     name="User",
-    is_termination_msg=lambda msg: msg.get("content") is not None
-    and "TERMINATE" in msg["content"],
+    # Stops on TERMINATE, but also on repeated replies and repeated tool calls.
+    is_termination_msg=termination_check(),
     human_input_mode="NEVER",
 )
 
@@ -53,4 +57,40 @@ assistant.register_for_llm(name="multiply_numbers", description="Multiply two nu
 user_proxy.register_for_execution(name="add_numbers")(add_numbers)
 user_proxy.register_for_execution(name="multiply_numbers")(multiply_numbers)
 
-user_proxy.initiate_chat(assistant, message="What is the sum of 7 and 5?")
+
+# Plain "sum/product of X and Y" questions don't need the LLM at all: an agent
+# without an LLM answers them with the same calculator functions.
+CALCULATION = re.compile(r"\b(sum|product) of (-?\d+) and (-?\d+)", re.IGNORECASE)
+
+
+def calculate(text: str) -> str:
+    match = CALCULATION.search(text)
+    if match is None:
+        return "I can only add or multiply two numbers."
+    a, b = int(match.group(2)), int(match.group(3))
+    if match.group(1).lower() == "sum":
+        return add_numbers(a, b)
+    return multiply_numbers(a, b)
+
+
+calculator_function = ConversableAgent(
+    name="CalculatorFunction",
+    llm_config=False,
+    human_input_mode="NEVER",
+)
+calculator_function.register_reply(
+    [Agent, None],
+    lambda recipient, messages, sender, config: (True, calculate(messages[-1]["content"])),
+)
+
+question = "What is the sum of 7 and 5?"
+start = time.perf_counter()
+if CALCULATION.search(question):
+    # The function's answer is final, so the chat takes a single turn.
+    user_proxy.initiate_chat(calculator_function, message=question, max_turns=1)
+    print(
+        f"Answered by {calculator_function.name} without an LLM call "
+        f"in {time.perf_counter() - start:.3f}s"
+    )
+else:
+    user_proxy.initiate_chat(assistant, message=question)
@@ -0,0 +1,46 @@
+import json
+from typing import Callable, Dict
+
+# A small local termination check for the tool examples.
+#
+# The model does not always end with "TERMINATE"; the chat then runs until
+# max_consecutive_auto_reply. Besides "TERMINATE", this check stops when the
+# assistant repeats its previous reply word for word or requests the same tool
+# calls again. The Kali app (AutoGenchain - Kali/termination.py) has the full
+# detector with completion phrases, near-duplicate replies and empty replies.
+#
+# Usage:
+#     user_proxy = ConversableAgent(..., is_termination_msg=termination_check())
+
+
+def termination_check(max_tool_repeats: int = 2) -> Callable[[Dict], bool]:
+    """Return an is_termination_msg function; use one per checking agent and chat."""
+    last_reply = None
+    tool_calls = {}
+
+    def is_termination_msg(message: Dict) -> bool:
+        nonlocal last_reply
+        if message.get("tool_calls"):
+            signature = json.dumps(
+                sorted(
+                    (c["function"]["name"], c["function"]["arguments"])
+                    for c in message["tool_calls"]
+                )
+            )
+            tool_calls[signature] = tool_calls.get(signature, 0) + 1
+            repeated = tool_calls[signature] >= max_tool_repeats
+            reason = "same tool calls again" if repeated else None
+        else:
+            content = (message.get("content") or "").strip()
+            if "TERMINATE" in content:
+                reason = "TERMINATE"
+            elif content and content == last_reply:
+                reason = "repeated reply"
+            else:
+                reason = None
+            last_reply = content
+        if reason:
+            print(f"Stopping the chat: {reason}")
+        return reason is not None
+
+    return is_termination_msg
@@ -0,0 +1,154 @@
+import functools
+import inspect
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+# Memoization for registered tools.
+#
+# Lookup tools are called again and again with the same arguments, within one
+# conversation and across conversations. Tools declare at registration time
+# whether they are pure (cached until evicted) or may be cached for `ttl` seconds:
+#
+#     tool_cache.register_for_execution(user_proxy, name="get_hotel_info", ttl=3600)(get_hotel_info)
+#
+# Keys are the tool name plus its canonicalized arguments (bound to the signature,
+# defaults applied, JSON with sorted keys); eviction is LRU over all tools.
+
+
+class ToolCache:
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def cached(
+        self, func: Callable, name: Optional[str] = None, ttl: Optional[float] = None
+    ) -> Callable:
+        """Wrap `func` so results are served from the cache; ttl=None means the tool is pure."""
+        tool_name = name or func.__name__
+        signature = inspect.signature(func)
+        self._stats.setdefault(tool_name, {"hits": 0, "misses": 0, "expired": 0})
+
+        def make_key(args, kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return tool_name, json.dumps(bound.arguments, sort_keys=True, default=str)
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def _a_cached_func(*args, **kwargs):
+                key = make_key(args, kwargs)
+                found, value = self._get(key)
+                if found:
+                    return value
+                value = await func(*args, **kwargs)
+                self._set(key, value, ttl)
+                return value
+
+            return _a_cached_func
+
+        @functools.wraps(func)
+        def _cached_func(*args, **kwargs):
+            key = make_key(args, kwargs)
+            found, value = self._get(key)
+            if found:
+                return value
+            value = func(*args, **kwargs)
+            self._set(key, value, ttl)
+            return value
+
+        return _cached_func
+
+    def register_for_execution(
+        self,
+        agent,
+        name: Optional[str] = None,
+        pure: bool = False,
+        ttl: Optional[float] = None,
+    ) -> Callable:
+        """Like agent.register_for_execution, but caches the tool if it is declared pure or given a ttl."""
+
+        def _decorator(func: Callable) -> Callable:
+            tool = (
+                self.cached(func, name=name, ttl=ttl)
+                if pure or ttl is not None
+                else func
+            )
+            agent.register_for_execution(name=name)(tool)
+            return func
+
+        return _decorator
+
+    def _get(self, key: tuple):
+        with self._lock:
+            stats = self._stats[key[0]]
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    stats["hits"] += 1
+                    return True, value
+                del self._entries[key]
+                stats["expired"] += 1
+            stats["misses"] += 1
+            return False, None
+
+    def _set(self, key: tuple, value: Any, ttl: Optional[float]) -> None:
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def usage_summary(self) -> Dict[str, Any]:
+        with self._lock:
+            tools = {}
+            for tool_name, stats in self._stats.items():
+                lookups = stats["hits"] + stats["misses"]
+                tools[tool_name] = dict(
+                    stats, hit_rate=stats["hits"] / lookups if lookups else 0.0
+                )
+            hits = sum(s["hits"] for s in self._stats.values())
+            lookups = hits + sum(s["misses"] for s in self._stats.values())
+            return {
+                "tools": tools,
+                "hits": hits,
+                "lookups": lookups,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
+
+    def add_to_chat_cost(self, chat_result) -> None:
+        """Add the cache metrics to the cost/usage summary of a ChatResult."""
+        summary = self.usage_summary()
+        cost = chat_result.cost
+        for usage in [cost] if isinstance(cost, dict) else cost:
+            if isinstance(usage, dict):
+                usage["tool_cache"] = summary
+
+    def print_usage_summary(self) -> None:
+        summary = self.usage_summary()
+        print(
+            f"Tool cache: {summary['hits']}/{summary['lookups']} hits "
+            f"({summary['hit_rate']:.0%}), {summary['entries']} entries"
+        )
+        for tool_name, stats in summary["tools"].items():
+            print(
+                f"  {tool_name:<24} hits={stats['hits']} misses={stats['misses']} "
+                f"expired={stats['expired']} hit_rate={stats['hit_rate']:.0%}"
+            )
+
+
+# Shared by all tool scripts in a process, so results are reused across conversations.
+tool_cache = ToolCache()
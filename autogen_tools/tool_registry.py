@@ -0,0 +1,218 @@
+import json
+import math
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+from autogen import Agent, ConversableAgent
+from autogen.function_utils import get_function_schema
+from autogen.token_count_utils import count_token
+
+# Compact tool schema registry.
+#
+# assistant.register_for_llm adds every tool schema to llm_config["tools"], so each
+# LLM request carries all of them. ToolRegistry builds each schema once, keeps its
+# serialized form and token count, and sends only the tools relevant to the latest
+# message (keyword overlap by default, or cosine similarity with an `embed` function).
+#
+# Usage:
+#     registry = ToolRegistry(model=model)
+#     registry.register(name="get_hotel_info", description="...")(get_hotel_info)
+#     registry.attach(assistant)   # instead of assistant.register_for_llm(...)
+
+_STOPWORDS = {
+    "a",
+    "an",
+    "and",
+    "the",
+    "of",
+    "for",
+    "to",
+    "in",
+    "on",
+    "my",
+    "me",
+    "is",
+    "are",
+    "can",
+    "you",
+    "i",
+    "am",
+    "be",
+    "it",
+    "this",
+    "that",
+    "with",
+    "based",
+    "get",
+    "give",
+    "also",
+    "need",
+    "help",
+    "what",
+    "how",
+    "specific",
+    "some",
+    "there",
+}
+
+
+def _words(text: str) -> set:
+    return {w for w in re.findall(r"[a-z0-9]+", text.lower()) if w not in _STOPWORDS}
+
+
+def _matches(word: str, keyword: str) -> bool:
+    if word == keyword:
+        return True
+    # Prefix match for longer words, so "information" matches "info" and "hotels" matches "hotel".
+    shorter, longer = sorted((word, keyword), key=len)
+    return len(shorter) >= 4 and longer.startswith(shorter)
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class _ToolScopedClient:
+    # Passes the selected tools to OpenAIWrapper.create for a single request.
+    def __init__(self, client, tools: List[Dict]):
+        self._client = client
+        self._tools = tools
+
+    def create(self, **params):
+        if self._tools:
+            params["tools"] = self._tools
+        return self._client.create(**params)
+
+    def extract_text_or_completion_object(self, response):
+        return self._client.extract_text_or_completion_object(response)
+
+
+class ToolRegistry:
+    def __init__(
+        self,
+        model: str = "gpt-3.5-turbo",
+        max_tools: int = 3,
+        embed: Optional[Callable[[str], List[float]]] = None,
+        min_similarity: float = 0.3,
+    ):
+        self.model = model
+        self.max_tools = max_tools
+        self.embed = embed
+        self.min_similarity = min_similarity
+        self.tools: Dict[str, Dict[str, Any]] = {}
+        self.calls: List[Dict[str, Any]] = []
+
+    def register(
+        self, name: str, description: str, keywords: Optional[List[str]] = None
+    ) -> Callable:
+        def _decorator(func: Callable) -> Callable:
+            schema = get_function_schema(func, name=name, description=description)
+            parameters = schema["function"]["parameters"].get("properties", {})
+            text = " ".join(
+                [name.replace("_", " "), description]
+                + [f"{p} {v.get('description', '')}" for p, v in parameters.items()]
+                + list(keywords or [])
+            )
+            serialized = json.dumps(schema, separators=(",", ":"))
+            self.tools[name] = {
+                "schema": schema,
+                "serialized": serialized,
+                "tokens": count_token(serialized, self.model),
+                "keywords": _words(text),
+                "embedding": self.embed(text) if self.embed else None,
+            }
+            return func
+
+        return _decorator
+
+    def attach(self, agent: ConversableAgent) -> None:
+        # Take the place of the built-in LLM reply so the tools can be chosen per request.
+        position = next(
+            i
+            for i, entry in enumerate(agent._reply_func_list)
+            if entry["reply_func"] is ConversableAgent.a_generate_oai_reply
+        )
+        agent.register_reply([Agent, None], self.generate_oai_reply, position=position)
+
+    def select(self, messages: List[Dict]) -> List[Dict]:
+        """Return the schemas of the tools relevant to the latest message."""
+        query = self._query_text(messages)
+        if self.embed is not None:
+            query_embedding = self.embed(query)
+            scored = [
+                (_cosine(query_embedding, tool["embedding"]), name)
+                for name, tool in self.tools.items()
+            ]
+            scored = [(s, n) for s, n in scored if s >= self.min_similarity]
+        else:
+            words = _words(query)
+            scored = [
+                (
+                    sum(any(_matches(w, k) for k in tool["keywords"]) for w in words),
+                    name,
+                )
+                for name, tool in self.tools.items()
+            ]
+            scored = [(s, n) for s, n in scored if s > 0]
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [self.tools[name]["schema"] for _, name in scored[: self.max_tools]]
+
+    @staticmethod
+    def _query_text(messages: List[Dict]) -> str:
+        # After a tool round-trip the latest message is the tool output; the request
+        # that triggered the tool calls decides which tools stay relevant.
+        for message in reversed(messages):
+            if message.get("role") == "tool" or message.get("tool_calls"):
+                continue
+            if message.get("content"):
+                return message["content"]
+        return ""
+
+    def generate_oai_reply(
+        self,
+        recipient: ConversableAgent,
+        messages: Optional[List[Dict]] = None,
+        sender: Optional[Agent] = None,
+        config: Optional[Any] = None,
+    ):
+        client = recipient.client if config is None else config
+        if client is None:
+            return False, None
+        if messages is None:
+            messages = recipient._oai_messages[sender]
+        tools = self.select(messages)
+        self.calls.append(
+            {
+                "tools": [t["function"]["name"] for t in tools],
+                "schema_tokens": sum(
+                    self.tools[t["function"]["name"]]["tokens"] for t in tools
+                ),
+                "all_schema_tokens": sum(t["tokens"] for t in self.tools.values()),
+            }
+        )
+        extracted_response = recipient._generate_oai_reply_from_client(
+            _ToolScopedClient(client, tools),
+            recipient._oai_system_message + messages,
+            recipient.client_cache,
+        )
+        return (
+            (False, None) if extracted_response is None else (True, extracted_response)
+        )
+
+    def print_report(self) -> None:
+        sent = sum(c["schema_tokens"] for c in self.calls)
+        full = sum(c["all_schema_tokens"] for c in self.calls)
+        print(
+            f"Tool schemas: {len(self.tools)} registered, {len(self.calls)} LLM calls"
+        )
+        for i, call in enumerate(self.calls, start=1):
+            print(
+                f"  call {i}: {call['schema_tokens']}/{call['all_schema_tokens']} schema tokens "
+                f"{call['tools']}"
+            )
+        if full:
+            print(
+                f"  schema tokens sent: {sent} of {full} ({1 - sent / full:.0%} saved)"
+            )
@@ -0,0 +1,162 @@
+import bisect
+import csv
+import difflib
+import json
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Shared, preloaded data behind the travel lookup tools.
+#
+# A TravelDataStore is built once and answers lookups without an LLM retry turn for
+# near misses: keys are matched case-insensitively (O(1) dict), through aliases
+# ("NYC" -> "New York"), by unique prefix (O(log n) bisect over the sorted keys) and
+# finally by fuzzy match against the keys sharing the query's first letters.
+#
+# Larger datasets (100k+ cities or flights) are loaded from CSV or JSON:
+#     hotels = TravelDataStore.from_csv("hotels.csv", key_column="city", value_column="hotel")
+#     hotels.get("new york")
+
+
+def normalize_key(key: str) -> str:
+    return " ".join(str(key).casefold().split())
+
+
+class TravelDataStore:
+    def __init__(
+        self,
+        records: Optional[Dict[str, str]] = None,
+        aliases: Optional[Dict[str, str]] = None,
+        prefix: bool = True,
+        fuzzy: bool = True,
+        fuzzy_cutoff: float = 0.8,
+    ):
+        self.prefix = prefix
+        self.fuzzy = fuzzy
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self._records: Dict[str, Tuple[str, str]] = {}
+        self._aliases: Dict[str, str] = {}
+        self._sorted_keys: List[str] = []
+        self.update(records or {}, aliases or {})
+
+    def update(self, records: Dict[str, str], aliases: Optional[Dict[str, str]] = None):
+        for key, value in records.items():
+            self._records[normalize_key(key)] = (key, value)
+        for alias, key in (aliases or {}).items():
+            self._aliases[normalize_key(alias)] = normalize_key(key)
+        self._sorted_keys = sorted(self._records)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def resolve(self, query: str) -> Optional[str]:
+        """Return the canonical key `query` refers to, or None."""
+        key = normalize_key(query)
+        if not key:
+            return None
+        key = self._aliases.get(key, key)
+        if key in self._records:
+            return self._records[key][0]
+        if self.prefix:
+            matches = self._prefix_range(key, limit=2)
+            if len(matches) == 1:
+                return self._records[matches[0]][0]
+        if self.fuzzy:
+            # Only keys sharing the first letters are compared, so this stays cheap on large stores.
+            candidates = self._prefix_range(key[:2], limit=5000) or self._prefix_range(
+                key[:1], limit=5000
+            )
+            close = difflib.get_close_matches(
+                key, candidates, n=1, cutoff=self.fuzzy_cutoff
+            )
+            if close:
+                return self._records[close[0]][0]
+        return None
+
+    def get(self, query: str, default: Optional[str] = None) -> Optional[str]:
+        key = self.resolve(query)
+        return default if key is None else self._records[normalize_key(key)][1]
+
+    def _prefix_range(self, prefix: str, limit: int) -> List[str]:
+        start = bisect.bisect_left(self._sorted_keys, prefix)
+        end = bisect.bisect_right(self._sorted_keys, prefix + "\uffff", lo=start)
+        return self._sorted_keys[start : min(end, start + limit)]
+
+    @classmethod
+    def from_rows(
+        cls,
+        rows: Iterable[Dict[str, str]],
+        key_column: str,
+        value_column: str,
+        alias_column: Optional[str] = None,
+        **kwargs,
+    ) -> "TravelDataStore":
+        records, aliases = {}, {}
+        for row in rows:
+            records[row[key_column]] = row[value_column]
+            # Several aliases can be given separated by "|", e.g. "NYC|NY|Big Apple".
+            for alias in (
+                (row.get(alias_column) or "").split("|") if alias_column else []
+            ):
+                if alias.strip():
+                    aliases[alias] = row[key_column]
+        return cls(records, aliases, **kwargs)
+
+    @classmethod
+    def from_csv(cls, path: str, key_column: str, value_column: str, **kwargs):
+        with open(path, newline="", encoding="utf-8") as f:
+            return cls.from_rows(csv.DictReader(f), key_column, value_column, **kwargs)
+
+    @classmethod
+    def from_json(
+        cls, path: str, key_column: str = "key", value_column: str = "value", **kwargs
+    ):
+        """Load a {key: value} object or a list of row objects."""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            aliases = kwargs.pop("aliases", None)
+            return cls(data, aliases, **kwargs)
+        return cls.from_rows(data, key_column, value_column, **kwargs)
+
+
+CITY_ALIASES = {
+    "NYC": "New York",
+    "NY": "New York",
+    "New York City": "New York",
+    "LA": "Los Angeles",
+    "L.A.": "Los Angeles",
+    "Chi-Town": "Chicago",
+}
+
+# Flight numbers must match exactly (up to case and spacing): "AA12" is not "AA123".
+FLIGHT_STATUS = TravelDataStore(
+    {"AA123": "On time", "DL456": "Delayed", "UA789": "Cancelled"},
+    prefix=False,
+    fuzzy=False,
+)
+
+HOTELS = TravelDataStore(
+    {
+        "New York": "Top hotel in New York: The Plaza - 5 stars",
+        "Los Angeles": "Top hotel in Los Angeles: The Beverly Hills Hotel - 5 stars",
+        "Chicago": "Top hotel in Chicago: The Langham - 5 stars",
+    },
+    CITY_ALIASES,
+)
+
+TRAVEL_ADVICE = TravelDataStore(
+    {
+        "New York": "Travel advice for New York: Visit Central Park and Times Square.",
+        "Los Angeles": "Travel advice for Los Angeles: Check out Hollywood and Santa Monica Pier.",
+        "Chicago": "Travel advice for Chicago: Don't miss the Art Institute and Millennium Park.",
+    },
+    CITY_ALIASES,
+)
+
+ACTIVITIES = TravelDataStore(
+    {
+        "Paris": "Visit the Eiffel Tower and the Louvre Museum.",
+        "New York": "See Times Square and Central Park.",
+        "Tokyo": "Explore the Shibuya Crossing and the Senso-ji Temple.",
+    },
+    CITY_ALIASES,
+)
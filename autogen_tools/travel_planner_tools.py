@@ -1,9 +1,15 @@
 import os
 from autogen import ConversableAgent, AssistantAgent, UserProxyAgent
-from typing import Annotated
+from typing import Annotated, List
+
+import numpy as np
 
 from dotenv import load_dotenv
 
+from tool_cache import tool_cache
+from tool_registry import ToolRegistry
+from travel_data import ACTIVITIES
+
 load_dotenv()
 
 model = "gpt-3.5-turbo"
@@ -31,13 +37,56 @@ def convert_currency(
     return f"${amount} USD is approximately €{converted_amount:.2f} EUR."
 
 
+# Batch variants: a multi-leg itinerary is priced or timed in one tool call
+# instead of one LLM turn per leg.
+def calculate_travel_time_batch(
+    distances: Annotated[List[float], "Distance of each leg in kilometers"],
+    speeds: Annotated[
+        List[float], "Speed of each leg in km/h, or a single speed for all legs"
+    ],
+) -> str:
+    distance = np.asarray(distances, dtype=float)
+    speed = np.asarray(speeds, dtype=float)
+    if speed.size not in (1, distance.size):
+        return f"Error: got {distance.size} distances but {speed.size} speeds."
+    if np.any(speed <= 0):
+        return "Error: speeds must be positive."
+    speed = np.broadcast_to(speed, distance.shape)
+    hours = distance / speed
+    rows = [
+        f"{i}|{d:g}|{v:g}|{h:.2f}"
+        for i, (d, v, h) in enumerate(zip(distance, speed, hours), start=1)
+    ]
+    return "\n".join(
+        ["leg|km|km/h|hours"] + rows + [f"total|{distance.sum():g}||{hours.sum():.2f}"]
+    )
+
+
+def convert_currency_batch(
+    amounts: Annotated[List[float], "Amounts in USD"],
+    rates: Annotated[
+        List[float], "Exchange rate to EUR for each amount, or a single rate for all"
+    ],
+) -> str:
+    amount = np.asarray(amounts, dtype=float)
+    rate = np.asarray(rates, dtype=float)
+    if rate.size not in (1, amount.size):
+        return f"Error: got {amount.size} amounts but {rate.size} rates."
+    rate = np.broadcast_to(rate, amount.shape)
+    converted = amount * rate
+    rows = [
+        f"{i}|{a:.2f}|{r:g}|{c:.2f}"
+        for i, (a, r, c) in enumerate(zip(amount, rate, converted), start=1)
+    ]
+    return "\n".join(
+        ["item|USD|rate|EUR"]
+        + rows
+        + [f"total|{amount.sum():.2f}||{converted.sum():.2f}"]
+    )
+
+
 def suggest_activity(location: Annotated[str, "Location"]) -> str:
-    activities = {
-        "Paris": "Visit the Eiffel Tower and the Louvre Museum.",
-        "New York": "See Times Square and Central Park.",
-        "Tokyo": "Explore the Shibuya Crossing and the Senso-ji Temple.",
-    }
-    return activities.get(location, f"No specific activities found for {location}.")
+    return ACTIVITIES.get(location, f"No specific activities found for {location}.")
 
 
 # Define the assistant agent that suggests tool calls.
@@ -55,25 +104,59 @@ user_proxy = ConversableAgent(
     human_input_mode="TERMINATE",
 )
 
-# Register the tool signatures with the assistant agent.
-assistant.register_for_llm(
+# Register the tool signatures with a registry instead of the assistant's llm_config,
+# so each request only carries the schemas relevant to the latest message.
+tool_registry = ToolRegistry(model=model)
+tool_registry.register(
     name="calculate_travel_time",
     description="Calculate travel time based on distance and speed",
+    keywords=["km", "hours", "long", "far", "drive"],
 )(calculate_travel_time)
-assistant.register_for_llm(
-    name="convert_currency", description="Convert USD to EUR based on exchange rate"
+tool_registry.register(
+    name="convert_currency",
+    description="Convert USD to EUR based on exchange rate",
+    keywords=["dollars", "euros", "money", "price", "cost", "budget"],
 )(convert_currency)
-assistant.register_for_llm(
-    name="suggest_activity", description="Suggest activities for a specific location"
+tool_registry.register(
+    name="calculate_travel_time_batch",
+    description="Calculate travel times for many legs at once; use for multi-leg trips",
+    keywords=["km", "hours", "legs", "itinerary", "route"],
+)(calculate_travel_time_batch)
+tool_registry.register(
+    name="convert_currency_batch",
+    description="Convert many USD amounts to EUR at once; use for itineraries and budgets",
+    keywords=["dollars", "euros", "prices", "costs", "budget", "legs", "itinerary"],
+)(convert_currency_batch)
+tool_registry.register(
+    name="suggest_activity",
+    description="Suggest activities for a specific location",
+    keywords=["do", "see", "visit", "trip", "things"],
 )(suggest_activity)
+tool_registry.attach(assistant)
 
 
 # Register the tool functions with the user proxy agent.
-user_proxy.register_for_execution(name="calculate_travel_time")(calculate_travel_time)
-user_proxy.register_for_execution(name="convert_currency")(convert_currency)
-user_proxy.register_for_execution(name="suggest_activity")(suggest_activity)
+# All tools are pure functions of their arguments, so their results are cached.
+tool_cache.register_for_execution(user_proxy, name="calculate_travel_time", pure=True)(
+    calculate_travel_time
+)
+tool_cache.register_for_execution(user_proxy, name="convert_currency", pure=True)(
+    convert_currency
+)
+tool_cache.register_for_execution(
+    user_proxy, name="calculate_travel_time_batch", pure=True
+)(calculate_travel_time_batch)
+tool_cache.register_for_execution(user_proxy, name="convert_currency_batch", pure=True)(
+    convert_currency_batch
+)
+tool_cache.register_for_execution(user_proxy, name="suggest_activity", pure=True)(
+    suggest_activity
+)
 
 # Example conversation with the assistant
-user_proxy.initiate_chat(
+chat_result = user_proxy.initiate_chat(
     assistant, message="I am planning a trip to Paris. What should I do there?"
 )
+tool_registry.print_report()
+tool_cache.add_to_chat_cost(chat_result)
+tool_cache.print_usage_summary()
@@ -3,6 +3,12 @@ from autogen import ConversableAgent
 from typing import Annotated
 from dotenv import load_dotenv
 
+from parallel_tools import ParallelToolExecutor
+from termination import termination_check
+from tool_cache import tool_cache
+from tool_registry import ToolRegistry
+from travel_data import FLIGHT_STATUS, HOTELS, TRAVEL_ADVICE
+
 load_dotenv()
 
 model = "gpt-3.5-turbo"
@@ -13,27 +19,18 @@ llm_config = {
 }
 
 
+# The lookups are served from the preloaded stores in travel_data.py, which also
+# resolve "new york", "NYC" or small typos to the right entry.
 def get_flight_status(flight_number: Annotated[str, "Flight number"]) -> str:
-    dummy_data = {"AA123": "On time", "DL456": "Delayed", "UA789": "Cancelled"}
-    return f"The current status of flight {flight_number} is {dummy_data.get(flight_number, 'unknown')}."
+    return f"The current status of flight {flight_number} is {FLIGHT_STATUS.get(flight_number, 'unknown')}."
 
 
 def get_hotel_info(location: Annotated[str, "Location"]) -> str:
-    dummy_data = {
-        "New York": "Top hotel in New York: The Plaza - 5 stars",
-        "Los Angeles": "Top hotel in Los Angeles: The Beverly Hills Hotel - 5 stars",
-        "Chicago": "Top hotel in Chicago: The Langham - 5 stars",
-    }
-    return dummy_data.get(location, f"No hotels found in {location}.")
+    return HOTELS.get(location, f"No hotels found in {location}.")
 
 
 def get_travel_advice(location: Annotated[str, "Location"]) -> str:
-    dummy_data = {
-        "New York": "Travel advice for New York: Visit Central Park and Times Square.",
-        "Los Angeles": "Travel advice for Los Angeles: Check out Hollywood and Santa Monica Pier.",
-        "Chicago": "Travel advice for Chicago: Don't miss the Art Institute and Millennium Park.",
-    }
-    return dummy_data.get(location, f"No travel advice available for {location}.")
+    return TRAVEL_ADVICE.get(location, f"No travel advice available for {location}.")
 
 
 # Define the assistant agent that suggests tool calls.
@@ -53,30 +50,49 @@ assistant = ConversableAgent(
 # The user proxy agent is used for interacting with the assistant agent and executes tool calls.
 user_proxy = ConversableAgent(
     name="User",
-    is_termination_msg=lambda msg: msg.get("content") is not None
-    and "TERMINATE" in msg["content"],
+    # Stops on TERMINATE, but also on repeated replies and repeated tool calls.
+    is_termination_msg=termination_check(),
     human_input_mode="NEVER",
 )
 
-# Register the tool signatures with the assistant agent.
-assistant.register_for_llm(
+# Register the tool signatures with a registry instead of the assistant's llm_config,
+# so each request only carries the schemas relevant to the latest message.
+tool_registry = ToolRegistry(model=model)
+tool_registry.register(
     name="get_flight_status",
     description="Get the current status of a flight based on the flight number",
 )(get_flight_status)
-assistant.register_for_llm(
+tool_registry.register(
     name="get_hotel_info",
     description="Get information about hotels in a specific location",
 )(get_hotel_info)
-assistant.register_for_llm(
+tool_registry.register(
     name="get_travel_advice", description="Get travel advice for a specific location"
 )(get_travel_advice)
+tool_registry.attach(assistant)
 
 # Register the tool functions with the user proxy agent.
-user_proxy.register_for_execution(name="get_flight_status")(get_flight_status)
-user_proxy.register_for_execution(name="get_hotel_info")(get_hotel_info)
-user_proxy.register_for_execution(name="get_travel_advice")(get_travel_advice)
+# The lookups are cached: flight status changes, so it is only cached for a few minutes.
+tool_cache.register_for_execution(user_proxy, name="get_flight_status", ttl=300)(
+    get_flight_status
+)
+tool_cache.register_for_execution(user_proxy, name="get_hotel_info", ttl=3600)(
+    get_hotel_info
+)
+tool_cache.register_for_execution(user_proxy, name="get_travel_advice", pure=True)(
+    get_travel_advice
+)
+
+# Run the tool calls of one assistant message (e.g. hotel info and flight status) concurrently.
+tool_executor = ParallelToolExecutor(timeout=10)
+tool_executor.attach(user_proxy)
 
-user_proxy.initiate_chat(
+chat_result = user_proxy.initiate_chat(
     assistant,
     message="I need help with my travel plans. Can you help me? I am traveling to New York. I need hotel information. Also give me the status of my flight AA123.",
 )
+
+tool_executor.print_timings()
+tool_registry.print_report()
+tool_cache.add_to_chat_cost(chat_result)
+tool_cache.print_usage_summary()
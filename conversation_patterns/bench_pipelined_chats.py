@@ -0,0 +1,90 @@
+import time
+from autogen import ConversableAgent
+
+from pipelined_chats import initiate_chats_pipelined
+from stand_in_llm import StandInModelClient, stand_in_llm_config
+
+# Benchmark: the four chats of seq_chat_agents.py run with initiate_chats
+# (strictly sequential) and with initiate_chats_pipelined, both against the
+# stand-in LLM. As in the example, the last three chats carry over only the first
+# chat's summary, so the pipelined run starts them concurrently after it; the
+# sequential run passes them all earlier summaries.
+
+LATENCY = 0.5
+
+
+def build_agents():
+    llm_config = stand_in_llm_config(latency=LATENCY)
+    agents = {}
+    for name, system_message in [
+        ("Initial_Agent", "You return me the text I give you."),
+        ("Uppercase_Agent", "You convert the text I give you to uppercase."),
+        ("WordCount_Agent", "You count the number of words in the text I give you."),
+        ("ReverseText_Agent", "You reverse the text I give you."),
+        ("Summarize_Agent", "You summarize the text I give you."),
+    ]:
+        agent = ConversableAgent(
+            name=name,
+            system_message=system_message,
+            llm_config=llm_config,
+            human_input_mode="NEVER",
+        )
+        agent.register_model_client(model_client_cls=StandInModelClient)
+        agents[name] = agent
+    return agents
+
+
+def build_chat_queue(agents):
+    return [
+        {
+            "recipient": agents["Uppercase_Agent"],
+            "message": "This is a sample text document.",
+            "max_turns": 1,
+            "summary_method": "last_msg",
+            "silent": True,
+        },
+        {
+            "recipient": agents["WordCount_Agent"],
+            "message": "These are my numbers",
+            "carryover_from": [0],
+            "max_turns": 1,
+            "summary_method": "last_msg",
+            "silent": True,
+        },
+        {
+            "recipient": agents["ReverseText_Agent"],
+            "message": "These are my numbers",
+            "carryover_from": [0],
+            "max_turns": 1,
+            "summary_method": "last_msg",
+            "silent": True,
+        },
+        {
+            "recipient": agents["Summarize_Agent"],
+            "message": "These are my numbers",
+            "carryover_from": [0],
+            "max_turns": 1,
+            "summary_method": "last_msg",
+            "silent": True,
+        },
+    ]
+
+
+def run(label, initiate):
+    agents = build_agents()
+    start = time.perf_counter()
+    results = initiate(agents["Initial_Agent"], build_chat_queue(agents))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} {elapsed:6.2f}s  ({len(results)} chats)")
+    return results, elapsed
+
+
+if __name__ == "__main__":
+    print(f"Stand-in LLM latency: {LATENCY}s per call")
+    sequential, t_seq = run(
+        "sequential", lambda sender, queue: sender.initiate_chats(queue)
+    )
+    pipelined, t_pipe = run("pipelined", initiate_chats_pipelined)
+    print(f"speed-up:    {t_seq / t_pipe:6.2f}x")
+    for i, result in enumerate(pipelined):
+        print(f"Chat {i + 1} summary: {result.summary[:70]}")
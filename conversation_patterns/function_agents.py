@@ -0,0 +1,174 @@
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from autogen import Agent, ConversableAgent
+from autogen.oai.openai_utils import OAI_PRICE1K
+from autogen.token_count_utils import count_token
+
+# Function-backed agents answer from a registered Python callable instead of an LLM.
+# They are regular ConversableAgents, so they can be used as recipients in
+# initiate_chat/initiate_chats or as members of a GroupChat. Mechanical transforms
+# (uppercasing, counting words, simple arithmetic, ...) then cost microseconds
+# instead of an LLM round-trip.
+
+
+class FunctionAgent(ConversableAgent):
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[str], Any],
+        description: Optional[str] = None,
+        **kwargs,
+    ):
+        super().__init__(
+            name=name,
+            llm_config=False,
+            code_execution_config=False,
+            human_input_mode="NEVER",
+            description=description or func.__doc__ or _default_description(name, func),
+            **kwargs,
+        )
+        self.func = func
+        # The system message of the LLM agent this one stands in for; used to estimate savings.
+        self.replaced_system_message = ""
+        self.calls: List[Dict[str, Any]] = []
+        # Reply after the termination/human-input check, before tool and LLM replies.
+        position = next(
+            i + 1
+            for i, entry in enumerate(self._reply_func_list)
+            if entry["reply_func"] is ConversableAgent.check_termination_and_human_reply
+        )
+        self.register_reply(
+            [Agent, None], FunctionAgent.generate_function_reply, position=position
+        )
+
+    def generate_function_reply(
+        self,
+        messages: Optional[List[Dict]] = None,
+        sender: Optional[Agent] = None,
+        config: Optional[Any] = None,
+    ):
+        if messages is None:
+            messages = self._oai_messages[sender]
+        content = messages[-1].get("content") if messages else None
+        if content is None:
+            return False, None
+        start = time.perf_counter()
+        reply = str(self.func(content))
+        self.calls.append(
+            {
+                "seconds": time.perf_counter() - start,
+                "messages": [
+                    {"role": "system", "content": self.replaced_system_message}
+                ]
+                + messages,
+                "reply": reply,
+            }
+        )
+        return True, reply
+
+
+class MechanicalTaskRouter:
+    """Sends mechanical sub-tasks to FunctionAgents and reports what the LLM calls would have cost."""
+
+    def __init__(self, model: str = "gpt-3.5-turbo", llm_latency: float = 1.0):
+        self.model = model
+        # Assumed latency of one LLM round-trip, used for the latency saved estimate.
+        self.llm_latency = llm_latency
+        self._replacements: Dict[Agent, FunctionAgent] = {}
+        self._patterns: List[tuple] = []
+
+    def register(
+        self,
+        agent: FunctionAgent,
+        replaces: Optional[ConversableAgent] = None,
+        pattern: Optional[str] = None,
+    ) -> FunctionAgent:
+        if replaces is None and pattern is None:
+            raise ValueError("Either replaces or pattern must be given.")
+        if replaces is not None:
+            self._replacements[replaces] = agent
+        if pattern is not None:
+            self._patterns.append((re.compile(pattern, re.IGNORECASE), agent))
+        return agent
+
+    def route(self, chat_info: Dict[str, Any]) -> Dict[str, Any]:
+        """Return the chat entry with its recipient swapped for a FunctionAgent if one applies."""
+        recipient = chat_info["recipient"]
+        agent = self._replacements.get(recipient)
+        message = chat_info.get("message")
+        if agent is None and isinstance(message, str):
+            agent = next((a for p, a in self._patterns if p.search(message)), None)
+        if agent is None:
+            return chat_info
+        if isinstance(recipient, ConversableAgent):
+            agent.replaced_system_message = recipient.system_message
+        # The function's answer is final: a second turn would only have the sender
+        # (usually an LLM agent) reply to it.
+        routed = dict(chat_info, recipient=agent, max_turns=1)
+        return routed
+
+    def route_all(self, chat_queue: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [self.route(chat_info) for chat_info in chat_queue]
+
+    def report(self) -> Dict[str, Any]:
+        agents = set(self._replacements.values()) | {a for _, a in self._patterns}
+        prompt_price, completion_price = _price_per_1k(self.model)
+        per_agent = {}
+        for agent in sorted(agents, key=lambda a: a.name):
+            prompt_tokens = sum(
+                count_token(c["messages"], self.model) for c in agent.calls
+            )
+            completion_tokens = sum(
+                count_token(c["reply"], self.model) for c in agent.calls
+            )
+            function_seconds = sum(c["seconds"] for c in agent.calls)
+            per_agent[agent.name] = {
+                "llm_calls_avoided": len(agent.calls),
+                "prompt_tokens_avoided": prompt_tokens,
+                "completion_tokens_avoided": completion_tokens,
+                "cost_saved": (
+                    prompt_tokens * prompt_price + completion_tokens * completion_price
+                )
+                / 1000,
+                "latency_saved": len(agent.calls) * self.llm_latency - function_seconds,
+            }
+        return {
+            "agents": per_agent,
+            "llm_calls_avoided": sum(
+                a["llm_calls_avoided"] for a in per_agent.values()
+            ),
+            "cost_saved": sum(a["cost_saved"] for a in per_agent.values()),
+            "latency_saved": sum(a["latency_saved"] for a in per_agent.values()),
+        }
+
+    def print_report(self) -> None:
+        report = self.report()
+        print(
+            f"Mechanical task routing ({self.model}, {self.llm_latency:.1f}s per LLM call assumed):"
+        )
+        for name, stats in report["agents"].items():
+            print(
+                f"  {name}: {stats['llm_calls_avoided']} LLM calls avoided, "
+                f"~${stats['cost_saved']:.5f} and ~{stats['latency_saved']:.2f}s saved"
+            )
+        print(
+            f"  pipeline total: {report['llm_calls_avoided']} LLM calls, "
+            f"~${report['cost_saved']:.5f}, ~{report['latency_saved']:.2f}s saved"
+        )
+
+
+def _default_description(name: str, func: Callable) -> str:
+    # Lambdas and partials have no useful __name__; fall back to the agent's name.
+    func_name = getattr(func, "__name__", "<lambda>")
+    if func_name == "<lambda>":
+        return f"{name} answers with a Python function instead of an LLM."
+    return f"{name} answers with {func_name}."
+
+
+def _price_per_1k(model: str):
+    price = OAI_PRICE1K.get(model, 0.0)
+    if isinstance(price, tuple):
+        return price
+    return price, price
@@ -0,0 +1,78 @@
+import asyncio
+from typing import Any, Dict, List, Set
+
+# Pipelined version of ConversableAgent.initiate_chats.
+#
+# initiate_chats runs every chat after the previous one and passes all earlier
+# summaries as carryover. Here each entry only waits for the chats it depends on,
+# and independent entries run concurrently. An entry carries over:
+#   - the summaries of all earlier entries, as in initiate_chats (the default, or
+#     "carryover_from": "all"), or
+#   - only those of the entries listed in its "carryover_from" key (a list of
+#     indexes; [] carries over nothing). A callable "message" may read any history,
+#     so such entries always wait for all earlier entries.
+# Besides the chats it carries over from, an entry waits for the previous entry with
+# the same recipient (an agent holds one history per peer).
+# Without "carryover_from" lists nothing runs concurrently; entries that opt out see
+# fewer summaries than with initiate_chats, so their output can differ.
+# Results are returned as a list in the order of the chat queue.
+
+
+def chat_carryover(chat_queue: List[Dict[str, Any]]) -> List[List[int]]:
+    """Return, per entry, the indexes of the earlier chats whose summaries it carries over."""
+    carryovers = []
+    for i, chat_info in enumerate(chat_queue):
+        carryover_from = chat_info.get("carryover_from", "all")
+        if carryover_from == "all":
+            carryovers.append(list(range(i)))
+            continue
+        if any(d >= i or d < 0 for d in carryover_from):
+            raise ValueError(
+                f"Chat {i} can only carry over from earlier chats, got {sorted(carryover_from)}."
+            )
+        carryovers.append(sorted(set(carryover_from)))
+    return carryovers
+
+
+def chat_dependencies(chat_queue: List[Dict[str, Any]]) -> List[Set[int]]:
+    """Return, per entry, the indexes of the earlier chats it has to wait for."""
+    dependencies = []
+    last_index_by_recipient = {}
+    for i, (chat_info, carryover) in enumerate(
+        zip(chat_queue, chat_carryover(chat_queue))
+    ):
+        if callable(chat_info.get("message")):
+            deps = set(range(i))
+        else:
+            deps = set(carryover)
+        recipient = chat_info["recipient"]
+        if recipient in last_index_by_recipient:
+            deps.add(last_index_by_recipient[recipient])
+        last_index_by_recipient[recipient] = i
+        dependencies.append(deps)
+    return dependencies
+
+
+async def a_initiate_chats_pipelined(sender, chat_queue: List[Dict[str, Any]]) -> List:
+    carryovers = chat_carryover(chat_queue)
+    dependencies = chat_dependencies(chat_queue)
+    tasks: List[asyncio.Task] = []
+
+    async def run_chat(i: int, chat_info: Dict[str, Any]):
+        await asyncio.gather(*(tasks[d] for d in sorted(dependencies[i])))
+        chat_info = {k: v for k, v in chat_info.items() if k != "carryover_from"}
+        carryover = chat_info.get("carryover", [])
+        if isinstance(carryover, str):
+            carryover = [carryover]
+        chat_info["carryover"] = carryover + [
+            tasks[d].result().summary for d in carryovers[i]
+        ]
+        return await sender.a_initiate_chat(**chat_info)
+
+    for i, chat_info in enumerate(chat_queue):
+        tasks.append(asyncio.ensure_future(run_chat(i, chat_info)))
+    return list(await asyncio.gather(*tasks))
+
+
+def initiate_chats_pipelined(sender, chat_queue: List[Dict[str, Any]]) -> List:
+    return asyncio.run(a_initiate_chats_pipelined(sender, chat_queue))
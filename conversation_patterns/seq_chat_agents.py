@@ -3,6 +3,9 @@ from autogen import ConversableAgent
 from typing import Annotated
 from dotenv import load_dotenv
 
+from function_agents import FunctionAgent, MechanicalTaskRouter
+from pipelined_chats import initiate_chats_pipelined
+
 load_dotenv()
 
 model = "gpt-3.5-turbo"
@@ -53,39 +56,74 @@ summarize_agent = ConversableAgent(
     human_input_mode="NEVER",
 )
 
+# Uppercasing, counting words and reversing text are plain Python operations,
+# so the router hands those chats to function-backed agents instead of the LLM.
+# Every chat in this example is a single request and reply (max_turns 1): a second
+# turn would only have Initial_Agent answer the reply with another LLM call.
+router = MechanicalTaskRouter(model=model)
+router.register(
+    FunctionAgent(name="Uppercase_Function", func=str.upper),
+    replaces=uppercase_agent,
+)
+router.register(
+    FunctionAgent(
+        name="WordCount_Function",
+        func=lambda text: f"The text contains {len(text.split())} words.",
+    ),
+    replaces=word_count_agent,
+)
+router.register(
+    FunctionAgent(name="ReverseText_Function", func=lambda text: text[::-1]),
+    replaces=reverse_text_agent,
+)
+
 # Start a sequence of two-agent chats.
 # Each element in the list is a dictionary that specifies the arguments
 # for the initiate_chat method.
-chat_results = initial_agent.initiate_chats(
-    [
-        {
-            "recipient": uppercase_agent,
-            "message": "This is a sample text document.",
-            "max_turns": 2,
-            "summary_method": "last_msg",
-        },
-        {
-            "recipient": word_count_agent,
-            "message": "These are my numbers",
-            "max_turns": 2,
-            "summary_method": "last_msg",
-        },
-        {
-            "recipient": reverse_text_agent,
-            "message": "These are my numbers",
-            "max_turns": 2,
-            "summary_method": "last_msg",
-        },
-        {
-            "recipient": summarize_agent,
-            "message": "These are my numbers",
-            "max_turns": 2,
-            "summary_method": "last_msg",
-        },
-    ]
+# Like initiate_chats, the pipelined runner passes all earlier summaries as
+# carryover unless an entry lists the chats it needs in "carryover_from". The last
+# three chats only take the uppercased text from the first one, so they run
+# concurrently once it is done; results keep the order of the list.
+# Unlike with initiate_chats, the Reverse Text and Summarize chats no longer see
+# the word count (and the Summarize chat the reversed text), so their output differs.
+chat_results = initiate_chats_pipelined(
+    initial_agent,
+    router.route_all(
+        [
+            {
+                "recipient": uppercase_agent,
+                "message": "This is a sample text document.",
+                "max_turns": 1,
+                "summary_method": "last_msg",
+            },
+            {
+                "recipient": word_count_agent,
+                "message": "These are my numbers",
+                "carryover_from": [0],
+                "max_turns": 1,
+                "summary_method": "last_msg",
+            },
+            {
+                "recipient": reverse_text_agent,
+                "message": "These are my numbers",
+                "carryover_from": [0],
+                "max_turns": 1,
+                "summary_method": "last_msg",
+            },
+            {
+                "recipient": summarize_agent,
+                "message": "These are my numbers",
+                "carryover_from": [0],
+                "max_turns": 1,
+                "summary_method": "last_msg",
+            },
+        ],
+    ),
 )
 
 print("First Chat Summary: ", chat_results[0].summary)
 print("Second Chat Summary: ", chat_results[1].summary)
 print("Third Chat Summary: ", chat_results[2].summary)
 print("Fourth Chat Summary: ", chat_results[3].summary)
+
+router.print_report()
@@ -0,0 +1,75 @@
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+# A stand-in model client for running the conversation patterns without an API key.
+# It follows AutoGen's ModelClient protocol, sleeps for a fixed latency to simulate a
+# network round-trip and answers deterministically, so benchmarks are repeatable.
+#
+# Usage:
+#     agent = ConversableAgent(name="Agent", llm_config=stand_in_llm_config(latency=0.5))
+#     agent.register_model_client(model_client_cls=StandInModelClient)
+
+
+def stand_in_llm_config(
+    latency: float = 0.5, price_per_1k: float = 0.002
+) -> Dict[str, Any]:
+    return {
+        "config_list": [
+            {
+                "model": "stand-in",
+                "model_client_cls": "StandInModelClient",
+                "latency": latency,
+                "price_per_1k": price_per_1k,
+            }
+        ],
+        "cache_seed": None,
+    }
+
+
+def _approx_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class StandInModelClient:
+    def __init__(self, config: Dict[str, Any], **kwargs):
+        self.model = config.get("model", "stand-in")
+        self.latency = config.get("latency", 0.5)
+        self.price_per_1k = config.get("price_per_1k", 0.002)
+
+    def create(self, params: Dict[str, Any]) -> SimpleNamespace:
+        time.sleep(self.latency)
+        messages: List[Dict[str, Any]] = params.get("messages", [])
+        prompt = "\n".join(str(m.get("content") or "") for m in messages)
+        last = next(
+            (m.get("content") for m in reversed(messages) if m.get("content")), ""
+        )
+        content = f"Stand-in reply to: {last[:200]}"
+        message = SimpleNamespace(content=content, function_call=None, tool_calls=None)
+        prompt_tokens = _approx_tokens(prompt)
+        completion_tokens = _approx_tokens(content)
+        return SimpleNamespace(
+            model=self.model,
+            choices=[SimpleNamespace(message=message)],
+            usage=SimpleNamespace(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens,
+            ),
+        )
+
+    def message_retrieval(self, response) -> List[str]:
+        return [choice.message.content for choice in response.choices]
+
+    def cost(self, response) -> float:
+        return response.usage.total_tokens / 1000 * self.price_per_1k
+
+    @staticmethod
+    def get_usage(response) -> Dict[str, Any]:
+        return {
+            "prompt_tokens": response.usage.prompt_tokens,
+            "completion_tokens": response.usage.completion_tokens,
+            "total_tokens": response.usage.total_tokens,
+            "cost": response.cost,
+            "model": response.model,
+        }
@@ -0,0 +1,146 @@
+import argparse
+import contextlib
+import io
+import logging
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+from autogen import ConversableAgent, GroupChat, GroupChatManager
+
+from prompt_prefix import MIN_CACHEABLE_TOKENS, PromptPrefix
+
+# Benchmark: prefix reuse of the group chat in group_chat_in_seq.py with
+# PromptPrefix versus AutoGen's default prompt layout. The agents answer with a
+# local, deterministic client (no API key, no network) and speakers are picked
+# round robin, so every run sends the same prompts. Only shared prefixes of at
+# least MIN_CACHEABLE_TOKENS count as reused, as with the provider's cache.
+#
+# The example's one-line system messages never reach that minimum. Use
+# --instruction-words to give every agent longer instructions, as real
+# specialist agents have. The introductions, the part PromptPrefix shares across
+# agents, list the agents' descriptions. With --no-descriptions the agents keep
+# AutoGen's default description (their system message), so the instructions end
+# up in the introductions as well.
+#
+# Usage:
+#     python bench_prompt_prefix.py --instruction-words 0 300 600
+#     python bench_prompt_prefix.py --instruction-words 0 300 600 --no-descriptions
+
+ROUNDS_PER_CHAT = 6
+
+AGENTS = [
+    ("Flight_Agent", "You provide the best flight options for the given destination and dates.", "Provides flight options."),
+    ("Hotel_Agent", "You suggest the best hotels for the given destination and dates.", "Suggests hotel options."),
+    ("Activity_Agent", "You recommend activities and attractions to visit at the destination.", "Recommends activities and attractions."),
+    ("Restaurant_Agent", "You suggest the best restaurants to dine at in the destination.", "Recommends restaurants."),
+    ("Weather_Agent", "You provide the weather forecast for the travel dates.", "Provides weather forecast."),
+]
+
+
+class FixedReplyClient:
+    # Answers with reply_words words derived from the number of messages in the prompt.
+    def __init__(self, config: Dict[str, Any], **kwargs):
+        self.model = config["model"]
+        self.reply_words = config["reply_words"]
+
+    def create(self, params: Dict[str, Any]) -> SimpleNamespace:
+        messages: List[Dict[str, Any]] = params.get("messages", [])
+        words = [f"option{(len(messages) * 7 + i) % 97}" for i in range(self.reply_words)]
+        message = SimpleNamespace(content=" ".join(words), function_call=None, tool_calls=None)
+        return SimpleNamespace(model=self.model, choices=[SimpleNamespace(message=message)], usage=None)
+
+    def message_retrieval(self, response) -> List[str]:
+        return [choice.message.content for choice in response.choices]
+
+    def cost(self, response) -> float:
+        return 0.0
+
+    @staticmethod
+    def get_usage(response) -> Dict[str, Any]:
+        return {}
+
+
+def run(instruction_words: int, reply_words: int, descriptions: bool = True) -> PromptPrefix:
+    llm_config = {
+        "config_list": [
+            {
+                "model": "gpt-3.5-turbo",
+                "model_client_cls": "FixedReplyClient",
+                "reply_words": reply_words,
+            }
+        ],
+        "cache_seed": None,
+    }
+    agents = []
+    for name, system_message, description in AGENTS:
+        instructions = " ".join(
+            f"{name.lower()}-rule{i}" for i in range(instruction_words)
+        )
+        agent = ConversableAgent(
+            name=name,
+            system_message=f"{system_message} {instructions}".strip(),
+            llm_config=llm_config,
+            description=description if descriptions else None,
+            human_input_mode="NEVER",
+        )
+        agent.register_model_client(model_client_cls=FixedReplyClient)
+        agents.append(agent)
+
+    group_chat = GroupChat(
+        agents=agents,
+        messages=[],
+        max_round=ROUNDS_PER_CHAT,
+        send_introductions=True,
+        speaker_selection_method="round_robin",
+    )
+    manager = GroupChatManager(groupchat=group_chat, llm_config=False)
+    prompt_prefix = PromptPrefix(model="gpt-3.5-turbo")
+    prompt_prefix.attach(group_chat)
+
+    planner = ConversableAgent(
+        name="Travel_Planner_Agent",
+        llm_config=False,
+        human_input_mode="NEVER",
+        default_auto_reply="Thanks.",
+    )
+    # The chat transcript is not part of the result
+    with contextlib.redirect_stdout(io.StringIO()):
+        planner.initiate_chats(
+            [
+                {
+                    "recipient": manager,
+                    "message": "I'm planning a trip to Paris for the first week of September. Can you help me plan? I will be leaving from Miami and will stay for a week.",
+                    "max_turns": 1,
+                    "summary_method": "last_msg",
+                    "silent": True,
+                },
+                {
+                    "recipient": manager,
+                    "message": "Please refine the plan with additional details.",
+                    "max_turns": 1,
+                    "summary_method": "last_msg",
+                    "silent": True,
+                },
+            ]
+        )
+    return prompt_prefix
+
+
+if __name__ == "__main__":
+    # AutoGen logs every registration of the custom client
+    logging.getLogger("autogen.oai.client").setLevel(logging.WARNING)
+    parser = argparse.ArgumentParser(description="Prompt prefix reuse in a group chat")
+    parser.add_argument("--instruction-words", type=int, nargs="+", default=[0, 300, 600],
+                        help="Extra words in every agent's system message (one run per value)")
+    parser.add_argument("--reply-words", type=int, default=120, help="Words per agent reply")
+    parser.add_argument("--no-descriptions", action="store_true",
+                        help="Introduce the agents with their system messages instead of short descriptions")
+    args = parser.parse_args()
+
+    for instruction_words in args.instruction_words:
+        print(
+            f"\n{len(AGENTS)} agents, {ROUNDS_PER_CHAT} rounds per chat, two chats, "
+            f"{instruction_words} extra instruction words per agent, {args.reply_words} words per reply, "
+            f"cacheable from {MIN_CACHEABLE_TOKENS} tokens"
+        )
+        run(instruction_words, args.reply_words, not args.no_descriptions).print_report()
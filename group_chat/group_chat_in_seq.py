@@ -2,6 +2,10 @@ import os
 from autogen import ConversableAgent, GroupChat, GroupChatManager
 from dotenv import load_dotenv
 
+from prompt_prefix import PromptPrefix
+from tiered_summary import TieredSummary
+from usage_budget import budget_check, print_usage
+
 load_dotenv()
 
 model = "gpt-3.5-turbo"
@@ -11,6 +15,17 @@ llm_config = {
     "api_key": os.environ["OPENAI_API_KEY"],
 }
 
+# Chat summaries are extracted locally; a smaller model only polishes them when the
+# extract is too short, too long or misses key terms of the conversation.
+tiered_summary = TieredSummary(
+    polish_llm_config={
+        "model": "gpt-4o-mini",
+        "temperature": 0.0,
+        "api_key": os.environ["OPENAI_API_KEY"],
+    },
+    model=model,
+)
+
 
 # Group Chat in a Sequential Chat
 # Group chat can also be used as a part of a sequential chat.
@@ -63,9 +78,20 @@ group_chat_with_introductions = GroupChat(
 )
 
 # Create a Group Chat Manager
+# Stop the group chat once its agents and the manager, which selects the speakers,
+# have spent the budget.
+group_chat_agents = list(group_chat_with_introductions.agents)
 group_chat_manager_with_intros = GroupChatManager(
-    groupchat=group_chat_with_introductions, llm_config=llm_config
+    groupchat=group_chat_with_introductions,
+    llm_config=llm_config,
+    is_termination_msg=budget_check(group_chat_agents, max_cost=0.05),
 )
+group_chat_agents.append(group_chat_manager_with_intros)
+
+# Put the introductions, which are identical for every agent, at the start of each
+# prompt so the provider's prompt cache can reuse them across agents and chats.
+prompt_prefix = PromptPrefix(model=model)
+prompt_prefix.attach(group_chat_with_introductions)
 
 # Define a regular agent for the sequential chat
 travel_planner_agent = ConversableAgent(
@@ -81,12 +107,12 @@ chat_result = travel_planner_agent.initiate_chats(
         {
             "recipient": group_chat_manager_with_intros,
             "message": "I'm planning a trip to Paris for the first week of September. Can you help me plan? I will be leaving from Miami and will stay for a week.",
-            "summary_method": "reflection_with_llm",
+            "summary_method": tiered_summary,
         },
         {
             "recipient": group_chat_manager_with_intros,
             "message": "Please refine the plan with additional details.",
-            "summary_method": "reflection_with_llm",
+            "summary_method": tiered_summary,
         },
     ]
 )
@@ -94,6 +120,9 @@ chat_result = travel_planner_agent.initiate_chats(
 # Print the output of each agent in the sequential chat
 for result in chat_result:
     print(result.cost)
+print_usage(group_chat_agents + [travel_planner_agent])
+prompt_prefix.print_report()
+tiered_summary.print_report()
 
 # ========
 # Explanation
@@ -2,6 +2,9 @@ import os
 from autogen import ConversableAgent, GroupChat, GroupChatManager
 from dotenv import load_dotenv
 
+from progress_monitor import progress_check
+from tiered_summary import TieredSummary
+
 load_dotenv()
 
 model = "gpt-3.5-turbo"
@@ -11,6 +14,17 @@ llm_config = {
     "api_key": os.environ["OPENAI_API_KEY"],
 }
 
+# Chat summaries are extracted locally; a smaller model only polishes them when the
+# extract is too short, too long or misses key terms of the conversation.
+tiered_summary = TieredSummary(
+    polish_llm_config={
+        "model": "gpt-4o-mini",
+        "temperature": 0.0,
+        "api_key": os.environ["OPENAI_API_KEY"],
+    },
+    model=model,
+)
+
 # Define travel planning agents
 flight_agent = ConversableAgent(
     name="Flight_Agent",
@@ -59,11 +73,15 @@ group_chat = GroupChat(
 group_chat_manager = GroupChatManager(
     groupchat=group_chat,
     llm_config=llm_config,
+    # Stop agents from repeating each other until max_round
+    is_termination_msg=progress_check(),
 )
 
 # Initiate the chat with an initial message
 chat_result = weather_agent.initiate_chat(
     group_chat_manager,
     message="I'm planning a trip to Paris for the first week of September. Can you help me plan? I will be departuring from Miami",
-    summary_method="reflection_with_llm",
+    summary_method=tiered_summary,
 )
+print(chat_result.summary)
+tiered_summary.print_report()
@@ -0,0 +1,36 @@
+import re
+from typing import Callable, Dict
+
+# A small local progress check for the group chat examples.
+#
+# Agents in a GroupChat sometimes repeat each other until max_round is used up.
+# This check compares every new message with the last `window` messages (Jaccard
+# similarity of their word sets) and stops the chat after `patience` near-repeats
+# in a row. The Kali app (AutoGenchain - Kali/progress_monitor.py) has the full
+# monitor with MinHash signatures, redirects and events.
+#
+# Usage:
+#     manager = GroupChatManager(..., is_termination_msg=progress_check())
+
+
+def progress_check(
+    threshold: float = 0.8, patience: int = 2, window: int = 4
+) -> Callable[[Dict], bool]:
+    """Return an is_termination_msg function; use one per manager and chat."""
+    recent = []
+    repeats = 0
+
+    def is_termination_msg(message: Dict) -> bool:
+        nonlocal repeats
+        words = set(re.findall(r"\w+", (message.get("content") or "").lower()))
+        similarity = max(
+            (len(words & w) / len(words | w) for w in recent if words | w), default=0.0
+        )
+        recent[:] = (recent + [words])[-window:]
+        repeats = repeats + 1 if similarity >= threshold else 0
+        if repeats >= patience:
+            print(f"Stopping the chat: {patience} messages in a row repeat earlier ones")
+            return True
+        return "TERMINATE" in (message.get("content") or "")
+
+    return is_termination_msg
@@ -0,0 +1,172 @@
+import os
+from typing import Any, Dict, List, Optional
+
+from autogen import Agent, ConversableAgent, GroupChat
+from autogen.token_count_utils import count_token
+
+# Stable, cacheable prompt prefixes for group chat agents.
+#
+# With send_introductions=True every agent's prompt starts with its own system
+# message followed by the introduction message, so the longest prefix two agents
+# share is empty and provider prompt caching (which matches on exact prompt
+# prefixes) only helps within one agent's turns. PromptPrefix puts the content
+# that never changes first, in the same order for every agent:
+#     [introductions (identical for all agents)] + [agent system message] + conversation
+# as a single system message, and drops the introduction from the conversation.
+#
+# For each call it reports how many prompt tokens repeat a prefix already sent and
+# are long enough for the provider's cache, and how many are new, for this layout and for
+# AutoGen's default one. Speaker selection by the manager is left as is; its system
+# message is already stable within a chat.
+#
+# Usage:
+#     prefix = PromptPrefix(model=model)
+#     prefix.attach(group_chat)
+
+# Providers only cache prompts from a minimum length on (1024 tokens for OpenAI),
+# and beyond that in steps of 128 tokens. Shorter shared prefixes count as new tokens.
+MIN_CACHEABLE_TOKENS = 1024
+CACHE_INCREMENT_TOKENS = 128
+
+
+def _serialize(messages: List[Dict]) -> str:
+    return "".join(
+        f"<{m.get('role')}:{m.get('name', '')}>{m.get('content') or ''}\n"
+        for m in messages
+    )
+
+
+def _count_tokens(text: str, model: str) -> int:
+    # Without tiktoken's encoding files (e.g. offline) estimate four characters per token.
+    try:
+        return count_token(text, model)
+    except Exception:
+        return (len(text) + 3) // 4
+
+
+def _cacheable(tokens: int) -> int:
+    if tokens < MIN_CACHEABLE_TOKENS:
+        return 0
+    return tokens - (tokens - MIN_CACHEABLE_TOKENS) % CACHE_INCREMENT_TOKENS
+
+
+class _PrefixCache:
+    # Simulates a provider prompt cache: the longest prefix shared with any earlier prompt.
+    def __init__(self):
+        self.prompts: List[str] = []
+
+    def reused(self, prompt: str) -> str:
+        best = ""
+        for earlier in self.prompts:
+            prefix = os.path.commonprefix([earlier, prompt])
+            if len(prefix) > len(best):
+                best = prefix
+        self.prompts.append(prompt)
+        return best
+
+
+class _RecordingClient:
+    # Keeps the last response so the provider-reported cached tokens can be read.
+    def __init__(self, client):
+        self._client = client
+        self.response = None
+
+    def create(self, **params):
+        self.response = self._client.create(**params)
+        return self.response
+
+    def extract_text_or_completion_object(self, response):
+        return self._client.extract_text_or_completion_object(response)
+
+
+class PromptPrefix:
+    def __init__(self, model: str = "gpt-3.5-turbo"):
+        self.model = model
+        self.calls: List[Dict[str, Any]] = []
+        self._cache = _PrefixCache()
+        self._default_cache = _PrefixCache()
+
+    def attach(self, groupchat: GroupChat) -> None:
+        intro = groupchat.introductions_msg()
+        for agent in groupchat.agents:
+            if not isinstance(agent, ConversableAgent) or agent.client is None:
+                continue
+            position = next(
+                i
+                for i, entry in enumerate(agent._reply_func_list)
+                if entry["reply_func"] is ConversableAgent.a_generate_oai_reply
+            )
+            agent.register_reply(
+                [Agent, None],
+                self.generate_oai_reply,
+                position=position,
+                config={"intro": intro},
+            )
+
+    def arrange(self, agent: ConversableAgent, messages: List[Dict], intro: str):
+        system = {"role": "system", "content": f"{intro}\n\n{agent.system_message}"}
+        return [system] + [m for m in messages if m.get("content") != intro]
+
+    def generate_oai_reply(
+        self,
+        recipient: ConversableAgent,
+        messages: Optional[List[Dict]] = None,
+        sender: Optional[Agent] = None,
+        config: Optional[Any] = None,
+    ):
+        if messages is None:
+            messages = recipient._oai_messages[sender]
+        arranged = self.arrange(recipient, messages, config["intro"])
+        self._record(recipient, arranged, recipient._oai_system_message + messages)
+        client = _RecordingClient(recipient.client)
+        extracted_response = recipient._generate_oai_reply_from_client(
+            client, arranged, recipient.client_cache
+        )
+        usage = getattr(client.response, "usage", None)
+        details = getattr(usage, "prompt_tokens_details", None)
+        self.calls[-1]["provider_cached_tokens"] = getattr(
+            details, "cached_tokens", None
+        )
+        return (
+            (False, None) if extracted_response is None else (True, extracted_response)
+        )
+
+    def _record(self, agent: Agent, arranged: List[Dict], default: List[Dict]) -> None:
+        prompt, default_prompt = _serialize(arranged), _serialize(default)
+        total = _count_tokens(prompt, self.model)
+        reused = _cacheable(_count_tokens(self._cache.reused(prompt), self.model))
+        default_total = _count_tokens(default_prompt, self.model)
+        default_reused = _cacheable(
+            _count_tokens(self._default_cache.reused(default_prompt), self.model)
+        )
+        self.calls.append(
+            {
+                "agent": agent.name,
+                "prompt_tokens": total,
+                "reused_tokens": reused,
+                "new_tokens": total - reused,
+                "default_prompt_tokens": default_total,
+                "default_reused_tokens": default_reused,
+            }
+        )
+
+    def print_report(self) -> None:
+        print(
+            f"Prompt prefix reuse ({len(self.calls)} calls, cacheable from {MIN_CACHEABLE_TOKENS} tokens):"
+        )
+        for i, call in enumerate(self.calls, start=1):
+            cached = call.get("provider_cached_tokens")
+            print(
+                f"  call {i:>2} {call['agent']:<18} reused {call['reused_tokens']:>5} "
+                f"new {call['new_tokens']:>5} (default layout reused {call['default_reused_tokens']})"
+                + (f", provider cached {cached}" if cached is not None else "")
+            )
+        reused = sum(c["reused_tokens"] for c in self.calls)
+        total = sum(c["prompt_tokens"] for c in self.calls)
+        default_reused = sum(c["default_reused_tokens"] for c in self.calls)
+        default_total = sum(c["default_prompt_tokens"] for c in self.calls)
+        if total and default_total:
+            print(
+                f"  reused prefix tokens: {reused}/{total} ({reused / total:.0%}), "
+                f"default layout {default_reused}/{default_total} ({default_reused / default_total:.0%})"
+            )
@@ -0,0 +1,227 @@
+import math
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from autogen import OpenAIWrapper
+from autogen.token_count_utils import count_token
+
+# Tiered chat summaries.
+#
+# summary_method="reflection_with_llm" sends the whole transcript to the main model
+# after every chat. TieredSummary is a callable summary_method that works in tiers:
+#   1. an extractive summary is built locally with TextRank (sentences ranked by
+#      PageRank over a word-overlap similarity graph), no LLM call;
+#   2. only if that summary is too short, too long or covers too few of the
+#      transcript's key terms, a smaller/cheaper model polishes it. The small model
+#      gets the extract and the key terms, not the transcript.
+# Latency and token use are recorded per summary.
+#
+# Usage:
+#     summary = TieredSummary(polish_llm_config={"model": "gpt-4o-mini", "api_key": ...})
+#     agent.initiate_chat(manager, message=..., summary_method=summary)
+
+DEFAULT_POLISH_PROMPT = (
+    "Rewrite the following extracted sentences from a conversation into a short, "
+    "coherent summary. Keep names, dates, prices and places exactly. "
+    "Make sure these key terms are covered if they are relevant: {key_terms}"
+)
+
+_STOPWORDS = {
+    "the",
+    "a",
+    "an",
+    "and",
+    "or",
+    "of",
+    "to",
+    "in",
+    "on",
+    "for",
+    "with",
+    "at",
+    "by",
+    "is",
+    "are",
+    "was",
+    "be",
+    "it",
+    "this",
+    "that",
+    "you",
+    "your",
+    "i",
+    "we",
+    "our",
+    "can",
+    "will",
+    "from",
+    "as",
+    "have",
+    "has",
+    "also",
+    "here",
+    "there",
+    "some",
+    "these",
+    "they",
+    "their",
+    "which",
+    "would",
+    "should",
+    "if",
+    "not",
+    "but",
+    "all",
+}
+
+
+def _words(text: str) -> List[str]:
+    return [w for w in re.findall(r"[a-z0-9']+", text.lower()) if w not in _STOPWORDS]
+
+
+def _sentences(messages: List[Dict]) -> List[str]:
+    sentences, seen = [], set()
+    for message in messages:
+        content = message.get("content")
+        if not isinstance(content, str):
+            continue
+        for sentence in re.split(r"(?<=[.!?])\s+|\n+", content):
+            sentence = sentence.strip(" -*#\t")
+            if len(_words(sentence)) >= 4 and sentence.lower() not in seen:
+                seen.add(sentence.lower())
+                sentences.append(sentence)
+    return sentences
+
+
+def textrank(
+    sentences: List[str], damping: float = 0.85, iterations: int = 30
+) -> List[float]:
+    """Score sentences with TextRank: PageRank over a word-overlap similarity graph."""
+    words = [set(_words(s)) for s in sentences]
+    n = len(sentences)
+    weights = [[0.0] * n for _ in range(n)]
+    for i in range(n):
+        for j in range(i + 1, n):
+            overlap = len(words[i] & words[j])
+            if overlap:
+                norm = math.log(len(words[i]) + 1) + math.log(len(words[j]) + 1)
+                weights[i][j] = weights[j][i] = overlap / norm
+    out_weight = [sum(row) or 1.0 for row in weights]
+    scores = [1.0] * n
+    for _ in range(iterations):
+        scores = [
+            (1 - damping)
+            + damping * sum(weights[j][i] / out_weight[j] * scores[j] for j in range(n))
+            for i in range(n)
+        ]
+    return scores
+
+
+class TieredSummary:
+    def __init__(
+        self,
+        polish_llm_config: Optional[Dict[str, Any]] = None,
+        max_sentences: int = 5,
+        min_words: int = 25,
+        max_words: int = 150,
+        min_coverage: float = 0.5,
+        key_terms: int = 10,
+        polish_prompt: str = DEFAULT_POLISH_PROMPT,
+        model: str = "gpt-3.5-turbo",
+    ):
+        self.polish_client = (
+            OpenAIWrapper(**polish_llm_config) if polish_llm_config else None
+        )
+        self.max_sentences = max_sentences
+        self.min_words = min_words
+        self.max_words = max_words
+        self.min_coverage = min_coverage
+        self.key_terms = key_terms
+        self.polish_prompt = polish_prompt
+        # Used to count the transcript tokens reflection_with_llm would have sent.
+        self.model = model
+        self.records: List[Dict[str, Any]] = []
+
+    def __call__(self, sender, recipient, summary_args: Dict[str, Any]) -> str:
+        start = time.perf_counter()
+        messages = recipient.chat_messages_for_summary(sender)
+        extract, key_terms, coverage = self.extract(messages)
+        words = len(extract.split())
+        record = {
+            "transcript_tokens": count_token(messages, self.model),
+            "tier": "extractive",
+            "words": words,
+            "coverage": coverage,
+            "polish_tokens": 0,
+            "polish_cost": 0.0,
+        }
+        summary = extract
+        needs_polish = (
+            coverage < self.min_coverage
+            or words < self.min_words
+            or words > self.max_words
+        )
+        if needs_polish and self.polish_client is not None and extract:
+            summary = self._polish(
+                extract, key_terms, summary_args.get("cache"), record
+            )
+        record["seconds"] = time.perf_counter() - start
+        self.records.append(record)
+        return summary
+
+    def extract(self, messages: List[Dict]):
+        """Return the extractive summary, the transcript's key terms and their coverage."""
+        sentences = _sentences(messages)
+        if not sentences:
+            return "", [], 0.0
+        scores = textrank(sentences)
+        top = sorted(range(len(sentences)), key=lambda i: -scores[i])[
+            : self.max_sentences
+        ]
+        extract = " ".join(sentences[i] for i in sorted(top))
+
+        counts: Dict[str, int] = {}
+        for sentence in sentences:
+            for word in set(_words(sentence)):
+                counts[word] = counts.get(word, 0) + 1
+        key_terms = [
+            w for w, c in sorted(counts.items(), key=lambda item: -item[1]) if c > 1
+        ][: self.key_terms]
+        covered = set(_words(extract))
+        coverage = (
+            sum(term in covered for term in key_terms) / len(key_terms)
+            if key_terms
+            else 1.0
+        )
+        return extract, key_terms, coverage
+
+    def _polish(self, extract: str, key_terms: List[str], cache, record: Dict) -> str:
+        response = self.polish_client.create(
+            messages=[
+                {
+                    "role": "system",
+                    "content": self.polish_prompt.format(
+                        key_terms=", ".join(key_terms)
+                    ),
+                },
+                {"role": "user", "content": extract},
+            ],
+            cache=cache,
+        )
+        polished = self.polish_client.extract_text_or_completion_object(response)[0]
+        if not isinstance(polished, str) or not polished.strip():
+            return extract
+        usage = getattr(response, "usage", None)
+        record["tier"] = "polished"
+        record["polish_tokens"] = getattr(usage, "total_tokens", 0) or 0
+        record["polish_cost"] = getattr(response, "cost", 0.0) or 0.0
+        return polished
+
+    def print_report(self) -> None:
+        for i, r in enumerate(self.records, start=1):
+            print(
+                f"Summary {i}: {r['tier']}, {r['words']} words, key term coverage "
+                f"{r['coverage']:.0%}, {r['seconds']:.2f}s, {r['polish_tokens']} LLM tokens "
+                f"(reflection_with_llm would send ~{r['transcript_tokens']} transcript tokens)"
+            )
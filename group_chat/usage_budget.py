@@ -0,0 +1,44 @@
+from typing import Callable, Dict, List
+
+from autogen import Agent, gather_usage_summary
+
+# A small local cost budget for the group chat examples.
+#
+# AutoGen already counts the tokens and cost of every agent's client; calls served
+# from its cache only count towards the total usage, not the actual usage. This
+# check ends the group chat once the actual cost of `agents` since the check was
+# created reaches `max_cost`, and print_usage() prints the per-agent numbers. The
+# Kali app (AutoGenchain - Kali/usage.py) has the full ledger with per-round
+# accounting, latency and token budgets.
+#
+# Usage:
+#     manager = GroupChatManager(..., is_termination_msg=budget_check(agents, 0.05))
+#     ...
+#     print_usage(agents)
+
+
+def _actual_cost(agents: List[Agent]) -> float:
+    return gather_usage_summary(agents)[1]["total_cost"]
+
+
+def budget_check(agents: List[Agent], max_cost: float) -> Callable[[Dict], bool]:
+    """Return an is_termination_msg function that also stops once the budget is spent."""
+    start = _actual_cost(agents)
+
+    def is_termination_msg(message: Dict) -> bool:
+        spent = _actual_cost(agents) - start
+        if spent >= max_cost:
+            print(f"Stopping the chat: ${spent:.4f} of ${max_cost} spent")
+            return True
+        return "TERMINATE" in (message.get("content") or "")
+
+    return is_termination_msg
+
+
+def print_usage(agents: List[Agent]) -> None:
+    """Print tokens and cost per agent, without the calls served from the cache."""
+    print("Usage per agent (without cache hits):")
+    for agent in agents:
+        usage = gather_usage_summary([agent])[1]
+        tokens = sum(v["total_tokens"] for k, v in usage.items() if k != "total_cost")
+        print(f"  {agent.name:<28} tokens {tokens:>7} ${usage['total_cost']:.4f}")
@@ -1,5 +1,4 @@
 import os
-import os
 from autogen import AssistantAgent, UserProxyAgent
 
 # Define LLM configuration
@@ -20,11 +19,22 @@ writer = AssistantAgent(
     """,
 )
 
+# Stop on TERMINATE, and when the writer sends back an unchanged review.
+reviews = []
+
+
+def is_termination_msg(message):
+    content = (message.get("content") or "").strip()
+    unchanged = bool(reviews) and content == reviews[-1]
+    reviews.append(content)
+    return "TERMINATE" in content or unchanged
+
+
 # Define the user proxy agent
 user_proxy = UserProxyAgent(
     name="User",
     human_input_mode="NEVER",
-    is_termination_msg=lambda x: x.get("content", "").find("TERMINATE") >= 0,
+    is_termination_msg=is_termination_msg,
     code_execution_config={
         "last_n_messages": 1,
         "work_dir": "my_code",
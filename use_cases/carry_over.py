@@ -0,0 +1,176 @@
+import re
+from typing import Dict, List, Optional
+
+from autogen.token_count_utils import count_token
+
+# Carry-over policies for sequential chats.
+# Instead of keeping the whole history around with clear_history=False (or passing
+# a full ChatResult as the next message), each chat receives only the context
+# selected by the policy:
+#   - "last_msg": the last non-empty message of the previous chat
+#   - "summary":  the chat summary, optionally condensed by a summarizer agent
+#   - "pinned":   explicitly pinned facts plus history lines matching pin patterns
+#
+# The report compares the carried tokens with what the replaced hand-off would have
+# re-sent, which grows with every chat:
+#   - baseline="history":   clear_history=False keeps the histories of all earlier
+#                           chats and re-sends them with every new message
+#   - baseline="carryover": initiate_chats passes the summaries of all earlier chats
+#                           as carryover
+
+CARRY_OVER_MODES = ("last_msg", "summary", "pinned")
+CARRY_OVER_BASELINES = ("history", "carryover")
+
+DEFAULT_CARRY_OVER_SUMMARY_PROMPT = (
+    "Summarize the key results of the following conversation in a few sentences. "
+    "Keep names, numbers and file names exactly as they appear.\n\n"
+)
+
+
+class CarryOverPolicy:
+    def __init__(
+        self,
+        mode: str = "last_msg",
+        pinned_facts: Optional[List[str]] = None,
+        pin_patterns: Optional[List[str]] = None,
+        summarizer=None,
+        max_tokens: Optional[int] = None,
+        model: str = "gpt-3.5-turbo",
+        baseline: str = "history",
+    ):
+        if mode not in CARRY_OVER_MODES:
+            raise ValueError(f"mode must be one of {CARRY_OVER_MODES}, got {mode!r}")
+        if baseline not in CARRY_OVER_BASELINES:
+            raise ValueError(
+                f"baseline must be one of {CARRY_OVER_BASELINES}, got {baseline!r}"
+            )
+        self.mode = mode
+        self.pinned_facts = list(pinned_facts or [])
+        self.pin_patterns = [re.compile(p, re.IGNORECASE) for p in pin_patterns or []]
+        self.summarizer = summarizer
+        self.max_tokens = max_tokens
+        self.model = model
+        self.baseline = baseline
+        self.records: List[Dict] = []
+        # Tokens the baseline re-sends: everything from the chats handed off so far
+        self._baseline_tokens = 0
+
+    def pin(self, fact: str) -> None:
+        if fact not in self.pinned_facts:
+            self.pinned_facts.append(fact)
+
+    def select(self, chat_result) -> str:
+        """Return the context of a finished chat that should be carried into the next one."""
+        history = chat_result.chat_history
+        if self.mode == "last_msg":
+            context = _last_content(history)
+        elif self.mode == "summary":
+            context = self._summarize(chat_result)
+        else:
+            context = "\n".join(self.pinned_facts + self._pinned_lines(history))
+        if self.max_tokens is not None:
+            context = _fit_tokens(context, self.max_tokens, self.model)
+        if self.baseline == "history":
+            self._baseline_tokens += count_token(history, self.model)
+        else:
+            self._baseline_tokens += count_token(_summary_text(chat_result), self.model)
+        self.records.append(
+            {
+                "mode": self.mode,
+                "baseline_tokens": self._baseline_tokens,
+                "carried_tokens": count_token(context, self.model),
+            }
+        )
+        return context
+
+    def build_message(self, task: str, chat_result) -> str:
+        """Combine the next task with the selected context of the previous chat."""
+        context = self.select(chat_result)
+        if not context:
+            return task
+        return f"{task}\n\nContext from the previous step:\n{context}"
+
+    def _summarize(self, chat_result) -> str:
+        if self.summarizer is None:
+            return _summary_text(chat_result)
+        transcript = "\n".join(
+            f"{msg.get('name', msg.get('role', ''))}: {msg['content']}"
+            for msg in chat_result.chat_history
+            if msg.get("content")
+        )
+        reply = self.summarizer.generate_reply(
+            messages=[
+                {
+                    "role": "user",
+                    "content": DEFAULT_CARRY_OVER_SUMMARY_PROMPT + transcript,
+                }
+            ]
+        )
+        return reply.get("content", "") if isinstance(reply, dict) else (reply or "")
+
+    def _pinned_lines(self, history: List[Dict]) -> List[str]:
+        lines = []
+        for msg in history:
+            for line in (msg.get("content") or "").splitlines():
+                line = line.strip()
+                if (
+                    line
+                    and line not in lines
+                    and any(p.search(line) for p in self.pin_patterns)
+                ):
+                    lines.append(line)
+        return lines
+
+    def token_report(self) -> Dict[str, int]:
+        baseline_tokens = sum(r["baseline_tokens"] for r in self.records)
+        carried_tokens = sum(r["carried_tokens"] for r in self.records)
+        return {
+            "carry_overs": len(self.records),
+            "baseline": self.baseline,
+            "baseline_tokens": baseline_tokens,
+            "carried_tokens": carried_tokens,
+            "saved_tokens": baseline_tokens - carried_tokens,
+        }
+
+    def print_report(self) -> None:
+        report = self.token_report()
+        saved_pct = (
+            100.0 * report["saved_tokens"] / report["baseline_tokens"]
+            if report["baseline_tokens"]
+            else 0.0
+        )
+        label = (
+            "all earlier histories"
+            if self.baseline == "history"
+            else "all earlier summaries"
+        )
+        rows = [
+            (f"prompt tokens re-sending {label}:", report["baseline_tokens"]),
+            ("prompt tokens carried over:", report["carried_tokens"]),
+            ("reduction:", f"{report['saved_tokens']} tokens ({saved_pct:.1f}%)"),
+        ]
+        width = max(len(name) for name, _ in rows) + 1
+        print(f"Carry-over policy '{self.mode}': {report['carry_overs']} hand-offs")
+        for name, value in rows:
+            print(f"  {name:<{width}}{value}")
+
+
+def _summary_text(chat_result) -> str:
+    summary = chat_result.summary
+    return summary if isinstance(summary, str) else str(summary)
+
+
+def _last_content(history: List[Dict]) -> str:
+    for msg in reversed(history):
+        content = (msg.get("content") or "").replace("TERMINATE", "").strip()
+        if content:
+            return content
+    return ""
+
+
+def _fit_tokens(text: str, max_tokens: int, model: str) -> str:
+    # Drop leading lines first: the end of a chat usually holds the results.
+    lines = text.splitlines()
+    while len(lines) > 1 and count_token("\n".join(lines), model) > max_tokens:
+        lines.pop(0)
+    return "\n".join(lines)
@@ -5,6 +5,7 @@ from autogen import AssistantAgent, UserProxyAgent
 import pandas as pd
 import autogen
 
+from carry_over import CarryOverPolicy
 
 load_dotenv()
 
@@ -50,20 +51,31 @@ content_analysis_agent = AssistantAgent(
     """,
 )
 
+# Tasks 2 and 3 used to run with clear_history=False, which re-sends the histories
+# of all earlier tasks (including code execution output) with every message. They
+# now start with a fresh history and receive only the last result of the previous
+# task, so the assistant no longer sees the earlier tasks' intermediate steps.
+# The report compares the carried tokens with that re-sent history.
+research_carry_over = CarryOverPolicy(mode="last_msg", max_tokens=1500, model=model)
+
 # Task 1: Find research papers
 task1 = """
 Find arxiv papers that discuss the applications of machine learning in healthcare.
 """
-user_proxy.initiate_chat(assistant, message=task1)
+task1_result = user_proxy.initiate_chat(assistant, message=task1)
 
 # Task 2: Analyze the results to list the specific healthcare applications
 task2 = "Analyze the results to list the specific healthcare applications studied by these papers."
-user_proxy.initiate_chat(assistant, message=task2, clear_history=False)
+task2_result = user_proxy.initiate_chat(
+    assistant, message=research_carry_over.build_message(task2, task1_result)
+)
 
 # Task 3: Generate a bar chart
 task3 = """Use this data to generate a bar chart of healthcare applications and the number of papers in each application and save it to a file.
 """
-user_proxy.initiate_chat(assistant, message=task3, clear_history=False)
+user_proxy.initiate_chat(
+    assistant, message=research_carry_over.build_message(task3, task2_result)
+)
 
 # Example usage
 file_path = "article.txt"
@@ -109,33 +121,51 @@ final_review_agent = AssistantAgent(
     You summarize the overall quality of the article and readiness for publication.
     """,
 )
+# Each review step receives the previous agent's findings, not the previous ChatResult.
+# The report compares them with the carryover of all earlier summaries that
+# initiate_chats would pass.
+review_carry_over = CarryOverPolicy(mode="last_msg", model=model, baseline="carryover")
+
 style_result = user_proxy.initiate_chat(
     recipient=style_review_agent,
-    message=content_result,
+    message=review_carry_over.build_message(
+        "Review the article analysis for language use, tone, and style consistency.",
+        content_result,
+    ),
     max_turns=2,
     summary_method="last_msg",
 )
 
 fact_result = user_proxy.initiate_chat(
     recipient=fact_checking_agent,
-    message=style_result,
+    message=review_carry_over.build_message(
+        "Verify the factual accuracy of the reviewed content.", style_result
+    ),
     max_turns=2,
     summary_method="last_msg",
 )
 
 feedback_result = user_proxy.initiate_chat(
     recipient=editorial_feedback_agent,
-    message=fact_result,
+    message=review_carry_over.build_message(
+        "Provide comprehensive feedback and suggestions for improvement.", fact_result
+    ),
     max_turns=2,
     summary_method="last_msg",
 )
 
 final_summary = user_proxy.initiate_chat(
     recipient=final_review_agent,
-    message=feedback_result,
+    message=review_carry_over.build_message(
+        "Summarize the overall quality of the article and readiness for publication.",
+        feedback_result,
+    ),
     max_turns=2,
     summary_method="last_msg",
 )
 
 print("Final Summary or Report:")
-print(final_summary)
+print(final_summary.summary)
+
+research_carry_over.print_report()
+review_carry_over.print_report()